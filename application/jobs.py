@@ -12,6 +12,7 @@ class JobManager:
     def __init__(self, max_workers=2):
         self.exec = ThreadPoolExecutor(max_workers=max_workers)
         self._jobs = {}        # job_id -> dict
+        self._runners = {}     # job_id -> callable, kept so failed jobs can be retried
         self._lock = threading.Lock()
 
     def _new_job(self, kind: str):
@@ -29,6 +30,26 @@ class JobManager:
             }
         return job_id
 
+    def submit(self, job_id: str, runner):
+        """Run runner() on the pool and mark the job RUNNING."""
+        with self._lock:
+            self._runners[job_id] = runner
+            if job_id in self._jobs:
+                self._jobs[job_id].update(status=JobStatus.RUNNING, progress=2, error=None)
+                self._jobs[job_id]["diagnostics"]["phase"] = "started"
+        self.exec.submit(runner)
+
+    def retry(self, job_id: str) -> bool:
+        """Resubmit a failed/canceled job; resumable runners pick up from their checkpoints."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            runner = self._runners.get(job_id)
+            if not job or not runner or job["status"] not in (JobStatus.ERROR, JobStatus.CANCELED):
+                return False
+            job["retries"] = job.get("retries", 0) + 1
+        self.submit(job_id, runner)
+        return True
+
     def set_progress(self, job_id: str, pct: int, **diag):
         with self._lock:
             if job_id in self._jobs and self._jobs[job_id]["status"] not in (JobStatus.DONE, JobStatus.ERROR, JobStatus.CANCELED):
@@ -42,6 +63,7 @@ class JobManager:
                 self._jobs[job_id]["status"] = JobStatus.DONE
                 self._jobs[job_id]["progress"] = 100
                 self._jobs[job_id]["result_path"] = path
+                self._runners.pop(job_id, None)
                 if diagnostics:
                     self._jobs[job_id]["diagnostics"].update(diagnostics)
 
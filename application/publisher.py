@@ -0,0 +1,113 @@
+import os, uuid, time, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from application.utils.gcs_upload import upload_to_gcs, gcs_public_url
+
+# finished (PUBLISHED/FAILED) records are dropped after PUBLISH_KEEP_SEC, or oldest
+# first once more than PUBLISH_MAX_ITEMS records exist; in-flight ones are never dropped
+PUBLISH_KEEP_SEC = int(os.getenv("PUBLISH_KEEP_SEC", "86400"))
+PUBLISH_MAX_ITEMS = int(os.getenv("PUBLISH_MAX_ITEMS", "1000"))
+
+
+class PublishStatus:
+    PUBLISHING = "PUBLISHING"
+    PUBLISHED  = "PUBLISHED"
+    FAILED     = "FAILED"
+
+
+class PublishManager:
+    """
+    Background GCS publishing so a request only pays for the render.
+    submit() returns immediately with the final object URL (it is deterministic:
+    bucket + dest path) and a publish_id; the upload runs on the pool with retries.
+    """
+
+    def __init__(self, max_workers=2, max_attempts=4, backoff_sec=2.0,
+                 keep_sec=PUBLISH_KEEP_SEC, max_items=PUBLISH_MAX_ITEMS):
+        self.exec = ThreadPoolExecutor(max_workers=max_workers)
+        self.max_attempts = max_attempts
+        self.backoff_sec = backoff_sec
+        self.keep_sec = keep_sec
+        self.max_items = max_items
+        self._items = {}       # publish_id -> dict
+        self._lock = threading.Lock()
+
+    def _prune(self):
+        """Drop finished records past keep_sec, then the oldest finished ones over max_items (lock held)."""
+        now = time.time()
+        done = sorted((it["finished_at"], pid) for pid, it in self._items.items() if it["finished_at"])
+        for finished_at, pid in done:
+            if now - finished_at <= self.keep_sec and len(self._items) <= self.max_items:
+                break
+            del self._items[pid]
+
+    def submit(self, local_path: str, bucket_name: str, dest_path: str) -> dict:
+        publish_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._prune()
+            self._items[publish_id] = {
+                "id": publish_id,
+                "status": PublishStatus.PUBLISHING,
+                "gcs_url": gcs_public_url(bucket_name, dest_path),
+                "bucket": bucket_name,
+                "dest_path": dest_path,
+                "local_path": local_path,
+                "attempts": 0,
+                "error": None,
+                "created_at": int(time.time()),
+                "published_at": None,
+                "finished_at": None,
+            }
+            snapshot = dict(self._items[publish_id])
+        self.exec.submit(self._upload, publish_id)
+        return snapshot
+
+    def _update(self, publish_id: str, **fields):
+        with self._lock:
+            if publish_id in self._items:
+                self._items[publish_id].update(fields)
+
+    def _upload(self, publish_id: str):
+        item = self.get(publish_id)
+        if not item:
+            return
+        last_err = None
+        for attempt in range(1, self.max_attempts + 1):
+            self._update(publish_id, attempts=attempt)
+            try:
+                upload_to_gcs(item["local_path"], item["bucket"], item["dest_path"])
+                now = int(time.time())
+                self._update(publish_id, status=PublishStatus.PUBLISHED, error=None,
+                             published_at=now, finished_at=now)
+                return
+            except FileNotFoundError as e:
+                # nothing to retry: the local output is gone
+                last_err = e
+                break
+            except Exception as e:
+                last_err = e
+                if attempt < self.max_attempts:
+                    time.sleep(self.backoff_sec * (2 ** (attempt - 1)))
+        self._update(publish_id, status=PublishStatus.FAILED, error=str(last_err),
+                     finished_at=int(time.time()))
+
+    def get(self, publish_id: str):
+        with self._lock:
+            item = self._items.get(publish_id)
+            return dict(item) if item else None
+
+    def is_pending(self, local_path: str) -> bool:
+        with self._lock:
+            return any(
+                it["local_path"] == local_path and it["status"] == PublishStatus.PUBLISHING
+                for it in self._items.values()
+            )
+
+    def list(self, limit=50):
+        with self._lock:
+            self._prune()
+            items = [dict(it) for it in self._items.values()]
+        items.sort(key=lambda x: x["created_at"], reverse=True)
+        return items[:limit]
+
+PUBLISH_MANAGER = PublishManager(max_workers=2)
@@ -0,0 +1,182 @@
+import os, shutil
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# png  : ffmpeg/OpenCV default zlib level, smallest files, slowest to write and read
+# png0 : PNG with compression 0 (still a file per frame, iopaint-compatible, no zlib work)
+# bmp  : raw BGR per file, no codec at all
+# npy  : one memory-mapped BGR frame stack; ffmpeg writes/reads it as rawvideo
+FRAME_FORMATS = ("png", "png0", "bmp", "npy")
+
+
+def display_size(stream: dict) -> Tuple[int, int]:
+    """
+    W, H of the frames ffmpeg decodes from an ffprobe stream entry. ffmpeg autorotates,
+    so a 90/270 rotation (legacy `rotate` tag or display-matrix side data, as phones
+    write for portrait clips) swaps the coded width/height.
+    """
+    W, H = int(stream.get("width") or 0), int(stream.get("height") or 0)
+    rotation = (stream.get("tags") or {}).get("rotate")
+    for sd in stream.get("side_data_list") or []:
+        if "rotation" in sd:
+            rotation = sd["rotation"]
+    try:
+        rotation = int(float(rotation or 0))
+    except ValueError:
+        rotation = 0
+    return (H, W) if abs(rotation) % 180 == 90 else (W, H)
+
+
+def check_frame_format(fmt: str) -> str:
+    f = (fmt or "png").lower()
+    if f not in FRAME_FORMATS:
+        raise ValueError(f"frame_format must be one of {', '.join(FRAME_FORMATS)}")
+    return f
+
+
+class FrameDir:
+    """Folder of per-frame image files (frame_000001.png, ...), addressed by file name."""
+
+    def __init__(self, path: str, fmt: str = "png", pattern: str = "frame_%06d"):
+        self.path = path
+        self.fmt = check_frame_format(fmt)
+        if self.fmt == "npy":
+            raise ValueError("FrameDir holds image files; use FrameStack for npy")
+        self.pattern = pattern
+        self.ext = ".bmp" if self.fmt == "bmp" else ".png"
+        self._params = [cv2.IMWRITE_PNG_COMPRESSION, 0] if self.fmt == "png0" else []
+
+    def names(self) -> List[str]:
+        return sorted(f for f in os.listdir(self.path) if f.endswith(self.ext))
+
+    def __len__(self):
+        return len(self.names())
+
+    def read(self, name: str) -> Optional[np.ndarray]:
+        return cv2.imread(os.path.join(self.path, name), cv2.IMREAD_COLOR)
+
+    def write(self, name: str, img: np.ndarray):
+        cv2.imwrite(os.path.join(self.path, name), img, self._params)
+
+    def copy_from(self, src, name: str):
+        """Pass a frame through unchanged (a file copy when both sides share the format)."""
+        if isinstance(src, FrameDir) and src.ext == self.ext:
+            shutil.copyfile(os.path.join(src.path, name), os.path.join(self.path, name))
+        else:
+            self.write(name, src.read(name))
+
+    def flush(self):
+        pass
+
+    def clear(self):
+        for f in os.listdir(self.path):
+            os.remove(os.path.join(self.path, f))
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.path, f)) for f in os.listdir(self.path))
+
+    def sibling(self, path: str) -> "FrameDir":
+        return FrameDir(path, self.fmt, self.pattern)
+
+    def ffmpeg_output(self) -> List[str]:
+        opts = ["-compression_level", "0"] if self.fmt == "png0" else []
+        if self.fmt == "bmp":
+            opts = ["-pix_fmt", "bgr24"]
+        return opts + [os.path.join(self.path, self.pattern + self.ext)]
+
+    def ffmpeg_input(self, fps) -> List[str]:
+        return ["-framerate", str(fps), "-i", os.path.join(self.path, self.pattern + self.ext)]
+
+
+class FrameStack:
+    """
+    All frames of a clip in one uint8 (N, H, W, 3) BGR file, memory-mapped.
+    Kept headerless (an .npy stack minus the header) so ffmpeg can write it and read
+    it back as rawvideo without a copy; N follows from the file size. Frame names
+    mirror FrameDir's (frame_000001, ...) so masks and checkpoints match by name.
+    """
+
+    fmt = "npy"
+
+    def __init__(self, path: str, W: int, H: int, frames: Optional[int] = None):
+        self.path = path
+        self.file = os.path.join(path, "frames.bgr")
+        self.W, self.H = int(W), int(H)
+        self.frame_bytes = self.W * self.H * 3
+        self._frames = frames  # set for output stacks, which are allocated up front
+        self._mm = None
+
+    def _map(self) -> np.memmap:
+        if self._mm is None:
+            if self._frames is not None:
+                size = self._frames * self.frame_bytes
+                mode = "r+" if os.path.isfile(self.file) and os.path.getsize(self.file) == size else "w+"
+                n = self._frames
+            else:
+                mode, n = "r", os.path.getsize(self.file) // self.frame_bytes
+            self._mm = np.memmap(self.file, dtype=np.uint8, mode=mode, shape=(n, self.H, self.W, 3))
+        return self._mm
+
+    @staticmethod
+    def _index(name: str) -> int:
+        return int(name.rsplit("_", 1)[1]) - 1
+
+    def names(self) -> List[str]:
+        if not os.path.isfile(self.file) and self._frames is None:
+            return []
+        return [f"frame_{i + 1:06d}" for i in range(len(self._map()))]
+
+    def __len__(self):
+        return len(self.names())
+
+    def read(self, name: str) -> Optional[np.ndarray]:
+        i = self._index(name)
+        mm = self._map()
+        return np.array(mm[i]) if i < len(mm) else None
+
+    def write(self, name: str, img: np.ndarray):
+        self._map()[self._index(name)] = img
+
+    def copy_from(self, src, name: str):
+        self.write(name, src.read(name))
+
+    def flush(self):
+        if self._mm is not None and self._mm.mode != "r":
+            self._mm.flush()
+
+    def clear(self):
+        self._mm = None
+        for f in os.listdir(self.path):
+            os.remove(os.path.join(self.path, f))
+
+    def size_bytes(self) -> int:
+        return os.path.getsize(self.file) if os.path.isfile(self.file) else 0
+
+    def sibling(self, path: str) -> "FrameStack":
+        return FrameStack(path, self.W, self.H, frames=len(self._map()))
+
+    def ffmpeg_output(self) -> List[str]:
+        return ["-f", "rawvideo", "-pix_fmt", "bgr24", self.file]
+
+    def ffmpeg_input(self, fps) -> List[str]:
+        return ["-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{self.W}x{self.H}",
+                "-framerate", str(fps), "-i", self.file]
+
+
+def frame_store(path: str, fmt: str = "png", W: int = 0, H: int = 0, pattern: str = "frame_%06d"):
+    """FrameDir / FrameStack for a frame_format; npy needs the frame size up front."""
+    fmt = check_frame_format(fmt)
+    if fmt == "npy":
+        if not (W and H):
+            raise ValueError("frame_format 'npy' needs the video width/height")
+        return FrameStack(path, W, H)
+    return FrameDir(path, fmt, pattern)
+
+
+def as_frames(src, like=None):
+    """A frame store for src: stores pass through, plain paths are PNG folders (or like's format)."""
+    if isinstance(src, (FrameDir, FrameStack)):
+        return src
+    return like.sibling(src) if like is not None else FrameDir(src)
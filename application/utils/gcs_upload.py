@@ -1,6 +1,12 @@
 import os
 from google.cloud import storage
 
+
+def gcs_public_url(bucket_name: str, dest_path: str) -> str:
+    """Public URL an object will have once uploaded (deterministic, no network)."""
+    return f"https://storage.googleapis.com/{bucket_name}/{dest_path}"
+
+
 def upload_to_gcs(local_path: str, bucket_name: str, dest_path: str) -> str:
     """Uploads a local file to GCS and returns the public URL."""
     if not os.path.isfile(local_path):
@@ -11,4 +17,4 @@ def upload_to_gcs(local_path: str, bucket_name: str, dest_path: str) -> str:
     blob = bucket.blob(dest_path)
 
     blob.upload_from_filename(local_path)
-    return f"https://storage.googleapis.com/{bucket_name}/{dest_path}"
\ No newline at end of file
+    return gcs_public_url(bucket_name, dest_path)
@@ -0,0 +1,436 @@
+import os, shutil, subprocess, threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from application.utils.parallel import ordered_map
+from application.utils.mask_store import load_mask
+from application.utils.frame_io import as_frames
+
+Rect = Tuple[int, int, int, int]  # x1, y1, x2, y2 (end-exclusive, source pixels)
+
+INPAINT_METHODS = {"telea": cv2.INPAINT_TELEA, "ns": cv2.INPAINT_NS}
+
+# px band inside the hole over which a reused patch is blended into the current frame's
+# context (PatchReuse.paste); 0 = hard substitution of the reference's masked pixels
+REUSE_FEATHER = int(os.getenv("INPAINT_REUSE_FEATHER", "0"))
+
+
+def inpaint_flags(method: str = "telea") -> int:
+    m = (method or "telea").lower()
+    if m not in INPAINT_METHODS:
+        raise ValueError("inpaint_method must be 'telea' or 'ns'")
+    return INPAINT_METHODS[m]
+
+
+def _merge_rects(rects: List[Rect]) -> List[Rect]:
+    """Union overlapping/touching rects until none overlap (padding makes near boxes touch)."""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        out: List[Rect] = []
+        for r in rects:
+            for k, o in enumerate(out):
+                if r[0] <= o[2] and o[0] <= r[2] and r[1] <= o[3] and o[1] <= r[3]:
+                    out[k] = (min(r[0], o[0]), min(r[1], o[1]), max(r[2], o[2]), max(r[3], o[3]))
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+
+def mask_rois(mask: np.ndarray, pad: int = 16) -> List[Rect]:
+    """
+    Padded bounding rects of the mask's connected components, merged where they overlap.
+    pad is the context the inpainter sees around each hole (>= radius for cv2,
+    a few dozen px for LaMa).
+    """
+    if mask is None or not mask.any():
+        return []
+    H, W = mask.shape[:2]
+    n, _, st, _ = cv2.connectedComponentsWithStats((mask > 0).astype(np.uint8), connectivity=8)
+    rects = []
+    for i in range(1, n):
+        x, y, w, h = st[i, cv2.CC_STAT_LEFT], st[i, cv2.CC_STAT_TOP], st[i, cv2.CC_STAT_WIDTH], st[i, cv2.CC_STAT_HEIGHT]
+        rects.append((max(0, x - pad), max(0, y - pad), min(W, x + w + pad), min(H, y + h + pad)))
+    return _merge_rects(rects)
+
+
+def rois_area(rois: List[Rect]) -> int:
+    return sum((x2 - x1) * (y2 - y1) for (x1, y1, x2, y2) in rois)
+
+
+class PatchReuse:
+    """
+    Temporal reuse of inpainted ROI patches (static scenes, talking heads, slides).
+    Per ROI rect it keeps the last *inpainted* reference: source crop, mask crop and
+    result. A later ROI with the same rect and mask whose source crop - hole plus
+    surrounding context - differs from the reference by at most `thresh` (mean abs,
+    0..255) takes the reference's masked pixels instead of a model call; unmasked
+    pixels stay the current frame's. Comparing against the reference, not the
+    previous frame, keeps slow drift from accumulating. With feather > 0 a reused
+    fill is blended rather than substituted: the context drift (current minus
+    reference source, averaged over the unmasked pixels around each point) is added
+    to the fill with full weight at the hole's edge, fading out `feather` px inside,
+    so the patch meets the current frame without a seam. Thread-safe; with parallel
+    workers a few frames in flight may miss a reference that is still computing.
+    """
+
+    def __init__(self, thresh: float = 2.0, max_entries: int = 64, feather: int = None):
+        self.thresh = float(thresh)
+        self.max_entries = int(max_entries)
+        self.feather = REUSE_FEATHER if feather is None else max(0, int(feather))
+        self._refs = OrderedDict()  # rect -> {"src", "mask", "res"}
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.inpainted = 0
+
+    def match(self, rect: Rect, crop: np.ndarray, mcrop: np.ndarray) -> Optional[dict]:
+        with self._lock:
+            ref = self._refs.get(rect)
+        if ref is None or not np.array_equal(ref["mask"], mcrop):
+            return None
+        if cv2.absdiff(ref["src"], crop).mean() > self.thresh:
+            return None
+        with self._lock:
+            self.reused += 1
+        return ref
+
+    def add(self, rect: Rect, crop: np.ndarray, mcrop: np.ndarray, res=None) -> dict:
+        ref = {"src": crop.copy(), "mask": mcrop.copy(), "res": res}
+        with self._lock:
+            self.inpainted += 1
+            self._refs[rect] = ref
+            self._refs.move_to_end(rect)
+            while len(self._refs) > self.max_entries:
+                self._refs.popitem(last=False)
+        return ref
+
+    @staticmethod
+    def paste(crop: np.ndarray, mcrop: np.ndarray, res: np.ndarray,
+              src: np.ndarray = None, feather: int = 0) -> np.ndarray:
+        """crop with its masked pixels from res; feathered by the drift from src (the crop res was made for)."""
+        out = crop.copy()
+        sel = mcrop > 0
+        if not feather or src is None or src is crop:
+            out[sel] = res[sel]
+            return out
+        ctx = (~sel).astype(np.float32)
+        drift = (crop.astype(np.float32) - src.astype(np.float32)) * ctx[..., None]
+        k = 2 * int(feather) + 1
+        # normalized box filter: mean drift over the context pixels within `feather` px
+        near = cv2.blur(drift, (k, k)) / np.maximum(cv2.blur(ctx, (k, k)), 1e-3)[..., None]
+        dist = cv2.distanceTransform(sel.astype(np.uint8), cv2.DIST_L2, 3)
+        ramp = np.clip(1.0 - dist / float(feather), 0.0, 1.0)[..., None]
+        fill = np.clip(res.astype(np.float32) + ramp * near, 0, 255)
+        out[sel] = fill[sel].round().astype(np.uint8)
+        return out
+
+    def stats(self) -> dict:
+        total = self.reused + self.inpainted
+        return {"reuse_thresh": self.thresh, "reused_rois": self.reused, "inpainted_rois": self.inpainted,
+                "reuse_rate": round(self.reused / total, 3) if total else 0.0}
+
+
+def inpaint_rois(img: np.ndarray, mask: np.ndarray, radius: int = 3, flags: int = cv2.INPAINT_TELEA,
+                 pad: int = 16, reuse: PatchReuse = None) -> Tuple[np.ndarray, List[Rect]]:
+    """cv2.inpaint on each ROI crop only; pixels outside the crops are returned untouched."""
+    rois = mask_rois(mask, pad=max(pad, 2 * radius))
+    if not rois:
+        return img, rois
+    out = img.copy()
+    for r in rois:
+        x1, y1, x2, y2 = r
+        crop, mcrop = img[y1:y2, x1:x2], mask[y1:y2, x1:x2]
+        ref = reuse.match(r, crop, mcrop) if reuse else None
+        if ref is not None:
+            out[y1:y2, x1:x2] = PatchReuse.paste(crop, mcrop, ref["res"], ref["src"], reuse.feather)
+            continue
+        out[y1:y2, x1:x2] = cv2.inpaint(crop, mcrop, radius, flags)
+        if reuse:
+            reuse.add(r, crop, mcrop, out[y1:y2, x1:x2].copy())
+    return out, rois
+
+
+def _frame_files(frames, start_at: int = 0) -> List[str]:
+    return frames.names()[max(0, int(start_at)):]
+
+
+def opencv_rois_dir(frames_dir, masks, out_dir, method: str = "telea",
+                    radius: int = 3, start_at: int = 0, checkpoint=None, reuse_thresh: float = 0.0,
+                    reuse_feather: int = None) -> dict:
+    """
+    cv2.inpaint over frames_dir + masks (MaskStore or PNG folder) into out_dir on a bounded thread pool.
+    frames_dir/out_dir are PNG folders or frame stores (frame_io); out_dir follows the input format.
+    start_at skips the first N (already inpainted) frames; checkpoint(n) is called
+    with the number of leading frames that are complete on disk.
+    reuse_thresh > 0 reuses inpainted patches across near-identical frames (PatchReuse),
+    blended over reuse_feather px (default INPAINT_REUSE_FEATHER, 0 = hard substitution).
+    """
+    flags = inpaint_flags(method)
+    frames = as_frames(frames_dir)
+    out = as_frames(out_dir, like=frames)
+    reuse = PatchReuse(reuse_thresh, feather=reuse_feather) if reuse_thresh > 0 else None
+
+    def work(fname: str):
+        mk = load_mask(masks, fname)
+        if mk is None or not mk.any():
+            # nothing to remove: pass the frame through without decoding it
+            out.copy_from(frames, fname)
+            return (0 if mk is None else mk.size), 0, True
+        res, rois = inpaint_rois(frames.read(fname), mk, radius, flags, reuse=reuse)
+        out.write(fname, res)
+        return mk.size, rois_area(rois), False
+
+    files = _frame_files(frames, start_at)
+    frame_px = roi_px = skipped = 0
+    for n, (px, area, empty) in enumerate(ordered_map(work, files), start=1):
+        frame_px += px
+        roi_px += area
+        skipped += empty
+        if checkpoint and n % 50 == 0:
+            out.flush()
+            checkpoint(start_at + n)
+    out.flush()
+    if checkpoint:
+        checkpoint(start_at + len(files))
+    stats = {"frames": len(files), "skipped_frames": skipped,
+             "roi_area_pct": round(100.0 * roi_px / frame_px, 2) if frame_px else 0.0}
+    if reuse:
+        stats["reuse"] = reuse.stats()
+    return stats
+
+
+def _crop_name(stem: str, r: Rect) -> str:
+    return f"{stem}__{r[0]}_{r[1]}_{r[2]}_{r[3]}.png"
+
+
+def _parse_crop_name(name: str) -> Tuple[str, Rect]:
+    stem, coords = os.path.splitext(name)[0].rsplit("__", 1)
+    x1, y1, x2, y2 = (int(v) for v in coords.split("_"))
+    return stem, (x1, y1, x2, y2)
+
+
+def iopaint_rois(frames_dir, masks, out_dir, work_dir: str,
+                 device: str = "cpu", pad: int = 32, start_at: int = 0, checkpoint=None,
+                 reuse_thresh: float = 0.0, reuse_feather: int = None) -> dict:
+    """
+    LaMa on mask ROIs instead of whole frames:
+      1) crop every padded ROI of every frame (+ its mask) into work_dir
+      2) one `iopaint run` over the crop folders (model loads once for the batch)
+      3) paste the masked pixels of each result back onto its frame in out_dir
+    Frames whose mask is empty are copied through byte-for-byte and never reach the model.
+    Masks (MaskStore or PNG folder) are matched to frames by file name.
+    start_at/checkpoint as in opencv_rois_dir(); the CLI batch itself is all-or-nothing.
+    With reuse_thresh > 0, ROIs matching an earlier crop (PatchReuse) are not written
+    for the CLI at all; they are pasted from that crop's result.
+    """
+    frames = as_frames(frames_dir)
+    out = as_frames(out_dir, like=frames)
+    reuse = PatchReuse(reuse_thresh, feather=reuse_feather) if reuse_thresh > 0 else None
+    reused = {}  # frame stem -> [(reference crop name, rect)]
+    img_dir = os.path.join(work_dir, "roi_img")
+    msk_dir = os.path.join(work_dir, "roi_mask")
+    res_dir = os.path.join(work_dir, "roi_out")
+    for d in (img_dir, msk_dir, res_dir):
+        os.makedirs(d, exist_ok=True)
+
+    files = _frame_files(frames, start_at)
+    frame_px = roi_px = crops = skipped = 0
+    try:
+        for fname in files:
+            mask = load_mask(masks, fname)
+            if mask is None:
+                continue
+            frame_px += mask.size
+            rois = mask_rois(mask, pad=pad)
+            if not rois:
+                skipped += 1
+                continue
+            img = frames.read(fname)
+            stem = os.path.splitext(fname)[0]
+            for r in rois:
+                x1, y1, x2, y2 = r
+                crop, mcrop = img[y1:y2, x1:x2], mask[y1:y2, x1:x2]
+                ref = reuse.match(r, crop, mcrop) if reuse else None
+                if ref is not None:
+                    reused.setdefault(stem, []).append((ref["res"], r))
+                    continue
+                cv2.imwrite(os.path.join(img_dir, _crop_name(stem, r)), crop)
+                cv2.imwrite(os.path.join(msk_dir, _crop_name(stem, r)), mcrop)
+                if reuse:
+                    reuse.add(r, crop, mcrop, _crop_name(stem, r))
+                crops += 1
+            roi_px += rois_area(rois)
+
+        if crops:
+            p = subprocess.run([
+                "iopaint", "run",
+                "--model", "lama",
+                "--device", device,
+                "--image", img_dir,
+                "--mask", msk_dir,
+                "--output", res_dir
+            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            if p.returncode != 0:
+                raise RuntimeError(p.stderr.strip() or "iopaint failed")
+
+        by_frame = {}
+        for name in os.listdir(res_dir):
+            stem, r = _parse_crop_name(name)
+            by_frame.setdefault(stem, []).append((name, r))
+        for stem, refs in reused.items():
+            by_frame.setdefault(stem, []).extend(refs)
+
+        def paste(fname: str):
+            stem = os.path.splitext(fname)[0]
+            patches = by_frame.get(stem)
+            if not patches:
+                out.copy_from(frames, fname)
+                return
+            img = frames.read(fname)
+            for name, (x1, y1, x2, y2) in patches:
+                res = cv2.imread(os.path.join(res_dir, name))
+                m = cv2.imread(os.path.join(msk_dir, name), cv2.IMREAD_GRAYSCALE)
+                if res is None or m is None or res.shape[:2] != (y2 - y1, x2 - x1):
+                    continue
+                region = img[y1:y2, x1:x2]
+                src = None
+                if reuse and reuse.feather and _parse_crop_name(name)[0] != stem:
+                    src = cv2.imread(os.path.join(img_dir, name))  # reused from another frame's crop
+                region[:] = PatchReuse.paste(region, m, res, src, reuse.feather if reuse else 0)
+            out.write(fname, img)
+
+        for n, _ in enumerate(ordered_map(paste, files), start=1):
+            if checkpoint and n % 50 == 0:
+                out.flush()
+                checkpoint(start_at + n)
+        out.flush()
+        if checkpoint:
+            checkpoint(start_at + len(files))
+    finally:
+        shutil.rmtree(img_dir, ignore_errors=True)
+        shutil.rmtree(msk_dir, ignore_errors=True)
+        shutil.rmtree(res_dir, ignore_errors=True)
+
+    stats = {
+        "frames": len(files),
+        "skipped_frames": skipped,
+        "roi_crops": crops,
+        "roi_area_pct": round(100.0 * roi_px / frame_px, 2) if frame_px else 0.0,
+    }
+    if reuse:
+        stats["reuse"] = reuse.stats()
+    return stats
+
+
+def engine_rois(img: np.ndarray, mask: np.ndarray, engine, pad: int = 32,
+                batch_size: int = None, reuse: PatchReuse = None) -> Tuple[np.ndarray, List[Rect]]:
+    """In-process LaMa (LamaEngine) on the padded ROIs of one image; other pixels untouched."""
+    rois = mask_rois(mask, pad=pad)
+    if not rois:
+        return img, rois
+    out = img.copy()
+    todo = []
+    for r in rois:
+        x1, y1, x2, y2 = r
+        crop, mcrop = img[y1:y2, x1:x2], mask[y1:y2, x1:x2]
+        ref = reuse.match(r, crop, mcrop) if reuse else None
+        if ref is not None:
+            out[y1:y2, x1:x2] = PatchReuse.paste(crop, mcrop, ref["res"], ref["src"], reuse.feather)
+        else:
+            todo.append((r, crop, mcrop))
+    if todo:
+        results = engine.inpaint([c for _, c, _ in todo], [m for _, _, m in todo], batch_size=batch_size)
+        for (r, crop, mcrop), res in zip(todo, results):
+            x1, y1, x2, y2 = r
+            out[y1:y2, x1:x2] = res
+            if reuse:
+                reuse.add(r, crop, mcrop, res)
+    return out, rois
+
+
+def engine_rois_dir(frames_dir, masks, out_dir, engine, pad: int = 32,
+                    batch_size: int = None, flush_crops: int = 64, start_at: int = 0, checkpoint=None,
+                    reuse_thresh: float = 0.0, reuse_feather: int = None) -> dict:
+    """
+    Same contract as iopaint_rois(), but crops go to a LamaEngine as NumPy batches:
+    no CLI start-up, no model reload, no crop files. Frames are buffered only until
+    flush_crops crops are pending, then inpainted, pasted and written.
+    start_at/checkpoint as in opencv_rois_dir(). reuse_thresh > 0 enables PatchReuse:
+    matching ROIs skip the model and are filled from their reference once it is inpainted.
+    """
+    frames = as_frames(frames_dir)
+    out = as_frames(out_dir, like=frames)
+    reuse = PatchReuse(reuse_thresh, feather=reuse_feather) if reuse_thresh > 0 else None
+    files = _frame_files(frames, start_at)
+    frame_px = roi_px = crops = skipped = 0
+    pending = []  # (fname, img, mask, [(rect, ref, new)]) - ref["res"] is filled by flush()
+
+    def flush():
+        if not pending:
+            return
+        todo = [ref for _, _, _, refs in pending for (_, ref, new) in refs if new]
+        for ref, res in zip(todo, engine.inpaint([t["src"] for t in todo], [t["mask"] for t in todo],
+                                                 batch_size=batch_size)):
+            ref["res"] = res
+        outs = []
+        for fname, img, mask, refs in pending:
+            res = img.copy()
+            for (x1, y1, x2, y2), ref, new in refs:
+                res[y1:y2, x1:x2] = PatchReuse.paste(img[y1:y2, x1:x2], mask[y1:y2, x1:x2], ref["res"],
+                                                     None if new else ref["src"], reuse.feather if reuse else 0)
+            outs.append((fname, res))
+        for _ in ordered_map(lambda fo: out.write(*fo), outs):
+            pass
+        pending.clear()
+
+    for n, fname in enumerate(files):
+        mask = load_mask(masks, fname)
+        if mask is None:
+            continue
+        frame_px += mask.size
+        rois = mask_rois(mask, pad=pad)
+        if not rois:
+            skipped += 1
+            out.copy_from(frames, fname)
+            continue
+        img = frames.read(fname)
+        refs = []
+        for r in rois:
+            x1, y1, x2, y2 = r
+            crop, mcrop = img[y1:y2, x1:x2], mask[y1:y2, x1:x2]
+            ref = reuse.match(r, crop, mcrop) if reuse else None
+            if ref is not None:
+                refs.append((r, ref, False))
+            else:
+                ref = reuse.add(r, crop, mcrop) if reuse else {"src": crop, "mask": mcrop, "res": None}
+                refs.append((r, ref, True))
+                crops += 1
+        pending.append((fname, img, mask, refs))
+        roi_px += rois_area(rois)
+        # frames whose ROIs are all reused add no crops; cap buffered frames as well
+        if len(pending) >= flush_crops or sum(new for p in pending for (_, _, new) in p[3]) >= flush_crops:
+            flush()
+            if checkpoint:
+                out.flush()
+                checkpoint(start_at + n + 1)
+    flush()
+    out.flush()
+    if checkpoint:
+        checkpoint(start_at + len(files))
+
+    stats = {
+        "frames": len(files),
+        "skipped_frames": skipped,
+        "roi_crops": crops,
+        "roi_area_pct": round(100.0 * roi_px / frame_px, 2) if frame_px else 0.0,
+    }
+    if reuse:
+        stats["reuse"] = reuse.stats()
+    return stats
@@ -0,0 +1,118 @@
+import os
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from application.utils.model_registry import MODEL_REGISTRY
+
+LAMA_ONNX_PATH = os.getenv("LAMA_ONNX_PATH", "")          # e.g. models/lama_fp32.onnx (512x512 export)
+LAMA_BATCH = int(os.getenv("LAMA_BATCH", "4"))             # crops per session.run()
+LAMA_THREADS = int(os.getenv("LAMA_THREADS", "0"))         # onnxruntime intra-op threads (0 = all cores)
+LAMA_SIZE = int(os.getenv("LAMA_SIZE", "512"))             # model input side when the export is fixed-size
+
+INPAINT_BACKENDS = ("auto", "onnx", "iopaint", "opencv")
+
+
+def lama_available() -> bool:
+    if not LAMA_ONNX_PATH or not os.path.isfile(LAMA_ONNX_PATH):
+        return False
+    try:
+        import onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend(backend: str = "auto") -> str:
+    """auto -> onnx when LAMA_ONNX_PATH + onnxruntime are available, else iopaint."""
+    b = (backend or "auto").lower()
+    if b not in INPAINT_BACKENDS:
+        raise ValueError(f"inpaint_backend must be one of {', '.join(INPAINT_BACKENDS)}")
+    if b == "auto":
+        return "onnx" if lama_available() else "iopaint"
+    return b
+
+
+class LamaEngine:
+    """
+    LaMa exported to ONNX, run in-process with onnxruntime.
+    Inputs are BGR uint8 crops + uint8 masks of any size; each is reflect-padded to a
+    square, resized to the model side, batched, and mapped back. Only masked pixels
+    of the result are written over the source, so seams stay exact.
+    session.run() is thread-safe, one engine serves all requests of the process.
+    """
+
+    def __init__(self, model_path: str, device: str = "cpu", threads: int = 0, size: int = 512):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("onnxruntime is not installed")
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"LaMa ONNX model not found: {model_path}")
+
+        so = ort.SessionOptions()
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        so.intra_op_num_threads = max(0, int(threads))
+        so.inter_op_num_threads = 1
+        providers = ["CPUExecutionProvider"]
+        if device == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(model_path, so, providers=providers)
+
+        img_in, mask_in = self.session.get_inputs()[:2]
+        self.image_name, self.mask_name = img_in.name, mask_in.name
+        self.output_name = self.session.get_outputs()[0].name
+        dims = img_in.shape
+        # fixed-size exports carry ints in the shape, dynamic ones carry names/None
+        self.size = dims[2] if isinstance(dims[2], int) else int(size)
+        self.max_batch = dims[0] if isinstance(dims[0], int) else None
+
+    def _prep(self, img: np.ndarray, mask: np.ndarray):
+        h, w = img.shape[:2]
+        side = max(h, w)
+        pad = ((0, side - h), (0, side - w))
+        sq_img = np.pad(img, pad + ((0, 0),), mode="reflect" if min(h, w) > 1 else "edge")
+        sq_mask = np.pad(mask, pad, mode="constant")
+        x = cv2.resize(sq_img, (self.size, self.size), interpolation=cv2.INTER_AREA)
+        m = cv2.resize(sq_mask, (self.size, self.size), interpolation=cv2.INTER_NEAREST)
+        x = cv2.cvtColor(x, cv2.COLOR_BGR2RGB).astype(np.float32).transpose(2, 0, 1) / 255.0
+        m = (m > 0).astype(np.float32)[None]
+        return x, m, side
+
+    def inpaint(self, images: List[np.ndarray], masks: List[np.ndarray],
+                batch_size: Optional[int] = None) -> List[np.ndarray]:
+        bs = max(1, int(batch_size or LAMA_BATCH))
+        if self.max_batch:
+            bs = min(bs, self.max_batch)
+        out: List[np.ndarray] = []
+        for k in range(0, len(images), bs):
+            chunk = list(zip(images[k:k + bs], masks[k:k + bs]))
+            prepped = [self._prep(im, mk) for im, mk in chunk]
+            x = np.stack([p[0] for p in prepped])
+            m = np.stack([p[1] for p in prepped])
+            y = self.session.run([self.output_name], {self.image_name: x, self.mask_name: m})[0]
+            if y.max() <= 1.5:  # some exports return 0..1
+                y = y * 255.0
+            for (im, mk), (_, _, side), res in zip(chunk, prepped, y):
+                h, w = im.shape[:2]
+                res = np.clip(res.transpose(1, 2, 0), 0, 255).astype(np.uint8)
+                res = cv2.cvtColor(cv2.resize(res, (side, side), interpolation=cv2.INTER_CUBIC), cv2.COLOR_RGB2BGR)
+                merged = im.copy()
+                sel = mk > 0
+                merged[sel] = res[:h, :w][sel]
+                out.append(merged)
+        return out
+
+
+def get_lama_engine(device: str = "cpu", threads: Optional[int] = None) -> LamaEngine:
+    """Shared LamaEngine for LAMA_ONNX_PATH (loaded once per process through MODEL_REGISTRY)."""
+    if not LAMA_ONNX_PATH:
+        raise RuntimeError("LAMA_ONNX_PATH is not set")
+    dev = (device or "cpu").lower()
+    n_threads = LAMA_THREADS if threads is None else int(threads)
+    return MODEL_REGISTRY.get(
+        "lama_onnx", (LAMA_ONNX_PATH, n_threads), dev,
+        lambda: LamaEngine(LAMA_ONNX_PATH, device=dev, threads=n_threads, size=LAMA_SIZE),
+        est_bytes=400 * 1024 * 1024,
+    )
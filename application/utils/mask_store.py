@@ -0,0 +1,148 @@
+import os, json, zlib, struct, threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x1, y1, x2, y2 (inclusive, as drawn by cv2.rectangle)
+
+_MAGIC = b"MSK1"
+
+
+def rle_encode(mask: Optional[np.ndarray]) -> bytes:
+    """Run lengths of a binary mask (row-major), starting with a run of zeros; uint32 LE."""
+    if mask is None:
+        return b""
+    flat = (mask.reshape(-1) > 0).astype(np.int8)
+    if not flat.any():
+        return b""
+    change = np.flatnonzero(np.diff(flat)) + 1
+    bounds = np.concatenate(([0], change, [flat.size]))
+    runs = np.diff(bounds).astype("<u4")
+    if flat[0]:
+        runs = np.concatenate((np.zeros(1, "<u4"), runs))
+    return runs.tobytes()
+
+
+def rle_decode(data: bytes, W: int, H: int) -> np.ndarray:
+    if not data:
+        return np.zeros((H, W), dtype=np.uint8)
+    runs = np.frombuffer(data, dtype="<u4").astype(np.int64)
+    ends = np.cumsum(runs)
+    starts = ends - runs
+    # +1 at the start of every "on" run, -1 at its end; the running sum is the mask
+    delta = np.zeros(W * H + 1, dtype=np.int32)
+    np.add.at(delta, starts[1::2], 1)
+    np.add.at(delta, ends[1::2], -1)
+    return (np.cumsum(delta[:-1]) > 0).astype(np.uint8).reshape(H, W) * 255
+
+
+class MaskStoreWriter:
+    """
+    Append-only writer for one mask file: per frame a box list + an RLE of the
+    pixel-threshold part, each record zlib-compressed; static mask, names, smoothing
+    radius and the record index go in a JSON footer. A 1080p frame with a caption
+    bar is tens of bytes instead of a multi-KB PNG.
+    """
+
+    def __init__(self, path: str, W: int, H: int):
+        self.path = path
+        self.W, self.H = int(W), int(H)
+        self._f = open(path + ".tmp", "wb")
+        self._f.write(_MAGIC)
+        self._offsets: List[int] = []
+        self._names: List[str] = []
+
+    def append(self, name: str, boxes: Sequence[Box], thresh: Optional[np.ndarray] = None):
+        b = np.asarray(boxes, dtype="<i4").reshape(-1, 4)
+        rle = rle_encode(thresh)
+        payload = zlib.compress(struct.pack("<I", len(b)) + b.tobytes() + rle, 6)
+        self._offsets.append(self._f.tell())
+        self._f.write(struct.pack("<I", len(payload)) + payload)
+        self._names.append(name)
+
+    def close(self, static: Optional[np.ndarray] = None, smooth: int = 0):
+        if int(smooth) < 0:
+            raise ValueError("smooth must be >= 0")
+        footer = json.dumps({
+            "W": self.W, "H": self.H, "smooth": int(smooth), "names": self._names,
+            "offsets": self._offsets, "static": zlib.compress(rle_encode(static)).hex(),
+        }).encode()
+        self._f.write(footer + struct.pack("<Q", len(footer)))
+        self._f.close()
+        os.replace(self.path + ".tmp", self.path)  # readers never see a half-written store
+
+
+class MaskStore:
+    """
+    Reader: rasterizes a frame's mask only when asked for it.
+    mask(i) = static | union of raw masks i-smooth..i+smooth (raw = boxes | threshold RLE),
+    i.e. the same result the PNG pipeline wrote. The file is small enough to keep in
+    memory; recent raw masks are cached so in-order access rasterizes each frame once.
+    Thread-safe (inpaint stages read it from a pool).
+    """
+
+    def __init__(self, path: str, cache: int = 16):
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != _MAGIC:
+            raise ValueError(f"Not a mask store: {path}")
+        (flen,) = struct.unpack("<Q", data[-8:])
+        meta = json.loads(data[-8 - flen:-8])
+        self.W, self.H = meta["W"], meta["H"]
+        self.smooth = max(0, int(meta["smooth"]))  # a negative window would drop each frame's own mask
+        self.names = meta["names"]
+        self._index = {n: i for i, n in enumerate(self.names)}
+        self._data = data
+        self._offsets = meta["offsets"]
+        static = zlib.decompress(bytes.fromhex(meta["static"]))
+        self.static = rle_decode(static, self.W, self.H) if static else None
+        self._cache = OrderedDict()
+        self._cache_size = max(cache, 2 * self.smooth + 2)
+        self._lock = threading.Lock()
+        self.size_bytes = len(data)
+
+    def __len__(self):
+        return len(self.names)
+
+    def record(self, i: int) -> Tuple[List[Box], bytes]:
+        off = self._offsets[i]
+        (plen,) = struct.unpack_from("<I", self._data, off)
+        raw = zlib.decompress(self._data[off + 4:off + 4 + plen])
+        (nb,) = struct.unpack_from("<I", raw, 0)
+        boxes = np.frombuffer(raw, dtype="<i4", count=nb * 4, offset=4).reshape(-1, 4)
+        return [tuple(int(v) for v in b) for b in boxes], raw[4 + nb * 16:]
+
+    def _raw(self, i: int) -> np.ndarray:
+        with self._lock:
+            m = self._cache.get(i)
+            if m is not None:
+                self._cache.move_to_end(i)
+                return m
+        boxes, rle = self.record(i)
+        m = rle_decode(rle, self.W, self.H)
+        for (x1, y1, x2, y2) in boxes:
+            cv2.rectangle(m, (x1, y1), (x2, y2), 255, -1)
+        with self._lock:
+            self._cache[i] = m
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return m
+
+    def mask(self, i: int) -> np.ndarray:
+        m = self.static.copy() if self.static is not None else np.zeros((self.H, self.W), np.uint8)
+        for j in range(max(0, i - self.smooth), min(len(self.names), i + self.smooth + 1)):
+            m = cv2.bitwise_or(m, self._raw(j))
+        return m
+
+    def mask_for(self, name: str) -> Optional[np.ndarray]:
+        i = self._index.get(name)
+        return None if i is None else self.mask(i)
+
+
+def load_mask(masks, name: str) -> Optional[np.ndarray]:
+    """Mask for a frame file from a MaskStore or a folder of per-frame PNGs."""
+    if isinstance(masks, MaskStore):
+        return masks.mask_for(name)
+    return cv2.imread(os.path.join(masks, name), cv2.IMREAD_GRAYSCALE)
@@ -0,0 +1,275 @@
+import os, time, uuid, resource, threading
+from typing import Optional
+
+from application.utils.model_registry import _rss_bytes
+from application.utils.ocr_detect import DETECT_MAX_SIDE, detect_scale
+from application.utils.parallel import FRAME_THREADS
+
+MB = 1024 * 1024
+
+# Working-set model used by estimate_job_bytes (bytes; calibrate against the measured
+# peaks from benchmarks/bench_memory.py). Models themselves are budgeted by MODEL_REGISTRY.
+MEM_JOB_OVERHEAD = int(os.getenv("MEM_JOB_OVERHEAD_MB", "64")) * MB         # ffmpeg pipes, interpreter churn
+MEM_PROCESS_BASE = int(os.getenv("MEM_PROCESS_BASE_MB", "450")) * MB       # a spawned segment worker + its models
+MEM_DETECT_BYTES_PER_PX = int(os.getenv("MEM_DETECT_BYTES_PER_PX", "48"))  # detector activations per input pixel
+MEM_MASK_RECORD_BYTES = int(os.getenv("MEM_MASK_RECORD_BYTES", "2048"))    # MaskStore record + index per frame
+
+# Share of the instance (cgroup limit, else MemTotal) that running jobs may reserve;
+# JOB_MEM_BUDGET_MB overrides it, 0 everywhere disables admission control
+JOB_MEM_FRACTION = float(os.getenv("JOB_MEM_FRACTION", "0.6"))
+JOB_MEM_BUDGET_MB = int(os.getenv("JOB_MEM_BUDGET_MB", "0"))
+# How long a job waits for other jobs to release memory before giving up (seconds)
+MEM_WAIT_SEC = float(os.getenv("MEM_WAIT_SEC", "30"))        # synchronous requests
+JOB_MEM_WAIT_SEC = float(os.getenv("JOB_MEM_WAIT_SEC", "900"))  # background jobs
+
+MEM_MODES = ("frames", "stream", "segments", "static")
+
+
+class MemoryBudgetError(RuntimeError):
+    """A job does not fit the memory budget (now, or at all)."""
+
+
+def _read_int(path: str) -> int:
+    try:
+        with open(path) as f:
+            v = f.read().strip()
+        return 0 if v == "max" else int(v)
+    except (OSError, ValueError):
+        return 0
+
+
+def _mem_total() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return 0
+
+
+def instance_memory_bytes() -> int:
+    """Memory this container may use: the cgroup limit (v2, then v1) capped by MemTotal; 0 if unknown."""
+    limits = [v for v in (_read_int("/sys/fs/cgroup/memory.max"),
+                          _read_int("/sys/fs/cgroup/memory/memory.limit_in_bytes"),
+                          _mem_total()) if 0 < v < 1 << 60]
+    return min(limits) if limits else 0
+
+
+def estimate_job_bytes(mode: str, W: int, H: int, frames: int, *, smooth: int = 1, threads: int = None,
+                       workers: int = 1, detect_max_side: int = None, ram_scratch: bool = False,
+                       samples: int = 32) -> dict:
+    """
+    Peak working set of one video job, from the probed size and frame count.
+      frames   heatmap + one frame of mask generation + the inpaint look-ahead + the
+               MaskStore (read whole) + MaskStore's raster cache; with ram_scratch the
+               frames/ and inpainted/ sets too (tmpfs pages are RAM)
+      stream   heatmap + box lists + the 2*smooth+1 mask window + the ordered_map look-ahead;
+               flat in clip length apart from the box lists
+      segments `workers` spawned processes, each a stream job plus its own interpreter/models
+      static   the sampled gray stack + the median/std/edge work images
+    Returns {"mode", "bytes", "parts": {name: bytes}}.
+    """
+    if mode not in MEM_MODES:
+        raise ValueError(f"mode must be one of {', '.join(MEM_MODES)}")
+    W, H, N = max(1, int(W)), max(1, int(H)), max(1, int(frames))
+    px = W * H
+    frame, mask = 3 * px, px
+    threads = max(1, int(threads or FRAME_THREADS))
+    window = 2 * max(0, int(smooth)) + 1
+    max_side = DETECT_MAX_SIDE if detect_max_side is None else max(0, int(detect_max_side))
+    s = detect_scale(W, H, max_side)
+    # in flight per frame: source, output, mask, smoothing temporaries
+    look_ahead = 2 * threads * (2 * frame + 2 * mask)
+
+    if mode == "segments":
+        n = max(1, int(workers))
+        per = estimate_job_bytes("stream", W, H, -(-N // n), smooth=smooth, threads=threads,
+                                 detect_max_side=max_side)["bytes"]
+        parts = {"overhead": MEM_JOB_OVERHEAD, "workers": n * (per + MEM_PROCESS_BASE)}
+        return {"mode": mode, "bytes": int(sum(parts.values())), "parts": parts}
+
+    parts = {"overhead": MEM_JOB_OVERHEAD}
+    if mode == "static":
+        n = max(1, int(samples))
+        parts["sample_stack"] = n * mask
+        parts["stack_stats"] = 2 * n * mask + 6 * 4 * px  # median/std sort copies + float planes
+    else:
+        parts["heatmap"] = 4 * px
+        parts["detector"] = int(MEM_DETECT_BYTES_PER_PX * px * s * s) + frame  # activations + resized copy
+        if mode == "frames":
+            parts["mask_pass"] = frame + 3 * mask + 4 * px  # frame, gray, thresh, float increment
+            parts["mask_store"] = N * MEM_MASK_RECORD_BYTES
+            parts["mask_cache"] = max(16, window + 1) * mask
+            parts["inpaint_look_ahead"] = look_ahead
+            if ram_scratch:
+                parts["ram_scratch"] = 2 * N * frame
+        else:
+            parts["boxes"] = N * 200
+            parts["smooth_window"] = window * (frame + mask)
+            parts["inpaint_look_ahead"] = look_ahead
+    return {"mode": mode, "bytes": int(sum(parts.values())), "parts": parts}
+
+
+class MemoryAdmission:
+    """
+    Admission control for memory-heavy jobs: every job reserves its estimated
+    working set before it starts and releases it when done. A job larger than the
+    whole budget is refused at once (MemoryBudgetError); one that fits but not next
+    to the jobs already running waits up to `timeout` seconds for them to finish.
+    budget_bytes <= 0 admits everything (reservations are still counted for stats).
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = int(budget_bytes)
+        self._reserved = {}   # token -> bytes
+        self._cond = threading.Condition()
+        self.admitted = 0
+        self.waited = 0
+        self.refused = 0
+        self.wait_sec = 0.0
+
+    def _fits(self, need: int) -> bool:
+        return self.budget_bytes <= 0 or sum(self._reserved.values()) + need <= self.budget_bytes
+
+    def free_bytes(self) -> Optional[int]:
+        """Budget not reserved by running jobs (None when unlimited)."""
+        with self._cond:
+            if self.budget_bytes <= 0:
+                return None
+            return max(0, self.budget_bytes - sum(self._reserved.values()))
+
+    def acquire(self, need: int, timeout: float = 0.0, on_wait=None) -> str:
+        """
+        Reserve `need` bytes and return a token for release(). on_wait(free_bytes) is
+        called once (outside the lock) when the job has to queue behind others.
+        """
+        need = max(0, int(need))
+        if 0 < self.budget_bytes < need:
+            with self._cond:
+                self.refused += 1
+            raise MemoryBudgetError(f"Job needs ~{need // MB} MB, more than the {self.budget_bytes // MB} MB "
+                                    f"memory budget of this instance; use mode=stream or a smaller input")
+        token = uuid.uuid4().hex
+        with self._cond:
+            if self._fits(need):
+                self._reserved[token] = need
+                self.admitted += 1
+                return token
+            free = max(0, self.budget_bytes - sum(self._reserved.values()))
+        if on_wait:
+            on_wait(free)
+        t0 = time.monotonic()
+        with self._cond:
+            self.waited += 1
+            while not self._fits(need):
+                left = timeout - (time.monotonic() - t0)
+                if left <= 0:
+                    self.refused += 1
+                    self.wait_sec += time.monotonic() - t0
+                    raise MemoryBudgetError(f"Timed out after {timeout:.0f}s waiting for {need // MB} MB "
+                                            f"of the memory budget; retry later")
+                self._cond.wait(left)
+            self.wait_sec += time.monotonic() - t0
+            self._reserved[token] = need
+            self.admitted += 1
+        return token
+
+    def release(self, token: Optional[str]):
+        if not token:
+            return
+        with self._cond:
+            if self._reserved.pop(token, None) is not None:
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "reserved_bytes": sum(self._reserved.values()),
+                "running": len(self._reserved),
+                "admitted": self.admitted,
+                "waited": self.waited,
+                "refused": self.refused,
+                "wait_sec": round(self.wait_sec, 1),
+            }
+
+
+MEM_ADMISSION = MemoryAdmission(JOB_MEM_BUDGET_MB * MB if JOB_MEM_BUDGET_MB
+                                else int(instance_memory_bytes() * JOB_MEM_FRACTION))
+
+
+class PhaseMemory:
+    """
+    Peak RSS per phase of a job: a daemon thread samples /proc/self/statm every
+    `interval` seconds and charges the sample to the phase set last (phase()).
+    RSS is process-wide, so with concurrent jobs the figures include their
+    neighbours. Child processes (ffmpeg, segment workers) are not in RSS; their
+    largest peak since server start is children_peak_mb.
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self._phases = {}       # name -> {"start_mb", "peak_mb", "sec"}
+        self._current = None
+        self._since = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._rss0 = 0
+
+    def _sample(self):
+        rss = _rss_bytes() / MB
+        with self._lock:
+            cur = self._phases.get(self._current)
+            if cur is not None and rss > cur["peak_mb"]:
+                cur["peak_mb"] = rss
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def phase(self, name: str):
+        if name == self._current:
+            return
+        rss = _rss_bytes() / MB
+        now = time.monotonic()
+        with self._lock:
+            prev = self._phases.get(self._current)
+            if prev is not None:
+                prev["peak_mb"] = max(prev["peak_mb"], rss)
+                prev["sec"] += now - self._since
+            cur = self._phases.setdefault(name, {"start_mb": rss, "peak_mb": rss, "sec": 0.0})
+            cur["peak_mb"] = max(cur["peak_mb"], rss)
+            self._current, self._since = name, now
+
+    def __enter__(self):
+        self._rss0 = _rss_bytes()
+        self.phase("start")
+        self._thread = threading.Thread(target=self._loop, name="phase-memory", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.phase("end")
+        return False
+
+    def stats(self) -> dict:
+        self._sample()
+        with self._lock:
+            phases = {k: {"start_mb": round(v["start_mb"], 1), "peak_mb": round(v["peak_mb"], 1),
+                          "sec": round(v["sec"], 2)}
+                      for k, v in self._phases.items() if k != "end"}
+        peak = max((v["peak_mb"] for v in phases.values()), default=0.0)
+        return {
+            "rss_start_mb": round(self._rss0 / MB, 1),
+            "rss_peak_mb": peak,
+            "rss_growth_mb": round(peak - self._rss0 / MB, 1),
+            # ru_maxrss is KiB on Linux
+            "children_peak_mb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1),
+            "phases": phases,
+        }
@@ -0,0 +1,154 @@
+import os, time, threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """
+    Process-wide cache of heavy models keyed by (kind, config, device).
+    - get() loads lazily; concurrent requests for the same key wait for one load
+    - entries are sized by the RSS delta of their load (or est_bytes when that
+      reads as 0) and evicted least-recently-used once the total exceeds budget_bytes
+    - an evicted model stays valid for callers already holding it; memory is
+      released when they drop their reference
+    - most of these models are not re-entrant: callers that share one hold
+      use_lock() of its key around inference
+    """
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = int(budget_bytes)
+        self._entries = OrderedDict()   # key -> dict (LRU order, most recent last)
+        self._load_locks = {}           # key -> Lock
+        self._use_locks = {}            # key -> Lock (outlives eviction: holders of an evicted model still serialize)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_sec_total = 0.0
+
+    def get(self, kind: str, config: Hashable, device: str, loader: Callable[[], Any],
+            est_bytes: Optional[int] = None) -> Any:
+        key = (kind, config, device)
+        with self._lock:
+            e = self._entries.get(key)
+            if e:
+                self._touch(key, e)
+                return e["model"]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            with self._lock:
+                e = self._entries.get(key)
+                if e:  # loaded by another thread while we waited
+                    self._touch(key, e)
+                    return e["model"]
+                self.misses += 1
+
+            rss0 = _rss_bytes()
+            t0 = time.perf_counter()
+            model = loader()
+            load_sec = time.perf_counter() - t0
+            size = max(0, _rss_bytes() - rss0) or int(est_bytes or 0)
+
+            with self._lock:
+                self._entries[key] = {
+                    "model": model, "size": size, "load_sec": load_sec,
+                    "hits": 0, "loaded_at": time.time(), "last_used": time.time(),
+                }
+                self.load_sec_total += load_sec
+                self._evict(keep=key)
+            return model
+
+    def use_lock(self, kind: str, config: Hashable, device: str) -> threading.Lock:
+        """Lock serializing inference on the shared model of a key."""
+        with self._lock:
+            return self._use_locks.setdefault((kind, config, device), threading.Lock())
+
+    def _touch(self, key, e):
+        self.hits += 1
+        e["hits"] += 1
+        e["last_used"] = time.time()
+        self._entries.move_to_end(key)
+
+    def _evict(self, keep=None):
+        used = sum(e["size"] for e in self._entries.values())
+        for key in list(self._entries.keys()):
+            if used <= self.budget_bytes:
+                break
+            if key == keep:
+                continue
+            used -= self._entries.pop(key)["size"]
+            self.evictions += 1
+
+    def drop(self, kind: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [k for k in self._entries if kind is None or k[0] == kind]
+            for k in keys:
+                self._entries.pop(k)
+            return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            models = [
+                {"kind": k[0], "config": repr(k[1]), "device": k[2], "size_bytes": e["size"],
+                 "load_sec": round(e["load_sec"], 3), "hits": e["hits"], "last_used": int(e["last_used"])}
+                for k, e in self._entries.items()
+            ]
+            lookups = self.hits + self.misses
+            return {
+                "budget_bytes": self.budget_bytes,
+                "used_bytes": sum(m["size_bytes"] for m in models),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "load_sec_total": round(self.load_sec_total, 3),
+                "models": models,
+            }
+
+MODEL_REGISTRY = ModelRegistry(budget_bytes=int(os.getenv("MODEL_RAM_BUDGET_MB", "4096")) * 1024 * 1024)
+
+
+class SharedEasyOcrReader:
+    """
+    easyocr.Reader shared by concurrent requests and frame threads. The reader is not
+    re-entrant, so readtext()/detect() run one at a time; other attributes pass through.
+    """
+
+    def __init__(self, reader, lock: threading.Lock):
+        self.reader = reader
+        self._lock = lock
+
+    def readtext(self, *args, **kwargs):
+        with self._lock:
+            return self.reader.readtext(*args, **kwargs)
+
+    def detect(self, *args, **kwargs):
+        with self._lock:
+            return self.reader.detect(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name in ("reader", "_lock"):  # not set yet (copy/unpickle)
+            raise AttributeError(name)
+        return getattr(self.reader, name)
+
+
+def get_easyocr_reader(ocr_langs: str = "en", device: str = "cpu"):
+    """Shared, call-serialized easyocr.Reader for a language set/device (built once per process)."""
+    langs = tuple(l.strip() for l in (ocr_langs or "en").split(",") if l.strip()) or ("en",)
+    dev = (device or "cpu").lower()
+
+    def load():
+        import easyocr
+        return SharedEasyOcrReader(easyocr.Reader(list(langs), gpu=(dev == "cuda")),
+                                   MODEL_REGISTRY.use_lock("easyocr", langs, dev))
+
+    return MODEL_REGISTRY.get("easyocr", langs, dev, load, est_bytes=300 * 1024 * 1024)
@@ -0,0 +1,265 @@
+import os, time, threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import cv2
+import numpy as np
+
+from application.utils.model_registry import MODEL_REGISTRY, get_easyocr_reader
+
+# longest side a frame is downscaled to before text detection (0 = full resolution)
+DETECT_MAX_SIDE = int(os.getenv("OCR_DETECT_MAX_SIDE", "0"))
+
+# readtext: EasyOCR detection + recognition (original behaviour)
+# detect  : EasyOCR's CRAFT detector only, no recognition
+# east/db : OpenCV DNN text detection models (CPU), no EasyOCR at all
+OCR_DETECTORS = ("readtext", "detect", "east", "db")
+OCR_DETECTOR = os.getenv("OCR_DETECTOR", "readtext")
+OCR_EAST_MODEL = os.getenv("OCR_EAST_MODEL", "")   # e.g. models/frozen_east_text_detection.pb
+OCR_DB_MODEL = os.getenv("OCR_DB_MODEL", "")       # e.g. models/DB_TD500_resnet50.onnx
+OCR_DNN_SIDE = int(os.getenv("OCR_DNN_SIDE", "736"))  # DNN input longer side (multiple of 32)
+
+# off: detect every frame asked for; job: per-request cache; shared: process-wide LRU across jobs
+OCR_CACHE_MODES = ("off", "job", "shared")
+OCR_CACHE = os.getenv("OCR_CACHE", "off")
+OCR_CACHE_ENTRIES = int(os.getenv("OCR_CACHE_ENTRIES", "4096"))  # LRU size (shared and per job)
+OCR_CACHE_HASH = int(os.getenv("OCR_CACHE_HASH", "16"))          # dHash grid side -> side^2 bits
+# a hash hit is only used when the stored gray thumbnail (longer side OCR_CACHE_VERIFY_SIDE)
+# differs from the frame's by at most OCR_CACHE_VERIFY_DIFF levels anywhere: an equal dHash
+# alone does not tell a different caption on the same background apart
+OCR_CACHE_VERIFY_SIDE = int(os.getenv("OCR_CACHE_VERIFY_SIDE", "96"))
+OCR_CACHE_VERIFY_DIFF = int(os.getenv("OCR_CACHE_VERIFY_DIFF", "12"))
+
+
+def detect_scale(W: int, H: int, max_side: int) -> float:
+    """Factor (<= 1) that brings the longer side down to max_side; 1.0 when disabled or already small."""
+    side = max(W, H)
+    if not max_side or side <= max_side:
+        return 1.0
+    return max_side / float(side)
+
+
+def _quad(points) -> List[List[float]]:
+    return [[float(x), float(y)] for (x, y) in points]
+
+
+class EasyOcrDetector:
+    """readtext()-compatible wrapper around easyocr.Reader.detect(): boxes only, text '' / conf 1.0."""
+
+    name = "detect"
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def readtext(self, img: np.ndarray):
+        horizontal, free = self.reader.detect(img)
+        out = []
+        for (x1, x2, y1, y2) in (horizontal[0] if horizontal else []):
+            out.append((_quad([(x1, y1), (x2, y1), (x2, y2), (x1, y2)]), "", 1.0))
+        for pts in (free[0] if free else []):
+            out.append((_quad(pts), "", 1.0))
+        return out
+
+
+class DnnTextDetector:
+    """
+    OpenCV DNN text detection (EAST or DB) with the readtext() result shape:
+    quads in source pixels, text '' and the model's confidence (1.0 for DB).
+    The input is resized so its longer side is `side` (both sides multiples of 32).
+    Net.forward is not re-entrant, so calls are serialized.
+    """
+
+    def __init__(self, kind: str, model_path: str, side: int = 736):
+        if not model_path or not os.path.isfile(model_path):
+            raise FileNotFoundError(f"{kind} text detection model not found: {model_path or '(unset)'}")
+        self.name = kind
+        self.side = max(32, int(side) // 32 * 32)
+        if kind == "east":
+            self.model = cv2.dnn_TextDetectionModel_EAST(model_path)
+            self.model.setConfidenceThreshold(0.5).setNMSThreshold(0.4)
+            self.model.setInputParams(1.0, (self.side, self.side), (123.68, 116.78, 103.94), True)
+        else:
+            self.model = cv2.dnn_TextDetectionModel_DB(model_path)
+            self.model.setBinaryThreshold(0.3).setPolygonThreshold(0.5)
+            self.model.setUnclipRatio(2.0).setMaxCandidates(200)
+            self.model.setInputParams(1.0 / 255.0, (self.side, self.side),
+                                      (122.67891434, 116.66876762, 104.00698793), False)
+        self.model.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.model.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self._lock = threading.Lock()
+
+    def _input_size(self, W: int, H: int):
+        s = self.side / float(max(W, H))
+        return max(32, int(round(W * s / 32)) * 32), max(32, int(round(H * s / 32)) * 32)
+
+    def readtext(self, img: np.ndarray):
+        H, W = img.shape[:2]
+        with self._lock:
+            self.model.setInputSize(self._input_size(W, H))
+            quads, confs = self.model.detect(img)
+        if len(confs) != len(quads):
+            confs = [1.0] * len(quads)
+        return [(_quad(q), "", float(c)) for q, c in zip(quads, confs)]
+
+
+def check_detector(detector: str = None) -> str:
+    d = (detector or OCR_DETECTOR).lower()
+    if d not in OCR_DETECTORS:
+        raise ValueError(f"ocr_detector must be one of {', '.join(OCR_DETECTORS)}")
+    return d
+
+
+def get_text_detector(detector: str = None, ocr_langs: str = "en", device: str = "cpu"):
+    """
+    Object with EasyOCR's readtext(img) -> [(bbox, text, conf)] interface for a detector name.
+    Models are shared per process through MODEL_REGISTRY.
+    """
+    d = check_detector(detector)
+    if d == "readtext":
+        return get_easyocr_reader(ocr_langs, device)
+    if d == "detect":
+        return EasyOcrDetector(get_easyocr_reader(ocr_langs, device))
+    path = OCR_EAST_MODEL if d == "east" else OCR_DB_MODEL
+    return MODEL_REGISTRY.get("text_dnn", (d, path, OCR_DNN_SIDE), "cpu",
+                              lambda: DnnTextDetector(d, path, OCR_DNN_SIDE), est_bytes=100 * 1024 * 1024)
+
+
+def frame_hash(img: np.ndarray, size: int = 16) -> bytes:
+    """
+    Difference hash: gray thumbnail of (size+1) x size (area-averaged, so codec noise
+    cancels out), one bit per horizontal neighbor comparison. Identical and
+    near-identical frames (screen recordings, slides, held shots) hash equal.
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    small = cv2.resize(gray, (size + 1, size), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1]).tobytes()
+
+
+def verify_thumb(img: np.ndarray, side: int = 96) -> np.ndarray:
+    """Area-averaged gray thumbnail (longer side `side`) kept next to cached detections."""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    H, W = gray.shape[:2]
+    s = min(1.0, side / float(max(W, H)))
+    return cv2.resize(gray, (max(1, round(W * s)), max(1, round(H * s))), interpolation=cv2.INTER_AREA)
+
+
+class OcrCache:
+    """Thread-safe LRU of (verify thumbnail, detection results) keyed by (detector config, frame size, frame_hash)."""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            res = self._entries.get(key)
+            if res is not None:
+                self._entries.move_to_end(key)
+            return res
+
+    def put(self, key, results):
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+SHARED_OCR_CACHE = OcrCache(OCR_CACHE_ENTRIES)
+
+
+def check_ocr_cache(mode: str = None) -> str:
+    m = (mode or OCR_CACHE).lower()
+    if m not in OCR_CACHE_MODES:
+        raise ValueError(f"ocr_cache must be one of {', '.join(OCR_CACHE_MODES)}")
+    return m
+
+
+class ScaledTextReader:
+    """
+    Drop-in for an EasyOCR Reader's readtext(): detection runs on a copy downscaled
+    so the longer side is at most max_side, and the returned box points are mapped
+    back to source pixels (text/confidence untouched). Callers pad the boxes
+    afterwards, so padding stays in source pixels. Caption-size text is found
+    reliably at ~720p, and detector cost scales with pixel count, so 4K input runs
+    roughly (1/scale)^2 faster. Detection time is accumulated for stats().
+    With a cache (OcrCache), frames whose frame_hash was seen before reuse the stored
+    source-pixel results once verify_thumb() confirms the content matches (a rejected
+    hit is detected again and replaces the entry); cache_ns must identify the detector
+    config (name, languages).
+    """
+
+    def __init__(self, reader, max_side: int = None, cache: Optional[OcrCache] = None, cache_ns=()):
+        self.reader = reader
+        self.max_side = DETECT_MAX_SIDE if max_side is None else max(0, int(max_side))
+        self.scale = 1.0
+        self.calls = 0
+        self.seconds = 0.0
+        self.cache = cache
+        self.cache_ns = tuple(cache_ns)
+        self.cache_hits = 0
+        self.cache_rejects = 0
+
+    def readtext(self, img: np.ndarray):
+        t0 = time.perf_counter()
+        H, W = img.shape[:2]
+        key = thumb = None
+        if self.cache is not None:
+            key = (self.cache_ns, self.max_side, W, H, frame_hash(img, OCR_CACHE_HASH))
+            thumb = verify_thumb(img, OCR_CACHE_VERIFY_SIDE)
+            cached = self.cache.get(key)
+            if cached is not None:
+                if cv2.absdiff(cached[0], thumb).max() <= OCR_CACHE_VERIFY_DIFF:
+                    self.cache_hits += 1
+                    return list(cached[1])
+                self.cache_rejects += 1
+        s = self.scale = detect_scale(W, H, self.max_side)
+        if s < 1.0:
+            img = cv2.resize(img, (max(1, round(W * s)), max(1, round(H * s))), interpolation=cv2.INTER_AREA)
+        results = self.reader.readtext(img)
+        if s < 1.0:
+            results = [([(float(x) / s, float(y) / s) for (x, y) in bbox], text, conf)
+                       for (bbox, text, conf) in results]
+        if key is not None:
+            self.cache.put(key, (thumb, list(results)))
+        self.calls += 1
+        self.seconds += time.perf_counter() - t0
+        return results
+
+    def stats(self) -> dict:
+        return {
+            "detector": getattr(self.reader, "name", "readtext"),
+            "detect_max_side": self.max_side,
+            "detect_scale": round(self.scale, 4),
+            # detector work is ~linear in pixels: the expected speedup over full resolution
+            "detect_pixel_reduction": round(1.0 / (self.scale * self.scale), 2),
+            "detect_calls": self.calls,
+            "detect_sec": round(self.seconds, 3),
+            "detect_ms_per_call": round(1000.0 * self.seconds / self.calls, 1) if self.calls else 0.0,
+            "ocr_cache": "off" if self.cache is None else ("shared" if self.cache is SHARED_OCR_CACHE else "job"),
+            "cache_hits": self.cache_hits,
+            "cache_rejects": self.cache_rejects,  # hash matched, content did not
+            "cache_hit_rate": round(self.cache_hits / (self.cache_hits + self.calls), 3)
+            if self.cache is not None and (self.cache_hits + self.calls) else None,
+        }
+
+
+def make_text_reader(detector: str = None, ocr_langs: str = "en", device: str = "cpu",
+                     max_side: int = None, cache: str = None) -> ScaledTextReader:
+    """
+    Detector (get_text_detector) behind ScaledTextReader with the requested OCR cache:
+    off, job (fresh per call) or shared (SHARED_OCR_CACHE, reused across jobs).
+    """
+    d, mode = check_detector(detector), check_ocr_cache(cache)
+    store = None
+    if mode == "job":
+        store = OcrCache(OCR_CACHE_ENTRIES)
+    elif mode == "shared":
+        store = SHARED_OCR_CACHE
+    langs = tuple(l.strip() for l in (ocr_langs or "en").split(",") if l.strip())
+    return ScaledTextReader(get_text_detector(d, ocr_langs, device), max_side,
+                            cache=store, cache_ns=(d, langs))
@@ -0,0 +1,37 @@
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# OpenCV / PNG codec calls release the GIL, so plain threads scale per-frame work
+FRAME_THREADS = int(os.getenv("FRAME_THREADS", str(os.cpu_count() or 2)))
+
+
+def ordered_map(fn: Callable[[T], R], items: Iterable[T], workers: Optional[int] = None,
+                max_pending: Optional[int] = None) -> Iterator[R]:
+    """
+    map() over a thread pool that yields results in input order.
+    `items` is consumed lazily with at most max_pending (default 2*workers) tasks in
+    flight, so frames streamed through it stay bounded in memory. workers<=1 runs inline.
+    """
+    workers = max(1, int(workers or FRAME_THREADS))
+    if workers == 1:
+        for it in items:
+            yield fn(it)
+        return
+
+    max_pending = max(workers, int(max_pending or 2 * workers))
+    pending = deque()
+    ex = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for it in items:
+            pending.append(ex.submit(fn, it))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,98 @@
+from typing import Callable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Box = Tuple[int, int, int, int]  # x1, y1, x2, y2 (inclusive, source pixels)
+
+
+class SparseTextTracker:
+    """
+    Run an expensive text detector only on keyframes and carry its boxes forward.
+
+    A frame is (re)detected when:
+      - it is the first frame, or `every` frames passed since the last detection
+      - a scene change is seen (mean abs diff of a 64x36 thumbnail vs the last
+        detected frame > scene_thresh, on a 0..255 scale)
+      - template tracking of any box drops below min_conf (text changed/moved away)
+    In between, each box is relocated with normalized cross-correlation of its
+    keyframe patch inside a window of +-search_pad px. Text that appears between
+    keyframes is picked up at the next keyframe, so keep `every` <= the mask
+    smoothing horizon you care about.
+    """
+
+    def __init__(self, detect_fn: Callable[[np.ndarray], List[Box]], every: int = 10,
+                 scene_thresh: float = 30.0, min_conf: float = 0.6, search_pad: int = 24):
+        self.detect_fn = detect_fn
+        self.every = max(1, int(every))
+        self.scene_thresh = float(scene_thresh)
+        self.min_conf = float(min_conf)
+        self.search_pad = int(search_pad)
+
+        self._key_thumb: Optional[np.ndarray] = None
+        self._templates: List[Tuple[Box, np.ndarray]] = []
+        self._since_detect = 0
+
+        self.frames = 0
+        self.ocr_calls = 0
+        self.scene_cuts = 0
+        self.low_conf_redetects = 0
+
+    @staticmethod
+    def _thumb(gray: np.ndarray) -> np.ndarray:
+        return cv2.resize(gray, (64, 36), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def _detect(self, img: np.ndarray, gray: np.ndarray, thumb: np.ndarray) -> List[Box]:
+        boxes = self.detect_fn(img)
+        self.ocr_calls += 1
+        self._since_detect = 0
+        self._key_thumb = thumb
+        self._templates = [((x1, y1, x2, y2), gray[y1:y2 + 1, x1:x2 + 1].copy()) for (x1, y1, x2, y2) in boxes]
+        return list(boxes)
+
+    def _track(self, gray: np.ndarray) -> Optional[List[Box]]:
+        H, W = gray.shape[:2]
+        out: List[Box] = []
+        p = self.search_pad
+        for (x1, y1, x2, y2), tpl in self._templates:
+            th, tw = tpl.shape[:2]
+            sx1, sy1 = max(0, x1 - p), max(0, y1 - p)
+            sx2, sy2 = min(W, x2 + 1 + p), min(H, y2 + 1 + p)
+            search = gray[sy1:sy2, sx1:sx2]
+            if th < 2 or tw < 2 or search.shape[0] < th or search.shape[1] < tw:
+                return None
+            res = cv2.matchTemplate(search, tpl, cv2.TM_CCOEFF_NORMED)
+            _, conf, _, loc = cv2.minMaxLoc(res)
+            if not np.isfinite(conf) or conf < self.min_conf:
+                return None
+            nx1, ny1 = sx1 + loc[0], sy1 + loc[1]
+            out.append((nx1, ny1, nx1 + tw - 1, ny1 + th - 1))
+        return out
+
+    def boxes(self, img: np.ndarray, gray: Optional[np.ndarray] = None) -> List[Box]:
+        if gray is None:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        thumb = self._thumb(gray)
+        self.frames += 1
+        self._since_detect += 1
+
+        if self._key_thumb is None or self._since_detect >= self.every:
+            return self._detect(img, gray, thumb)
+        if float(np.abs(thumb - self._key_thumb).mean()) > self.scene_thresh:
+            self.scene_cuts += 1
+            return self._detect(img, gray, thumb)
+        tracked = self._track(gray)
+        if tracked is None:
+            self.low_conf_redetects += 1
+            return self._detect(img, gray, thumb)
+        return tracked
+
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "ocr_calls": self.ocr_calls,
+            "ocr_every": self.every,
+            "scene_cuts": self.scene_cuts,
+            "low_conf_redetects": self.low_conf_redetects,
+            "ocr_reduction": round(self.frames / self.ocr_calls, 2) if self.ocr_calls else None,
+        }
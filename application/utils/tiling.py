@@ -0,0 +1,96 @@
+import os
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from application.utils.parallel import ordered_map
+
+Rect = Tuple[int, int, int, int]  # x1, y1, x2, y2 (end-exclusive, source pixels)
+
+# Images whose longer side exceeds TILE_MIN_SIDE are detected and inpainted in
+# TILE_SIZE tiles overlapping by TILE_OVERLAP px (0 disables auto-tiling)
+TILE_SIZE = int(os.getenv("INPAINT_TILE_SIZE", "2048"))
+TILE_OVERLAP = int(os.getenv("INPAINT_TILE_OVERLAP", "128"))
+TILE_MIN_SIDE = int(os.getenv("INPAINT_TILE_MIN_SIDE", "4096"))
+
+
+def resolve_tile(W: int, H: int, tile: int = None) -> int:
+    """Tile side for an image: explicit tile (0 = off), else TILE_SIZE once it is larger than TILE_MIN_SIDE."""
+    if tile is None:
+        tile = TILE_SIZE if TILE_MIN_SIDE and max(W, H) > TILE_MIN_SIDE else 0
+    tile = max(0, int(tile))
+    return tile if tile and max(W, H) > tile else 0
+
+
+def tile_grid(W: int, H: int, tile: int, overlap: int) -> List[Rect]:
+    """Row-major tiles of side <= tile covering W x H; neighbours share `overlap` px, the last row/column is flush."""
+    overlap = max(0, min(int(overlap), tile // 2))
+    step = tile - overlap
+
+    def starts(n: int) -> List[int]:
+        if n <= tile:
+            return [0]
+        s = list(range(0, n - tile, step))
+        return s + [n - tile]
+
+    return [(x, y, min(W, x + tile), min(H, y + tile)) for y in starts(H) for x in starts(W)]
+
+
+def detect_tiled(reader, img: np.ndarray, tile: int, overlap: int) -> list:
+    """
+    reader.readtext() per tile, boxes shifted back to image pixels. Detector memory
+    follows the tile, not the image. Text cut by a tile edge is found (at least in
+    part) by both neighbours, so overlap should exceed the tallest expected line;
+    duplicates are harmless because the boxes are only rasterized into one mask.
+    Tiles run one after another: EasyOCR readers and DNN nets are not re-entrant.
+    """
+    H, W = img.shape[:2]
+    results = []
+    for (x1, y1, x2, y2) in tile_grid(W, H, tile, overlap):
+        for (bbox, text, conf) in reader.readtext(img[y1:y2, x1:x2]):
+            results.append(([(float(x) + x1, float(y) + y1) for (x, y) in bbox], text, conf))
+    return results
+
+
+def _feather(h: int, w: int, covered: np.ndarray, ramp: int, left: bool, top: bool) -> np.ndarray:
+    """
+    Weight (0..1] of a new tile's pixels: 1 where no earlier tile wrote, otherwise a
+    linear ramp from the tile's own left/top edge (where it has a neighbour) across the overlap band.
+    """
+    ramp = max(1, int(ramp))
+    ax = np.minimum(1.0, (np.arange(w, dtype=np.float32) + 1) / ramp) if left else np.ones(w, np.float32)
+    ay = np.minimum(1.0, (np.arange(h, dtype=np.float32) + 1) / ramp) if top else np.ones(h, np.float32)
+    alpha = np.minimum(ay[:, None], ax[None, :])
+    alpha[~covered] = 1.0
+    return alpha
+
+
+def inpaint_tiled(img: np.ndarray, mask: np.ndarray, fn: Callable[[Rect, np.ndarray, np.ndarray], np.ndarray],
+                  tile: int, overlap: int, workers: int = None) -> Tuple[np.ndarray, dict]:
+    """
+    fn(rect, tile_img, tile_mask) -> inpainted tile, for every tile that has mask pixels,
+    on `workers` threads (ordered_map: at most 2*workers tiles in flight). Results are
+    blended back in row-major order: in the band an earlier tile already wrote, the new
+    tile fades in linearly over `overlap` px, so no seam lines up with a tile edge.
+    Only masked pixels are written; everything else is the input untouched.
+    """
+    H, W = img.shape[:2]
+    overlap = max(0, min(int(overlap), tile // 2))
+    grid = tile_grid(W, H, tile, overlap)
+    todo = [r for r in grid if mask[r[1]:r[3], r[0]:r[2]].any()]
+    out = img.copy()
+    covered = np.zeros((H, W), dtype=bool)
+
+    def work(r: Rect):
+        x1, y1, x2, y2 = r
+        return r, fn(r, img[y1:y2, x1:x2], mask[y1:y2, x1:x2])
+
+    for (x1, y1, x2, y2), res in ordered_map(work, todo, workers=workers):
+        sel = mask[y1:y2, x1:x2] > 0
+        cov = covered[y1:y2, x1:x2]
+        a = _feather(y2 - y1, x2 - x1, cov, overlap, x1 > 0, y1 > 0)[sel][:, None]
+        region = out[y1:y2, x1:x2]
+        region[sel] = (a * res[sel] + (1.0 - a) * region[sel]).round().astype(np.uint8)
+        cov[:] = True
+
+    return out, {"tile": tile, "tile_overlap": overlap, "tiles": len(grid), "tiles_inpainted": len(todo)}
@@ -27,6 +27,9 @@ from application.v1.resources.version import ns_version
 from application.v1.resources.overlay_text import ns_overlay
 from application.v1.resources.video_trim import ns_trim
 from application.v1.resources.video_crop import ns_crop
+from application.v1.resources.publish import ns_publish
+from application.v1.resources.workspace import ns_workspace
+from application.v1.resources.model_registry import ns_models
 
 def register_namespaces(api):
     api.add_namespace(ns_version)
@@ -34,6 +37,9 @@ def register_namespaces(api):
     api.add_namespace(ns_overlay)
     api.add_namespace(ns_trim)
     api.add_namespace(ns_crop)
+    api.add_namespace(ns_publish)
+    api.add_namespace(ns_workspace)
+    api.add_namespace(ns_models)
 
 # api.add_namespace(ns_health)
 # api.add_namespace(ns_auth)
@@ -1,7 +1,10 @@
-from flask import current_app, request, jsonify
+import io, os, json
+from flask import current_app, request, jsonify, send_file
 from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
+from application.workspace import WORKSPACE
 from application.v1.services.inpaint_image_service import InpaintImageService
+from application.v1.services.inpaint_image_batch_service import InpaintImageBatchService
 
 ns_text_inpaint = Namespace(
     "TextInpaint",
@@ -13,6 +16,13 @@ parser = ns_text_inpaint.parser()
 parser.add_argument("image", location="files", type=FileStorage, required=True, help="Image (png/jpg/jpeg/webp)")
 parser.add_argument("ocr_langs", location="form", required=False, help="OCR languages (default en)")
 parser.add_argument("device", location="form", required=False, help="cpu|cuda (default cpu)")
+parser.add_argument("inpaint_backend", location="form", required=False, help="auto|onnx|iopaint|opencv (default auto)")
+parser.add_argument("ocr_detector", location="form", required=False, help="readtext|detect|east|db text detector (default OCR_DETECTOR = readtext)")
+parser.add_argument("ocr_cache", location="form", required=False, help="off|job|shared: reuse detections for a perceptually identical image (shared = across requests; default OCR_CACHE)")
+parser.add_argument("detect_max_side", location="form", required=False, help="Run OCR detection on a copy downscaled to this longer side in px (default OCR_DETECT_MAX_SIDE, 0 = full size)")
+parser.add_argument("tile", location="form", required=False, help="Detect/inpaint in overlapping tiles of this side in px, 256..16384 (default INPAINT_TILE_SIZE for images above INPAINT_TILE_MIN_SIDE, 0 = whole image)")
+parser.add_argument("tile_overlap", location="form", required=False, help="Overlap between tiles in px, blended across (default INPAINT_TILE_OVERLAP)")
+parser.add_argument("tile_workers", location="form", required=False, help="Tiles inpainted in parallel (default FRAME_THREADS)")
 
 
 @ns_text_inpaint.route("/image")
@@ -27,6 +37,25 @@ class InpaintImageResource(Resource):
 
         ocr_langs = (request.values.get("ocr_langs") or "en")
         device = (request.values.get("device") or "cpu")
+        inpaint_backend = (request.values.get("inpaint_backend") or "auto")
+        ocr_detector = request.values.get("ocr_detector") or None
+        ocr_cache = request.values.get("ocr_cache") or None
+        try:
+            detect_max_side = int(request.values["detect_max_side"]) if request.values.get("detect_max_side") else None
+        except ValueError:
+            detect_max_side = None
+        try:
+            tile = int(request.values["tile"]) if request.values.get("tile") else None
+        except ValueError:
+            tile = None
+        try:
+            tile_overlap = int(request.values["tile_overlap"]) if request.values.get("tile_overlap") else None
+        except ValueError:
+            tile_overlap = None
+        try:
+            tile_workers = max(1, int(request.values["tile_workers"])) if request.values.get("tile_workers") else None
+        except ValueError:
+            tile_workers = None
 
         try:
             upload_dir = current_app.config.get("UPLOAD_FOLDER", "uploads")
@@ -37,7 +66,10 @@ class InpaintImageResource(Resource):
                                       work_root=upload_dir,
                                       output_root=output_root)
 
-            result = svc.process_lama(ocr_langs=ocr_langs, device=device)
+            result = svc.process_lama(ocr_langs=ocr_langs, device=device, inpaint_backend=inpaint_backend,
+                                      detect_max_side=detect_max_side, ocr_detector=ocr_detector,
+                                      ocr_cache=ocr_cache, tile=tile, tile_overlap=tile_overlap,
+                                      tile_workers=tile_workers)
             svc.cleanup()
 
             return jsonify({
@@ -46,5 +78,167 @@ class InpaintImageResource(Resource):
                 "filename": result["filename"],
                 "diagnostics": result["diagnostics"]
             })
+        except ValueError as ve:
+            return {"message": str(ve)}, 400
+        except Exception as e:
+            return {"message": f"Unexpected error: {e}"}, 500
+
+
+# in-memory endpoint: inputs above this are rejected (413) - use /image for large files
+INLINE_MAX_BYTES = int(os.getenv("INPAINT_INLINE_MAX_MB", "16")) * 1024 * 1024
+
+inline_parser = ns_text_inpaint.parser()
+inline_parser.add_argument("image", location="files", type=FileStorage, required=True, help="Image (png/jpg/jpeg/webp)")
+inline_parser.add_argument("ocr_langs", location="form", required=False, help="OCR languages (default en)")
+inline_parser.add_argument("device", location="form", required=False, help="cpu|cuda (default cpu)")
+inline_parser.add_argument("inpaint_backend", location="form", required=False, help="auto|onnx|opencv (default auto = ONNX LaMa when configured, else OpenCV)")
+inline_parser.add_argument("ocr_detector", location="form", required=False, help="readtext|detect|east|db text detector (default OCR_DETECTOR = readtext)")
+inline_parser.add_argument("ocr_cache", location="form", required=False, help="off|job|shared (default OCR_CACHE)")
+inline_parser.add_argument("detect_max_side", location="form", required=False, help="Run OCR detection on a copy downscaled to this longer side in px (default OCR_DETECT_MAX_SIDE)")
+inline_parser.add_argument("format", location="form", required=False, help="png|webp|jpeg response format (default png)")
+inline_parser.add_argument("quality", location="form", required=False, help="webp/jpeg quality 1..100 (webp 101 = lossless; default 90), png compression 0..9 (default 3)")
+
+
+@ns_text_inpaint.route("/image/inline")
+class InpaintImageInlineResource(Resource):
+    @ns_text_inpaint.expect(inline_parser)
+    @ns_text_inpaint.doc(description="Remove text from a small image entirely in memory; the response body is the "
+                                     "inpainted image, diagnostics are in the X-Inpaint-Diagnostics header.")
+    def post(self):
+        args = inline_parser.parse_args()
+        img_file = args.get("image")
+        if not img_file:
+            return {"message": "No image uploaded"}, 400
+        if not InpaintImageService.allowed_file(img_file.filename or ""):
+            return {"message": "Unsupported file type"}, 400
+
+        ocr_langs = (request.values.get("ocr_langs") or "en")
+        device = (request.values.get("device") or "cpu")
+        inpaint_backend = (request.values.get("inpaint_backend") or "auto")
+        ocr_detector = request.values.get("ocr_detector") or None
+        ocr_cache = request.values.get("ocr_cache") or None
+        fmt = (request.values.get("format") or "png")
+        try:
+            detect_max_side = int(request.values["detect_max_side"]) if request.values.get("detect_max_side") else None
+        except ValueError:
+            detect_max_side = None
+        try:
+            quality = int(request.values["quality"]) if request.values.get("quality") else None
+        except ValueError:
+            return {"message": "quality must be an integer"}, 400
+
+        try:
+            data = img_file.read(INLINE_MAX_BYTES + 1)
+            if len(data) > INLINE_MAX_BYTES:
+                return {"message": f"Image larger than {INLINE_MAX_BYTES // (1024 * 1024)} MB; use /inpaint/image"}, 413
+            result = InpaintImageService.process_bytes(data, ocr_langs=ocr_langs, device=device,
+                                                       inpaint_backend=inpaint_backend,
+                                                       detect_max_side=detect_max_side, ocr_detector=ocr_detector,
+                                                       ocr_cache=ocr_cache, fmt=fmt, quality=quality)
+            resp = send_file(io.BytesIO(result["data"]), mimetype=result["mimetype"])
+            resp.headers["X-Inpaint-Diagnostics"] = json.dumps(result["diagnostics"], separators=(",", ":"))
+            return resp
+        except ValueError as ve:
+            return {"message": str(ve)}, 400
+        except RuntimeError as re:
+            return {"message": str(re)}, 500
+        except Exception as e:
+            return {"message": f"Unexpected error: {e}"}, 500
+
+
+batch_parser = ns_text_inpaint.parser()
+batch_parser.add_argument("images", location="files", type=FileStorage, required=True, action="append",
+                          help="Upload 1+ images (png/jpg/jpeg/webp) and/or .zip archives of images under 'images'")
+batch_parser.add_argument("ocr_langs", location="form", required=False, help="OCR languages (default en)")
+batch_parser.add_argument("device", location="form", required=False, help="cpu|cuda (default cpu)")
+batch_parser.add_argument("inpaint_backend", location="form", required=False, help="auto|onnx|iopaint|opencv (default auto)")
+batch_parser.add_argument("ocr_detector", location="form", required=False, help="readtext|detect|east|db text detector (default OCR_DETECTOR = readtext)")
+batch_parser.add_argument("ocr_cache", location="form", required=False, help="off|job|shared: reuse detections for perceptually identical images (default OCR_CACHE)")
+batch_parser.add_argument("detect_max_side", location="form", required=False, help="Run OCR detection on copies downscaled to this longer side in px (default OCR_DETECT_MAX_SIDE)")
+batch_parser.add_argument("lama_batch", location="form", required=False, help="Crops per ONNX LaMa batch (default LAMA_BATCH)")
+batch_parser.add_argument("output", location="form", required=False, help="json (per-item paths + GCS URLs) | zip (the results as one zip download) (default json)")
+batch_parser.add_argument("zip", location="form", required=False, help="true|false: also bundle a zip for output=json (default false)")
+batch_parser.add_argument("publish", location="form", required=False, help="true|false: publish every result to OUTPUT_BUCKET in the background (default true)")
+
+
+@ns_text_inpaint.route("/image/batch")
+class InpaintImageBatchResource(Resource):
+    @ns_text_inpaint.expect(batch_parser)
+    @ns_text_inpaint.doc(description="Remove text from many images (or zips of images) with one shared OCR/LaMa session.")
+    def post(self):
+        args = batch_parser.parse_args()
+        files = args.get("images")
+        if not files:
+            return {"message": "Upload at least one image under 'images'."}, 400
+        if not isinstance(files, list):
+            files = [files]
+
+        def to_bool(v, d):
+            if v is None: return d
+            return str(v).lower() in ("1", "true", "yes", "on")
+
+        ocr_langs = (request.values.get("ocr_langs") or "en")
+        device = (request.values.get("device") or "cpu")
+        inpaint_backend = (request.values.get("inpaint_backend") or "auto")
+        ocr_detector = request.values.get("ocr_detector") or None
+        ocr_cache = request.values.get("ocr_cache") or None
+        output = (request.values.get("output") or "json").lower()
+        if output not in ("json", "zip"):
+            return {"message": "output must be 'json' or 'zip'"}, 400
+        make_zip = output == "zip" or to_bool(request.values.get("zip"), False)
+        publish = to_bool(request.values.get("publish"), True)
+        try:
+            detect_max_side = int(request.values["detect_max_side"]) if request.values.get("detect_max_side") else None
+        except ValueError:
+            detect_max_side = None
+        try:
+            lama_batch = max(1, int(request.values["lama_batch"])) if request.values.get("lama_batch") else None
+        except ValueError:
+            lama_batch = None
+
+        session_dir = WORKSPACE.session_dir("inpaint_batch", reserve_bytes=request.content_length or 0)
+        try:
+            output_root = current_app.config.get("INPAINT_OUTPUT", "inpaint_output")
+            bucket_name = current_app.config.get("OUTPUT_BUCKET") if publish else None
+
+            paths = InpaintImageBatchService.save_uploads(files, upload_dir=session_dir)
+            svc = InpaintImageBatchService(paths, work_root=session_dir, output_root=output_root)
+            res = svc.process(ocr_langs=ocr_langs, device=device, inpaint_backend=inpaint_backend,
+                              detect_max_side=detect_max_side, ocr_detector=ocr_detector, ocr_cache=ocr_cache,
+                              lama_batch=lama_batch, make_zip=make_zip, bucket_name=bucket_name)
+            svc.cleanup()
+            # per file, so an output still being published is never evicted
+            for path in [it.output_path for it in res.outputs if it.ok] + [res.zipped_path]:
+                WORKSPACE.track(path, kind="inpaint_batch_output")
+
+            if output == "zip":
+                if not res.zipped_path:
+                    return {"message": "No image could be processed", "diagnostics": res.diagnostics}, 422
+                return send_file(res.zipped_path, mimetype="application/zip", as_attachment=True,
+                                 download_name="inpainted.zip")
+            return jsonify({
+                "status": "ok",
+                "zip_path": res.zipped_path,
+                "outputs": [
+                    {
+                        "input": it.input_name,
+                        "output": it.output_path,
+                        "ok": it.ok,
+                        "error": it.error,
+                        "boxes": it.boxes,
+                        "gcs_url": it.gcs_url,
+                        "publish_id": it.publish_id,
+                    } for it in res.outputs
+                ],
+                "diagnostics": res.diagnostics
+            })
+        except ValueError as ve:
+            return {"message": str(ve)}, 400
+        except FileNotFoundError as fe:
+            return {"message": str(fe)}, 404
+        except RuntimeError as re:
+            return {"message": str(re)}, 500
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
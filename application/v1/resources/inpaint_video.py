@@ -1,7 +1,8 @@
 from flask import current_app, request, jsonify
 from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
-from application.v1.services.inpaint_video_service import InpaintVideoService
+from application.v1.services.inpaint_video_service import DuplicateJobError, InpaintVideoService
+from application.utils.mem_guard import MemoryBudgetError
 
 ns_video_inpaint = Namespace(
     "VideoInpaint",
@@ -16,6 +17,23 @@ parser.add_argument("bbox_pad", location="form", required=False, help="Pad OCR b
 parser.add_argument("smooth", location="form", required=False, help="Temporal smoothing radius (frames, default 1)")
 parser.add_argument("static_thresh", location="form", required=False, help="Static logo threshold 0..1 (default 0.25)")
 parser.add_argument("device", location="form", required=False, help="cpu|cuda (default cpu)")
+parser.add_argument("ocr_every", location="form", required=False, help="Run OCR every N frames, track boxes in between (default 1 = every frame)")
+parser.add_argument("mode", location="form", required=False, help="auto|frames|stream|segments|static (auto = frames when it fits the memory budget, else stream; stream = pipe-only, no PNG dirs; segments = stream on parallel GOP-aligned shards; static = fixed watermark from sampled keyframes, one ffmpeg pass; default auto)")
+parser.add_argument("workers", location="form", required=False, help="Worker processes for mode=segments (default INPAINT_SEGMENT_WORKERS)")
+parser.add_argument("scratch", location="form", required=False, help="auto|ram|disk scratch tier for frames (default auto)")
+parser.add_argument("resume", location="form", required=False, help="Checkpoint phases and resume an identical earlier request that failed (default false)")
+parser.add_argument("inpaint_backend", location="form", required=False, help="auto|onnx|iopaint|opencv (default auto = in-process LaMa ONNX when configured, else iopaint)")
+parser.add_argument("lama_batch", location="form", required=False, help="Crops per ONNX LaMa batch (default LAMA_BATCH)")
+parser.add_argument("inpaint_method", location="form", required=False, help="telea|ns for the OpenCV inpaint paths (default telea)")
+parser.add_argument("inpaint_radius", location="form", required=False, help="cv2.inpaint radius in px, 1..50 (default 3)")
+parser.add_argument("static_samples", location="form", required=False, help="mode=static: frames sampled for the overlay mask, 4..120 (default 32)")
+parser.add_argument("static_filter", location="form", required=False, help="mode=static: removelogo (mask image) | delogo (rects) (default removelogo)")
+parser.add_argument("reuse_thresh", location="form", required=False, help="Reuse an inpainted patch while its region changes less than this mean abs diff, 0..64 (default 0 = off; ~2 for talking heads/slides)")
+parser.add_argument("reuse_feather", location="form", required=False, help="Blend reused patches into the current frame over this many px at the hole edge, 0..64 (default INPAINT_REUSE_FEATHER; 0 = hard substitution)")
+parser.add_argument("ocr_cache", location="form", required=False, help="off|job|shared: reuse OCR boxes for frames with an equal perceptual hash (shared = cross-job LRU; default OCR_CACHE)")
+parser.add_argument("ocr_detector", location="form", required=False, help="readtext|detect|east|db: text detector for masks (detect/east/db skip recognition; default OCR_DETECTOR = readtext)")
+parser.add_argument("detect_max_side", location="form", required=False, help="Run OCR detection on frames downscaled to this longer side in px (default OCR_DETECT_MAX_SIDE, 0 = full size)")
+parser.add_argument("frame_format", location="form", required=False, help="png|png0|bmp|npy intermediate frames for mode=frames (png0/bmp/npy: less CPU, more disk; default png)")
 
 
 @ns_video_inpaint.route("/video")
@@ -30,6 +48,30 @@ class VideoInpaintResource(Resource):
 
         ocr_langs = request.values.get("ocr_langs", "en")
         device = request.values.get("device", "cpu")
+        scratch = request.values.get("scratch", "auto")
+        mode = request.values.get("mode", "auto")
+        inpaint_method = request.values.get("inpaint_method", "telea")
+        inpaint_backend = request.values.get("inpaint_backend", "auto")
+        frame_format = request.values.get("frame_format", "png")
+        ocr_detector = request.values.get("ocr_detector") or None
+        ocr_cache = request.values.get("ocr_cache") or None
+        static_filter = request.values.get("static_filter", "removelogo")
+        try:
+            static_samples = int(request.values.get("static_samples", 32))
+        except ValueError:
+            static_samples = 32
+        try:
+            reuse_thresh = float(request.values.get("reuse_thresh", 0.0))
+        except ValueError:
+            reuse_thresh = 0.0
+        try:
+            reuse_feather = int(request.values["reuse_feather"]) if request.values.get("reuse_feather") else None
+        except ValueError:
+            return {"message": "reuse_feather must be an integer"}, 400
+        try:
+            detect_max_side = int(request.values["detect_max_side"]) if request.values.get("detect_max_side") else None
+        except ValueError:
+            detect_max_side = None
         try:
             bbox_pad = int(request.values.get("bbox_pad", 8))
         except ValueError:
@@ -38,25 +80,72 @@ class VideoInpaintResource(Resource):
             smooth = int(request.values.get("smooth", 1))
         except ValueError:
             smooth = 1
+        if smooth < 0:
+            return {"message": "smooth must be >= 0"}, 400
         try:
             static_thresh = float(request.values.get("static_thresh", 0.25))
         except ValueError:
             static_thresh = 0.25
+        try:
+            ocr_every = max(1, int(request.values.get("ocr_every", 1)))
+        except ValueError:
+            ocr_every = 1
+        try:
+            workers = max(1, int(request.values["workers"])) if request.values.get("workers") else None
+        except ValueError:
+            workers = None
+        try:
+            inpaint_radius = int(request.values.get("inpaint_radius", 3))
+        except ValueError:
+            inpaint_radius = 3
+        try:
+            lama_batch = max(1, int(request.values["lama_batch"])) if request.values.get("lama_batch") else None
+        except ValueError:
+            lama_batch = None
+        resume = request.values.get("resume", "false").lower() in ("1", "true", "yes", "on")
 
+        svc, done = None, False
         try:
             upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
             output_root = current_app.config.get("INPAINT_OUTPUT", "inpaint_output")
 
             vpath = InpaintVideoService.save_upload(f, upload_dir=upload_dir)
-            svc = InpaintVideoService(vpath, work_root=upload_dir, output_root=output_root)
+            key = None
+            if resume:
+                key = InpaintVideoService.checkpoint_key(vpath, {
+                    "ocr_langs": ocr_langs, "bbox_pad": bbox_pad, "smooth": smooth,
+                    "static_thresh": static_thresh, "ocr_every": ocr_every, "mode": mode,
+                    "inpaint_backend": inpaint_backend, "inpaint_method": inpaint_method,
+                    "inpaint_radius": inpaint_radius, "frame_format": frame_format,
+                    "detect_max_side": detect_max_side, "ocr_detector": ocr_detector,
+                    "static_samples": static_samples, "static_filter": static_filter,
+                    "reuse_thresh": reuse_thresh, "reuse_feather": reuse_feather, "ocr_cache": ocr_cache,
+                })
+            svc = InpaintVideoService(vpath, work_root=upload_dir, output_root=output_root, resume_key=key)
             res = svc.process(
                 ocr_langs=ocr_langs,
                 bbox_pad=bbox_pad,
                 device=device,
                 smooth=smooth,
-                static_thresh=static_thresh
+                static_thresh=static_thresh,
+                scratch=scratch,
+                mode=mode,
+                ocr_every=ocr_every,
+                workers=workers,
+                inpaint_method=inpaint_method,
+                inpaint_radius=inpaint_radius,
+                inpaint_backend=inpaint_backend,
+                lama_batch=lama_batch,
+                frame_format=frame_format,
+                detect_max_side=detect_max_side,
+                ocr_detector=ocr_detector,
+                static_samples=static_samples,
+                static_filter=static_filter,
+                reuse_thresh=reuse_thresh,
+                reuse_feather=reuse_feather,
+                ocr_cache=ocr_cache
             )
-            svc.cleanup()
+            done = True
 
             return jsonify({
                 "status": "ok",
@@ -68,7 +157,14 @@ class VideoInpaintResource(Resource):
             return {"message": str(ve)}, 400
         except FileNotFoundError as fe:
             return {"message": str(fe)}, 404
+        except DuplicateJobError as de:
+            return {"message": str(de)}, 409
+        except MemoryBudgetError as me:
+            return {"message": str(me)}, 503
         except RuntimeError as re:
             return {"message": str(re)}, 500
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            if svc is not None:
+                svc.finish(done)
@@ -4,6 +4,7 @@ from werkzeug.datastructures import FileStorage
 
 from application.jobs import JOB_MANAGER
 from application.v1.services.inpaint_video_service import InpaintVideoService
+from application.utils.mem_guard import JOB_MEM_WAIT_SEC
 
 ns_jobs = Namespace("Jobs", path="/jobs/", description="Background job runner")
 
@@ -15,6 +16,23 @@ start_parser.add_argument("bbox_pad", location="form", required=False)
 start_parser.add_argument("smooth", location="form", required=False)
 start_parser.add_argument("static_thresh", location="form", required=False)
 start_parser.add_argument("device", location="form", required=False)
+start_parser.add_argument("scratch", location="form", required=False)
+start_parser.add_argument("mode", location="form", required=False, help="auto|frames|stream|segments|static (default auto = frames when it fits the memory budget, else stream)")
+start_parser.add_argument("ocr_every", location="form", required=False)
+start_parser.add_argument("workers", location="form", required=False)
+start_parser.add_argument("inpaint_backend", location="form", required=False)
+start_parser.add_argument("resume", location="form", required=False, help="Resume from checkpoints of an identical earlier job (default true)")
+start_parser.add_argument("lama_batch", location="form", required=False)
+start_parser.add_argument("inpaint_method", location="form", required=False)
+start_parser.add_argument("inpaint_radius", location="form", required=False)
+start_parser.add_argument("frame_format", location="form", required=False)
+start_parser.add_argument("detect_max_side", location="form", required=False)
+start_parser.add_argument("ocr_detector", location="form", required=False)
+start_parser.add_argument("ocr_cache", location="form", required=False)
+start_parser.add_argument("static_samples", location="form", required=False)
+start_parser.add_argument("static_filter", location="form", required=False)
+start_parser.add_argument("reuse_thresh", location="form", required=False)
+start_parser.add_argument("reuse_feather", location="form", required=False)
 
 @ns_jobs.route("/inpaint/video")
 class StartVideoInpaintJob(Resource):
@@ -27,6 +45,30 @@ class StartVideoInpaintJob(Resource):
 
         ocr_langs = request.values.get("ocr_langs", "en")
         device = request.values.get("device", "cpu")
+        scratch = request.values.get("scratch", "auto")
+        mode = request.values.get("mode", "auto")
+        inpaint_method = request.values.get("inpaint_method", "telea")
+        inpaint_backend = request.values.get("inpaint_backend", "auto")
+        frame_format = request.values.get("frame_format", "png")
+        ocr_detector = request.values.get("ocr_detector") or None
+        ocr_cache = request.values.get("ocr_cache") or None
+        static_filter = request.values.get("static_filter", "removelogo")
+        try:
+            static_samples = int(request.values.get("static_samples", 32))
+        except ValueError:
+            static_samples = 32
+        try:
+            reuse_thresh = float(request.values.get("reuse_thresh", 0.0))
+        except ValueError:
+            reuse_thresh = 0.0
+        try:
+            reuse_feather = int(request.values["reuse_feather"]) if request.values.get("reuse_feather") else None
+        except ValueError:
+            return {"message": "reuse_feather must be an integer"}, 400
+        try:
+            detect_max_side = int(request.values["detect_max_side"]) if request.values.get("detect_max_side") else None
+        except ValueError:
+            detect_max_side = None
         try:
             bbox_pad = int(request.values.get("bbox_pad", 8))
         except ValueError:
@@ -35,10 +77,29 @@ class StartVideoInpaintJob(Resource):
             smooth = int(request.values.get("smooth", 1))
         except ValueError:
             smooth = 1
+        if smooth < 0:
+            return {"message": "smooth must be >= 0"}, 400
         try:
             static_thresh = float(request.values.get("static_thresh", 0.25))
         except ValueError:
             static_thresh = 0.25
+        try:
+            ocr_every = max(1, int(request.values.get("ocr_every", 1)))
+        except ValueError:
+            ocr_every = 1
+        try:
+            workers = max(1, int(request.values["workers"])) if request.values.get("workers") else None
+        except ValueError:
+            workers = None
+        try:
+            inpaint_radius = int(request.values.get("inpaint_radius", 3))
+        except ValueError:
+            inpaint_radius = 3
+        try:
+            lama_batch = max(1, int(request.values["lama_batch"])) if request.values.get("lama_batch") else None
+        except ValueError:
+            lama_batch = None
+        resume = request.values.get("resume", "true").lower() in ("1", "true", "yes", "on")
 
         upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
         output_root = current_app.config.get("INPAINT_OUTPUT", "inpaint_output")
@@ -49,28 +110,56 @@ class StartVideoInpaintJob(Resource):
         job_id = JOB_MANAGER._new_job("video_inpaint")
 
         def runner():
+            svc, done = None, False
             try:
-                svc = InpaintVideoService(vpath, work_root=upload_dir, output_root=output_root)
+                key = None
+                if resume:
+                    key = InpaintVideoService.checkpoint_key(vpath, {
+                        "ocr_langs": ocr_langs, "bbox_pad": bbox_pad, "smooth": smooth,
+                        "static_thresh": static_thresh, "ocr_every": ocr_every, "mode": mode,
+                        "inpaint_backend": inpaint_backend, "inpaint_method": inpaint_method,
+                        "inpaint_radius": inpaint_radius, "frame_format": frame_format,
+                        "detect_max_side": detect_max_side, "ocr_detector": ocr_detector,
+                        "static_samples": static_samples, "static_filter": static_filter,
+                        "reuse_thresh": reuse_thresh, "reuse_feather": reuse_feather, "ocr_cache": ocr_cache,
+                    })
+                svc = InpaintVideoService(vpath, work_root=upload_dir, output_root=output_root, resume_key=key)
                 res = svc.process(
                     ocr_langs=ocr_langs,
                     bbox_pad=bbox_pad,
                     device=device,
                     smooth=smooth,
                     static_thresh=static_thresh,
+                    scratch=scratch,
+                    mode=mode,
+                    ocr_every=ocr_every,
+                    workers=workers,
+                    inpaint_method=inpaint_method,
+                    inpaint_radius=inpaint_radius,
+                    inpaint_backend=inpaint_backend,
+                    lama_batch=lama_batch,
+                    frame_format=frame_format,
+                    detect_max_side=detect_max_side,
+                    ocr_detector=ocr_detector,
+                    static_samples=static_samples,
+                    static_filter=static_filter,
+                    reuse_thresh=reuse_thresh,
+                    reuse_feather=reuse_feather,
+                    ocr_cache=ocr_cache,
+                    mem_wait=JOB_MEM_WAIT_SEC,  # queue behind running jobs instead of failing fast
                     progress_cb=lambda p, **d: JOB_MANAGER.set_progress(job_id, p, **d)
                 )
-                svc.cleanup()
+                done = True
                 JOB_MANAGER.set_result(job_id, res.output_path, res.diagnostics)
             except Exception as e:
                 JOB_MANAGER.set_error(job_id, str(e))
+            finally:
+                if svc is not None:
+                    svc.finish(done)
 
         # submit to thread pool
         JOB_MANAGER.set_progress(job_id, 1, phase="queued")
-        JOB_MANAGER.exec.submit(runner)
-        # flip to running immediately (optional)
-        JOB_MANAGER.set_progress(job_id, 2, phase="started")
-        with JOB_MANAGER._lock:
-            JOB_MANAGER._jobs[job_id]["status"] = "RUNNING"
+        JOB_MANAGER.submit(job_id, runner)
 
         return jsonify({"job_id": job_id, "status": "RUNNING", "progress": 2})
 
@@ -83,6 +172,17 @@ class JobStatusResource(Resource):
             return {"message": "Job not found"}, 404
         return jsonify(job)
 
+# Retry a failed job (resumes from its checkpoints)
+@ns_jobs.route("/<string:job_id>/retry")
+class JobRetryResource(Resource):
+    def post(self, job_id):
+        job = JOB_MANAGER.get(job_id)
+        if not job:
+            return {"message": "Job not found"}, 404
+        if not JOB_MANAGER.retry(job_id):
+            return {"message": "Only failed or canceled jobs can be retried"}, 409
+        return jsonify({"job_id": job_id, "status": "RUNNING"})
+
 # Cancel job (best-effort)
 @ns_jobs.route("/<string:job_id>/cancel")
 class JobCancelResource(Resource):
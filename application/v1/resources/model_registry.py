@@ -0,0 +1,26 @@
+from flask import jsonify
+from flask_restx import Namespace, Resource
+
+from application.workers import api_key_required
+from application.utils.model_registry import MODEL_REGISTRY
+
+ns_models = Namespace(
+    "Models",
+    path="/models/",
+    description="Process-wide model cache (EasyOCR, faster-whisper, Argos): memory budget and hit/miss metrics."
+)
+
+
+@ns_models.route("/")
+class ModelRegistryStatsResource(Resource):
+    @ns_models.doc(description="Loaded models, their size/load time, hits/misses and evictions.")
+    def get(self):
+        return jsonify(MODEL_REGISTRY.stats())
+
+
+@ns_models.route("/drop")
+class ModelRegistryDropResource(Resource):
+    @ns_models.doc(description="Unload all cached models (they reload lazily on next use).")
+    @api_key_required
+    def post(self):
+        return jsonify({"dropped": MODEL_REGISTRY.drop(), "stats": MODEL_REGISTRY.stats()})
@@ -2,6 +2,7 @@ from flask import current_app, request, jsonify
 from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
 from application.v1.services.overlay_text_service import OverlayTextService
+from application.workspace import WORKSPACE
 import os
 from application.workers import api_key_required
 
@@ -62,14 +63,15 @@ class OverlayTextResource(Resource):
             boxborderw = 10
         fontfile   = request.values.get("fontfile")  # optional
 
+        session_dir = WORKSPACE.session_dir("overlay", reserve_bytes=request.content_length or 0)
+
         try:
-            upload_dir = current_app.config.get("UPLOAD_FOLDER", "/tmp/uploads")
             output_root = current_app.config.get("OVERLAY_OUTPUT", "/tmp/overlay_output")
             bucket_name = current_app.config.get("OUTPUT_BUCKET", "media-ai-api-output")
             bucket_name = "media-ai-api-output"
 
-            vpath = OverlayTextService.save_upload(f, upload_dir)
-            svc = OverlayTextService(vpath, work_root=upload_dir, output_root=output_root)
+            vpath = OverlayTextService.save_upload(f, session_dir)
+            svc = OverlayTextService(vpath, work_root=session_dir, output_root=output_root)
 
             res = svc.process(
                 text=text, x=x, y=y, start=start, end=end,
@@ -78,12 +80,18 @@ class OverlayTextResource(Resource):
                 fontfile=fontfile,
                 bucket_name=bucket_name
             )
+            svc.cleanup()
+            WORKSPACE.track(res.output_path, kind="overlay_output")
+
             return jsonify({
                 "status": "ok",
                 "result_path": res.output_path,  # internal /tmp path
                 "filename": os.path.basename(res.output_path),
                 "gcs_url": res.diagnostics.get("gcs_url"),  # 👈 public-ish location
+                "publish_id": res.diagnostics.get("publish_id"),  # poll /publish/<id>
                 "diagnostics": res.diagnostics,
             })
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
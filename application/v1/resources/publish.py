@@ -0,0 +1,20 @@
+from flask import jsonify
+from flask_restx import Namespace, Resource
+
+from application.publisher import PUBLISH_MANAGER
+
+ns_publish = Namespace(
+    "Publish",
+    path="/publish/",
+    description="Status of background output uploads (PUBLISHING -> PUBLISHED | FAILED)."
+)
+
+
+@ns_publish.route("/<string:publish_id>")
+class PublishStatusResource(Resource):
+    @ns_publish.doc(description="Poll the publish_id returned in a result's diagnostics.")
+    def get(self, publish_id):
+        item = PUBLISH_MANAGER.get(publish_id)
+        if not item:
+            return {"message": "Publish not found"}, 404
+        return jsonify(item)
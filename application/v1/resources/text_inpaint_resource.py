@@ -15,7 +15,14 @@ class TextInpaintRemoveResource(Resource):
         security="apikey",
         description=(
             "Upload a video file to remove detected overlay text using EasyOCR + LaMa (iopaint). "
-            "Form fields: file (required), ocr_langs='en', fps=30, device in {'cpu','cuda'}."
+            "Form fields: file (required), ocr_langs='en', fps=30, device in {'cpu','cuda'}, "
+            "scratch in {'auto','ram','disk'} (tmpfs for intermediate frames when memory allows), "
+            "inpaint_backend in {'auto','onnx','iopaint','opencv'} (auto = in-process LaMa ONNX when configured), "
+            "frame_format in {'png','png0','bmp','npy'} (intermediate frames; png0/bmp/npy trade disk for CPU), "
+            "detect_max_side=N (run OCR detection on frames downscaled to N px on the longer side), "
+            "ocr_detector in {'readtext','detect','east','db'} (detector-only backends skip text recognition), "
+            "reuse_thresh=0..64 (reuse inpainted patches across near-identical frames, 0 = off), "
+            "ocr_cache in {'off','job','shared'} (reuse detections of perceptually identical frames)."
         )
     )
     @api_key_required
@@ -5,6 +5,7 @@ from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
 
 from application.v1.services.video_crop_service import VideoCropService
+from application.workspace import WORKSPACE
 
 ns_crop = Namespace(
     "VideoCrop",
@@ -83,15 +84,16 @@ class VideoCropResource(Resource):
         if not manual_ok and not aspect:
             return {"message": "Provide either x,y,width,height OR aspect=9:16"}, 400
 
+        session_dir = WORKSPACE.session_dir("crop", reserve_bytes=request.content_length or 0)
+
         try:
-            upload_dir  = current_app.config.get("UPLOAD_FOLDER", "/tmp/uploads")
             output_root = current_app.config.get("CROP_OUTPUT", "/tmp/crop_output")
             bucket_name = current_app.config.get("OUTPUT_BUCKET", "media-ai-api-output")
             # if you want to force a fixed bucket like overlay:
             # bucket_name = "media-ai-api-output"
 
-            vpath = VideoCropService.save_upload(f, upload_dir=upload_dir)
-            svc = VideoCropService(vpath, work_root=upload_dir, output_root=output_root)
+            vpath = VideoCropService.save_upload(f, upload_dir=session_dir)
+            svc = VideoCropService(vpath, work_root=session_dir, output_root=output_root)
             res = svc.process(
                 x=x, y=y, width=width, height=height,
                 aspect=aspect, mode=mode,
@@ -101,11 +103,15 @@ class VideoCropResource(Resource):
                 bucket_name=bucket_name,
             )
 
+            svc.cleanup()
+            WORKSPACE.track(res.output_path, kind="crop_output")
+
             return jsonify({
                 "status": "ok",
                 "result_path": res.output_path,
                 "filename": os.path.basename(res.output_path),
                 "gcs_url": res.diagnostics.get("gcs_url"),
+                "publish_id": res.diagnostics.get("publish_id"),
                 "diagnostics": res.diagnostics,
             })
         except ValueError as ve:
@@ -116,3 +122,5 @@ class VideoCropResource(Resource):
             return {"message": str(re)}, 500
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
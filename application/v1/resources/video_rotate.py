@@ -2,6 +2,7 @@ from flask import current_app, request, jsonify
 from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
 from application.v1.services.video_rotate_service import VideoRotateService
+from application.workspace import WORKSPACE
 
 ns_rotate = Namespace("VideoRotate", path="/video/rotate/", description="Rotate video 90/180/270 degrees")
 
@@ -34,14 +35,20 @@ class VideoRotateResource(Resource):
         preset = request.values.get("preset", "veryfast")
         copy_audio = to_bool(request.values.get("copy_audio"), True)
 
+        session_dir = WORKSPACE.session_dir("rotate", reserve_bytes=request.content_length or 0)
+
         try:
-            upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
             output_root = current_app.config.get("ROTATE_OUTPUT", "rotate_output")
 
-            vpath = VideoRotateService.save_upload(f, upload_dir=upload_dir)
-            svc = VideoRotateService(vpath, work_root=upload_dir, output_root=output_root)
+            vpath = VideoRotateService.save_upload(f, upload_dir=session_dir)
+            svc = VideoRotateService(vpath, work_root=session_dir, output_root=output_root)
             res = svc.process(degrees=degrees, metadata_only=metadata_only, crf=crf, preset=preset, copy_audio=copy_audio)
 
+            svc.cleanup()
+            WORKSPACE.track(res.output_path, kind="rotate_output")
+
             return jsonify({"status":"ok","result_path": res.output_path,"filename": res.output_path.split("/")[-1],"diagnostics": res.diagnostics})
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
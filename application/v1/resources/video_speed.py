@@ -2,6 +2,7 @@ from flask import current_app, request, jsonify
 from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
 from application.v1.services.video_speed_service import VideoSpeedService
+from application.workspace import WORKSPACE
 
 ns_speed = Namespace("VideoSpeed", path="/video/speed/", description="Change playback speed for video+audio")
 
@@ -30,14 +31,20 @@ class VideoSpeedResource(Resource):
         crf = to_int(request.values.get("crf"), 18)
         preset = request.values.get("preset", "veryfast")
 
+        session_dir = WORKSPACE.session_dir("speed", reserve_bytes=request.content_length or 0)
+
         try:
-            upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
             output_root = current_app.config.get("SPEED_OUTPUT", "speed_output")
 
-            vpath = VideoSpeedService.save_upload(f, upload_dir=upload_dir)
-            svc = VideoSpeedService(vpath, work_root=upload_dir, output_root=output_root)
+            vpath = VideoSpeedService.save_upload(f, upload_dir=session_dir)
+            svc = VideoSpeedService(vpath, work_root=session_dir, output_root=output_root)
             res = svc.process(factor=factor, crf=crf, preset=preset)
 
+            svc.cleanup()
+            WORKSPACE.track(res.output_path, kind="speed_output")
+
             return jsonify({"status":"ok","result_path": res.output_path,"filename": res.output_path.split("/")[-1],"diagnostics": res.diagnostics})
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
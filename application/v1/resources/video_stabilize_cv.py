@@ -22,6 +22,7 @@ parser.add_argument("zoom_percent",     location="form", required=False, help="C
 parser.add_argument("keep_audio",       location="form", required=False, help="true|false (default true)")
 parser.add_argument("crf",              location="form", required=False, help="x264 CRF (default 18)")
 parser.add_argument("preset",           location="form", required=False, help="x264 preset (default veryfast)")
+parser.add_argument("single_pass",      location="form", required=False, help="true|false: decode once with a smoothing_radius look-ahead (default true); false = estimate, then re-decode to warp")
 
 @ns_stab_cv.route("/")
 class VideoStabilizeCVResource(Resource):
@@ -53,6 +54,7 @@ class VideoStabilizeCVResource(Resource):
         keep_audio         = to_bool(request.values.get("keep_audio"), True)
         crf                = to_int(request.values.get("crf"), 18)
         preset             = request.values.get("preset", "veryfast")
+        single_pass        = to_bool(request.values.get("single_pass"), True)
 
         try:
             upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
@@ -70,7 +72,8 @@ class VideoStabilizeCVResource(Resource):
                 zoom_percent=zoom_percent,
                 keep_audio=keep_audio,
                 crf=crf,
-                preset=preset
+                preset=preset,
+                single_pass=single_pass
             )
             svc.cleanup()
 
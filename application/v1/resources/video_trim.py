@@ -4,6 +4,7 @@ from werkzeug.datastructures import FileStorage
 import os
 
 from application.v1.services.video_trim_service import VideoTrimService
+from application.workspace import WORKSPACE
 
 ns_trim = Namespace(
     "VideoTrim",
@@ -50,13 +51,14 @@ class VideoTrimResource(Resource):
         preset   = request.values.get("preset", "veryfast")
         copy_a   = to_bool(request.values.get("copy_audio"), True)
 
+        session_dir = WORKSPACE.session_dir("trim", reserve_bytes=request.content_length or 0)
+
         try:
-            upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
             output_root = current_app.config.get("TRIM_OUTPUT", "trim_output")
             bucket_name = current_app.config.get("OUTPUT_BUCKET", "media-ai-api-output")
 
-            vpath = VideoTrimService.save_upload(f, upload_dir=upload_dir)
-            svc = VideoTrimService(vpath, work_root=upload_dir, output_root=output_root)
+            vpath = VideoTrimService.save_upload(f, upload_dir=session_dir)
+            svc = VideoTrimService(vpath, work_root=session_dir, output_root=output_root)
 
             res = svc.process(
                 start=start, end=end, duration=duration,
@@ -64,12 +66,16 @@ class VideoTrimResource(Resource):
                 bucket_name=bucket_name,
             )
 
+            svc.cleanup()
+            WORKSPACE.track(res.output_path, kind="trim_output")
+
             return jsonify({
                 "status": "ok",
                 "result_path": res.output_path,
                 "filename": res.output_path.split("/")[-1],
                 "diagnostics": res.diagnostics,
                 "gcs_uri": res.diagnostics.get("gcs_url"),
+                "publish_id": res.diagnostics.get("publish_id"),
             })
         except ValueError as ve:
             return {"message": str(ve)}, 400
@@ -79,3 +85,5 @@ class VideoTrimResource(Resource):
             return {"message": str(re)}, 500
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
@@ -3,6 +3,7 @@ from flask_restx import Resource, Namespace
 from werkzeug.datastructures import FileStorage
 
 from application.v1.services.video_watermark_service import VideoWatermarkService
+from application.workspace import WORKSPACE
 
 ns_wm = Namespace(
     "VideoWatermark",
@@ -60,14 +61,15 @@ class VideoWatermarkResource(Resource):
         preset    = request.values.get("preset", "veryfast")
         copy_audio= to_bool(request.values.get("copy_audio"), True)
 
+        session_dir = WORKSPACE.session_dir("watermark", reserve_bytes=request.content_length or 0)
+
         try:
-            upload_dir  = current_app.config.get("UPLOAD_FOLDER", "uploads")
             output_root = current_app.config.get("WATERMARK_OUTPUT", "watermark_output")
 
-            vpath = VideoWatermarkService.save_upload(f_vid, upload_dir, VideoWatermarkService.ALLOWED_VIDEO)
-            ipath = VideoWatermarkService.save_upload(f_img, upload_dir, VideoWatermarkService.ALLOWED_IMAGE)
+            vpath = VideoWatermarkService.save_upload(f_vid, session_dir, VideoWatermarkService.ALLOWED_VIDEO)
+            ipath = VideoWatermarkService.save_upload(f_img, session_dir, VideoWatermarkService.ALLOWED_IMAGE)
 
-            svc = VideoWatermarkService(vpath, ipath, work_root=upload_dir, output_root=output_root)
+            svc = VideoWatermarkService(vpath, ipath, work_root=session_dir, output_root=output_root)
             res = svc.process(
                 position=position, margin_x=margin_x, margin_y=margin_y,
                 opacity=opacity, scale_pct=scale_pct,
@@ -75,6 +77,9 @@ class VideoWatermarkResource(Resource):
                 crf=crf, preset=preset, copy_audio=copy_audio
             )
 
+            svc.cleanup()
+            WORKSPACE.track(res.output_path, kind="watermark_output")
+
             return jsonify({
                 "status": "ok",
                 "result_path": res.output_path,
@@ -89,3 +94,5 @@ class VideoWatermarkResource(Resource):
             return {"message": str(re)}, 500
         except Exception as e:
             return {"message": f"Unexpected error: {e}"}, 500
+        finally:
+            WORKSPACE.release(session_dir)
@@ -0,0 +1,35 @@
+from flask import jsonify
+from flask_restx import Namespace, Resource
+
+from application.workers import api_key_required
+from application.workspace import WORKSPACE
+from application.utils.mem_guard import MEM_ADMISSION
+
+ns_workspace = Namespace(
+    "Workspace",
+    path="/workspace/",
+    description="Scratch disk usage (uploads/outputs) and quota garbage collection."
+)
+
+
+@ns_workspace.route("/")
+class WorkspaceStatsResource(Resource):
+    @ns_workspace.doc(description="Quota, bytes in use per kind, pinned sessions and eviction totals.")
+    def get(self):
+        return jsonify(WORKSPACE.stats())
+
+
+@ns_workspace.route("/gc")
+class WorkspaceGCResource(Resource):
+    @ns_workspace.doc(description="Run TTL/LRU eviction now.")
+    @api_key_required
+    def post(self):
+        res = WORKSPACE.gc()
+        return jsonify({**res, "stats": WORKSPACE.stats()})
+
+
+@ns_workspace.route("/memory")
+class MemoryAdmissionResource(Resource):
+    @ns_workspace.doc(description="Job memory budget, bytes reserved by running jobs, queued/refused counts.")
+    def get(self):
+        return jsonify(MEM_ADMISSION.stats())
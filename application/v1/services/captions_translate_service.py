@@ -7,6 +7,8 @@ from werkzeug.utils import secure_filename
 import argostranslate.package as argos_package
 import argostranslate.translate as argos_translate
 
+from application.utils.model_registry import MODEL_REGISTRY
+
 
 @dataclass
 class CaptionsTranslateResult:
@@ -207,19 +209,24 @@ class CaptionsTranslateService:
         # Ensure Argos model and translator
         src = (source_lang or "").strip().lower() or None
         tgt = target_lang.strip().lower()
-        self._ensure_model(src or "en", tgt)  # if src unknown, try en->tgt (fallback)
-        translator = self._get_translator(src, tgt)
+        def load_translator():
+            self._ensure_model(src or "en", tgt)  # if src unknown, try en->tgt (fallback)
+            return self._get_translator(src, tgt)
+
+        # cached per (src, tgt): skips package index lookups and model reloads on warm requests
+        translator = MODEL_REGISTRY.get("argos", (src, tgt), "cpu", load_translator, est_bytes=200 * 1024 ** 2)
 
-        # Translate text per entry
+        # Translate text per entry (the shared translator serves one request at a time)
         out_entries = []
-        for e in entries:
-            txt = e.get("text") or ""
-            try:
-                ttxt = translator.translate(txt) if txt else ""
-            except Exception:
-                # fallback: leave original if translation fails (rare)
-                ttxt = txt
-            out_entries.append({"start": e.get("start"), "end": e.get("end"), "text": ttxt})
+        with MODEL_REGISTRY.use_lock("argos", (src, tgt), "cpu"):
+            for e in entries:
+                txt = e.get("text") or ""
+                try:
+                    ttxt = translator.translate(txt) if txt else ""
+                except Exception:
+                    # fallback: leave original if translation fails (rare)
+                    ttxt = txt
+                out_entries.append({"start": e.get("start"), "end": e.get("end"), "text": ttxt})
 
         # Write JSON always
         with open(self.out_json, "w", encoding="utf-8") as f:
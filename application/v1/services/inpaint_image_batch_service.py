@@ -0,0 +1,271 @@
+import os, time, uuid, shutil, zipfile
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+from werkzeug.utils import secure_filename
+
+from application.publisher import PUBLISH_MANAGER
+from application.utils.frame_io import FrameDir
+from application.utils.inpaint_ops import engine_rois_dir, iopaint_rois, opencv_rois_dir
+from application.utils.lama_engine import get_lama_engine, resolve_backend
+from application.utils.ocr_detect import make_text_reader
+from application.utils.parallel import ordered_map
+
+BATCH_MAX_ITEMS = int(os.getenv("INPAINT_BATCH_MAX_ITEMS", "500"))
+BATCH_MAX_ITEM_MB = int(os.getenv("INPAINT_BATCH_MAX_ITEM_MB", "64"))  # per image, also inside zips
+BATCH_MAX_TOTAL_MB = int(os.getenv("INPAINT_BATCH_MAX_TOTAL_MB", "2048"))  # all images of one batch, unpacked
+
+
+@dataclass
+class BatchInpaintItem:
+    input_name: str
+    output_path: Optional[str]
+    ok: bool
+    error: Optional[str]
+    boxes: int = 0
+    gcs_url: Optional[str] = None
+    publish_id: Optional[str] = None
+
+
+@dataclass
+class BatchInpaintResult:
+    outputs: List[BatchInpaintItem]
+    zipped_path: Optional[str]        # path to .zip if make_zip=True, else None
+    diagnostics: Dict
+
+
+class InpaintImageBatchService:
+    """
+    Text removal over many images with one detector and one inpaint model:
+      1) every image is decoded once (thread pool); OCR runs on the decoded array and the
+         frame + its box mask are staged as one frame set (png0, no zlib)
+      2) the whole set goes through the folder pipelines used for video frames:
+         ONNX LaMa batches crops across images, iopaint runs once for all of them,
+         OpenCV runs on the thread pool
+      3) results are written as PNGs named after the inputs, optionally zipped and/or
+         published to GCS one by one
+    Images that fail to decode are reported per item and do not fail the batch.
+    """
+
+    ALLOWED = {"png", "jpg", "jpeg", "webp"}
+
+    @staticmethod
+    def allowed(name: str) -> bool:
+        return "." in name and name.rsplit(".", 1)[1].lower() in InpaintImageBatchService.ALLOWED
+
+    @staticmethod
+    def _copy_limited(src, path: str, name: str, budget: List[int]) -> int:
+        """
+        Copy src to path counting the bytes actually written: declared zip sizes are not
+        trusted. Stops at BATCH_MAX_ITEM_MB for the item or when budget[0] (bytes left
+        for the batch) runs out; the partial file is removed.
+        """
+        item_max = BATCH_MAX_ITEM_MB * 1024 * 1024
+        n = 0
+        try:
+            with open(path, "wb") as dst:
+                while True:
+                    chunk = src.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    n += len(chunk)
+                    if n > item_max:
+                        raise ValueError(f"{name} is larger than {BATCH_MAX_ITEM_MB} MB")
+                    if n > budget[0]:
+                        raise ValueError(f"Batch is larger than {BATCH_MAX_TOTAL_MB} MB unpacked")
+                    dst.write(chunk)
+        except Exception:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            raise
+        budget[0] -= n
+        return n
+
+    @staticmethod
+    def _extract_zip(path: str, dest: str, budget: List[int], count: int = 0) -> List[str]:
+        """Image members of a zip, flattened into dest (no paths from the archive are trusted)."""
+        out = []
+        try:
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    name = secure_filename(os.path.basename(info.filename))
+                    if info.is_dir() or not name or not InpaintImageBatchService.allowed(name):
+                        continue
+                    if info.file_size > BATCH_MAX_ITEM_MB * 1024 * 1024:  # cheap early reject; the copy re-checks
+                        raise ValueError(f"{name} is larger than {BATCH_MAX_ITEM_MB} MB")
+                    if count + len(out) >= BATCH_MAX_ITEMS:
+                        raise ValueError(f"At most {BATCH_MAX_ITEMS} images per batch")
+                    stem, ext = os.path.splitext(name)
+                    target = os.path.join(dest, f"{stem}_{uuid.uuid4().hex[:8]}{ext}")
+                    with zf.open(info) as src:
+                        InpaintImageBatchService._copy_limited(src, target, name, budget)
+                    out.append(target)
+        except Exception:
+            for p in out:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            raise
+        return out
+
+    @staticmethod
+    def save_uploads(files: List, upload_dir="uploads") -> List[str]:
+        """
+        Save image uploads; .zip uploads are expanded into their image members. Limits:
+        BATCH_MAX_ITEMS images, BATCH_MAX_ITEM_MB per image, BATCH_MAX_TOTAL_MB in all.
+        Files already saved are removed when a limit is hit.
+        """
+        os.makedirs(upload_dir, exist_ok=True)
+        paths = []
+        budget = [BATCH_MAX_TOTAL_MB * 1024 * 1024]  # bytes left, shared by every member
+        try:
+            for fs in files:
+                name = secure_filename(fs.filename or "")
+                if not name:
+                    raise ValueError("One of the files has an empty filename")
+                stem, ext = os.path.splitext(name)
+                path = os.path.join(upload_dir, f"{stem}_{uuid.uuid4().hex[:8]}{ext}")
+                if ext.lower() == ".zip":
+                    fs.save(path)
+                    try:
+                        paths.extend(InpaintImageBatchService._extract_zip(path, upload_dir, budget, len(paths)))
+                    except zipfile.BadZipFile:
+                        raise ValueError(f"Not a valid zip: {name}")
+                    finally:
+                        os.remove(path)
+                elif InpaintImageBatchService.allowed(name):
+                    InpaintImageBatchService._copy_limited(fs.stream, path, name, budget)
+                    paths.append(path)
+                else:
+                    raise ValueError(f"Unsupported file type: {name}")
+                if len(paths) > BATCH_MAX_ITEMS:
+                    raise ValueError(f"At most {BATCH_MAX_ITEMS} images per batch")
+        except Exception:
+            for p in paths:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+            raise
+        if not paths:
+            raise ValueError("No valid images uploaded")
+        return paths
+
+    def __init__(self, image_paths: List[str], work_root="uploads", output_root="inpaint_output"):
+        if not image_paths:
+            raise ValueError("image_paths must be non-empty")
+        for p in image_paths:
+            if not os.path.isfile(p):
+                raise FileNotFoundError(p)
+
+        self.image_paths = image_paths
+        self.work_root = work_root
+        self.output_root = output_root
+        self.session_id = uuid.uuid4().hex[:8]
+        self.session_dir = os.path.join(work_root, f"inpaint_batch_{self.session_id}")
+        self.output_dir = os.path.join(output_root, f"batch_{self.session_id}")
+        self.frames_dir = os.path.join(self.session_dir, "frames")
+        self.masks_dir = os.path.join(self.session_dir, "masks")
+        for d in (self.frames_dir, self.masks_dir, self.output_dir):
+            os.makedirs(d, exist_ok=True)
+
+    @staticmethod
+    def _output_name(path: str) -> str:
+        # uploads carry a unique _<8 hex> suffix, so output names never collide
+        stem = os.path.splitext(os.path.basename(path))[0]
+        return f"{stem}_inpainted.png"
+
+    # ---------- public ----------
+    def process(self, *, ocr_langs="en", device="cpu", inpaint_backend="auto", detect_max_side=None,
+                ocr_detector=None, ocr_cache=None, lama_batch=None, make_zip=False,
+                bucket_name: Optional[str] = None) -> BatchInpaintResult:
+        backend = resolve_backend(inpaint_backend)
+        reader = make_text_reader(ocr_detector, ocr_langs, device, detect_max_side, ocr_cache)
+        frames = FrameDir(self.frames_dir, "png0")
+        out = FrameDir(self.output_dir, "png")
+        names = [f"item_{i + 1:05d}.png" for i in range(len(self.image_paths))]
+        done: Dict[str, BatchInpaintItem] = {}
+
+        # 1) decode once (in parallel, cv2 releases the GIL) -> OCR on the array -> stage frame + mask
+        t0 = time.perf_counter()
+        staged = {}
+        for path, name, img in ordered_map(lambda pn: (*pn, cv2.imread(pn[0], cv2.IMREAD_COLOR)),
+                                           zip(self.image_paths, names)):
+            if img is None:
+                done[name] = BatchInpaintItem(os.path.basename(path), None, False, "Could not decode image")
+                continue
+            mask = np.zeros(img.shape[:2], dtype=np.uint8)
+            results = reader.readtext(img)
+            for (bbox, _, _) in results:
+                pt1, pt2 = tuple(map(int, bbox[0])), tuple(map(int, bbox[2]))
+                cv2.rectangle(mask, pt1, pt2, 255, -1)
+            frames.write(name, img)
+            cv2.imwrite(os.path.join(self.masks_dir, name), mask)
+            staged[name] = (path, len(results))
+        detect_sec = time.perf_counter() - t0
+
+        # 2) one pass over the staged set through a single model
+        t0 = time.perf_counter()
+        roi_stats = {}
+        if staged:
+            if backend == "onnx":
+                roi_stats = engine_rois_dir(frames, self.masks_dir, out, get_lama_engine(device),
+                                            batch_size=lama_batch)
+            elif backend == "opencv":
+                roi_stats = opencv_rois_dir(frames, self.masks_dir, out)
+            else:
+                roi_stats = iopaint_rois(frames, self.masks_dir, out, self.session_dir, device=device)
+        inpaint_sec = time.perf_counter() - t0
+
+        # 3) name outputs after their inputs, publish, zip
+        for name, (path, boxes) in staged.items():
+            src = os.path.join(self.output_dir, name)
+            if not os.path.isfile(src):
+                done[name] = BatchInpaintItem(os.path.basename(path), None, False, "Inpainting produced no output")
+                continue
+            dst = os.path.join(self.output_dir, self._output_name(path))
+            os.replace(src, dst)
+            item = BatchInpaintItem(os.path.basename(path), dst, True, None, boxes=boxes)
+            if bucket_name:
+                publish = PUBLISH_MANAGER.submit(dst, bucket_name, f"inpaint/batch_{self.session_id}/{os.path.basename(dst)}")
+                item.gcs_url, item.publish_id = publish["gcs_url"], publish["id"]
+            done[name] = item
+        items = [done[n] for n in names]
+
+        zipped = None
+        if make_zip and any(it.ok for it in items):
+            zipped = os.path.join(self.output_root, f"inpaint_batch_{self.session_id}.zip")
+            with zipfile.ZipFile(zipped, "w", compression=zipfile.ZIP_STORED) as zf:  # PNGs are compressed already
+                for it in items:
+                    if it.ok:
+                        zf.write(it.output_path, arcname=os.path.basename(it.output_path))
+
+        ok = sum(1 for it in items if it.ok)
+        return BatchInpaintResult(
+            outputs=items,
+            zipped_path=zipped,
+            diagnostics={
+                "images": len(self.image_paths),
+                "ok": ok,
+                "failed": len(items) - ok,
+                "inpaint_backend": backend,
+                "detect_sec": round(detect_sec, 3),
+                "inpaint_sec": round(inpaint_sec, 3),
+                "roi": roi_stats,
+                "detect": reader.stats(),
+            },
+        )
+
+    def cleanup(self):
+        # staged frames/masks and the uploads; outputs stay for download / publishing
+        shutil.rmtree(self.session_dir, ignore_errors=True)
+        for p in self.image_paths:
+            try:
+                os.remove(p)
+            except OSError:
+                pass
@@ -2,10 +2,18 @@ import os
 import uuid
 import shutil
 import cv2
+import numpy as np
 import subprocess
-import easyocr
 from werkzeug.utils import secure_filename
 
+from application.utils.inpaint_ops import engine_rois, inpaint_rois
+from application.utils.lama_engine import get_lama_engine, lama_available, resolve_backend
+from application.utils.ocr_detect import make_text_reader
+from application.utils.tiling import TILE_OVERLAP, detect_tiled, inpaint_tiled, resolve_tile, tile_grid
+
+# in-memory output formats (process_bytes): format -> cv2.imencode extension
+ENCODE_FORMATS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg"}
+
 
 class InpaintImageService:
     def __init__(self, image_path: str, work_root: str = "uploads", output_root: str = "inpaint_output"):
@@ -46,30 +54,183 @@ class InpaintImageService:
         return path
 
     # ---------- Core logic ----------
-    def process_lama(self, ocr_langs="en", device="cpu"):
-        # Step 1: Detect text areas via OCR
-        reader = easyocr.Reader(ocr_langs.split(","))
-        img = cv2.imread(self.image_path)
-        mask = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        mask[:] = 0
-        results = reader.readtext(self.image_path)
+    def _iopaint_tiles(self, img, mask, device, tile, overlap):
+        """
+        One `iopaint run` over every tile that has mask pixels (the model loads once);
+        returns fn(rect, ...) for inpaint_tiled() that reads each result back from disk.
+        """
+        dirs = [os.path.join(self.session_dir, d) for d in ("tile_img", "tile_mask", "tile_out")]
+        for d in dirs:
+            os.makedirs(d, exist_ok=True)
+        H, W = img.shape[:2]
+        name = lambda r: f"tile_{r[0]}_{r[1]}.png"
+        n = 0
+        for (x1, y1, x2, y2) in tile_grid(W, H, tile, overlap):
+            mcrop = mask[y1:y2, x1:x2]
+            if mcrop.any():
+                cv2.imwrite(os.path.join(dirs[0], name((x1, y1))), img[y1:y2, x1:x2])
+                cv2.imwrite(os.path.join(dirs[1], name((x1, y1))), mcrop)
+                n += 1
+        if n:
+            cmd = ["iopaint", "run", "--model", "lama", "--device", device,
+                   "--image", dirs[0], "--mask", dirs[1], "--output", dirs[2]]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"LaMa inpainting failed: {result.stderr}")
+
+        def read(r, crop, mcrop):
+            res = cv2.imread(os.path.join(dirs[2], name(r)))
+            if res is None or res.shape != crop.shape:
+                raise RuntimeError(f"LaMa produced no result for {name(r)}")
+            return res
+        return read
+
+    @staticmethod
+    def _check_tile(tile, tile_overlap) -> int:
+        if tile is not None and tile != 0 and not 256 <= int(tile) <= 16384:
+            raise ValueError("tile must be 0 (off) or between 256 and 16384")
+        overlap = TILE_OVERLAP if tile_overlap is None else int(tile_overlap)
+        if overlap < 0:
+            raise ValueError("tile_overlap must be >= 0")
+        return overlap
+
+    @staticmethod
+    def _text_mask(reader, img: np.ndarray, tile: int, overlap: int):
+        """Filled OCR boxes (whole image, or per tile when tile > 0) and the raw OCR results."""
+        mask = np.zeros(img.shape[:2], dtype=np.uint8)
+        results = detect_tiled(reader, img, tile, overlap) if tile else reader.readtext(img)
         for (bbox, _, _) in results:
             pt1, pt2 = tuple(map(int, bbox[0])), tuple(map(int, bbox[2]))
             cv2.rectangle(mask, pt1, pt2, 255, -1)
-        cv2.imwrite(self.mask_path, mask)
-
-        # Step 2: Run LaMa Cleaner via iopaint CLI
-        cmd = [
-            "iopaint", "run",
-            "--model", "lama",
-            "--device", device,
-            "--image", self.image_path,
-            "--mask", self.mask_path,
-            "--output", self.output_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode != 0:
-            raise RuntimeError(f"LaMa inpainting failed: {result.stderr}")
+        return mask, results
+
+    @staticmethod
+    def _inpaint_array(img: np.ndarray, mask: np.ndarray, backend: str, device: str,
+                       tile: int, overlap: int, workers=None):
+        """In-process inpaint (onnx|opencv) on the mask ROIs, tiled when tile > 0."""
+        if backend == "onnx":
+            engine = get_lama_engine(device)
+            fn = lambda r, crop, mcrop: engine_rois(crop, mcrop, engine)[0]
+        else:
+            fn = lambda r, crop, mcrop: inpaint_rois(crop, mcrop)[0]
+        if tile:
+            return inpaint_tiled(img, mask, fn, tile, overlap, workers=workers)
+        return fn(None, img, mask), {"tile": 0}
+
+    @staticmethod
+    def encode_image(img: np.ndarray, fmt: str = "png", quality: int = None) -> bytes:
+        """
+        png (quality = zlib level 0..9, default 3), webp (1..100, 101 = lossless, default 90)
+        or jpeg (1..100, default 90), encoded in memory.
+        """
+        f = (fmt or "png").lower()
+        if f == "jpg":
+            f = "jpeg"
+        if f not in ENCODE_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(ENCODE_FORMATS)}")
+        if f == "png":
+            q = 3 if quality is None else int(quality)
+            if not 0 <= q <= 9:
+                raise ValueError("quality for png is the compression level 0..9")
+            params = [cv2.IMWRITE_PNG_COMPRESSION, q]
+        else:
+            q = 90 if quality is None else int(quality)
+            if not 1 <= q <= (101 if f == "webp" else 100):
+                raise ValueError(f"quality for {f} must be between 1 and {101 if f == 'webp' else 100}")
+            params = [cv2.IMWRITE_WEBP_QUALITY if f == "webp" else cv2.IMWRITE_JPEG_QUALITY, q]
+        ok, buf = cv2.imencode(ENCODE_FORMATS[f], img, params)
+        if not ok:
+            raise RuntimeError(f"Could not encode {f}")
+        return buf.tobytes()
+
+    @classmethod
+    def process_bytes(cls, data: bytes, ocr_langs="en", device="cpu", inpaint_backend="auto",
+                      detect_max_side=None, ocr_detector=None, ocr_cache=None, fmt="png", quality=None,
+                      tile=None, tile_overlap=None, tile_workers=None) -> dict:
+        """
+        Fully in-memory variant of process_lama for small images: decode from bytes, mask
+        and inpaint in NumPy, encode the result - no session dir, no files, no subprocess.
+        inpaint_backend auto means ONNX LaMa when configured, else OpenCV; iopaint (a CLI
+        working on files) is not available here.
+        Returns {"data": encoded bytes, "mimetype", "diagnostics"}.
+        """
+        b = (inpaint_backend or "auto").lower()
+        if b == "iopaint":
+            raise ValueError("inpaint_backend iopaint needs files; use onnx|opencv|auto for in-memory requests")
+        backend = "opencv" if b == "auto" and not lama_available() else resolve_backend(b)
+        overlap = cls._check_tile(tile, tile_overlap)
+        f = "jpeg" if (fmt or "png").lower() == "jpg" else (fmt or "png").lower()
+        if f not in ENCODE_FORMATS:
+            raise ValueError(f"format must be one of {', '.join(ENCODE_FORMATS)}")
+
+        reader = make_text_reader(ocr_detector, ocr_langs, device, detect_max_side, ocr_cache)
+        img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR) if data else None
+        if img is None:
+            raise ValueError("Could not decode image")
+        H, W = img.shape[:2]
+        tile = resolve_tile(W, H, tile)
+        mask, results = cls._text_mask(reader, img, tile, overlap)
+        out, tile_stats = cls._inpaint_array(img, mask, backend, device, tile, overlap, tile_workers)
+        encoded = cls.encode_image(out, f, quality)
+        return {
+            "data": encoded,
+            "mimetype": f"image/{f}",
+            "diagnostics": {
+                "ocr_langs": ocr_langs,
+                "device": device,
+                "inpaint_backend": backend,
+                "ocr_detected_boxes": len(results),
+                "format": f,
+                "input_bytes": len(data),
+                "output_bytes": len(encoded),
+                **tile_stats,
+                **reader.stats(),
+            },
+        }
+
+    def process_lama(self, ocr_langs="en", device="cpu", inpaint_backend="auto", detect_max_side=None,
+                     ocr_detector=None, ocr_cache=None, tile=None, tile_overlap=None, tile_workers=None):
+        """
+        tile: side (px) of the overlapping tiles that large images are detected and
+              inpainted in (None = INPAINT_TILE_SIZE above INPAINT_TILE_MIN_SIDE, 0 = whole image);
+              detector and LaMa memory then follow the tile, and tiles are inpainted on
+              tile_workers threads with feathered seams (see tiling.inpaint_tiled)
+        tile_overlap: px shared by neighbouring tiles (default INPAINT_TILE_OVERLAP); should
+                      exceed the tallest text line so a cut line is still found whole
+        """
+        backend = resolve_backend(inpaint_backend)
+        overlap = self._check_tile(tile, tile_overlap)
+        # Step 1: Detect text areas via OCR (optionally on a downscaled copy, boxes in source px)
+        reader = make_text_reader(ocr_detector, ocr_langs, device, detect_max_side, ocr_cache)
+        img = cv2.imread(self.image_path)
+        if img is None:
+            raise ValueError("Could not decode image")
+        H, W = img.shape[:2]
+        tile = resolve_tile(W, H, tile)
+        mask, results = self._text_mask(reader, img, tile, overlap)
+
+        # Step 2: inpaint - in-process LaMa (ONNX) / OpenCV on the text ROIs, or the iopaint CLI
+        tile_stats = {"tile": 0}
+        if backend in ("onnx", "opencv"):
+            out, tile_stats = self._inpaint_array(img, mask, backend, device, tile, overlap, tile_workers)
+            cv2.imwrite(self.output_path, out)
+        elif tile:
+            fn = self._iopaint_tiles(img, mask, device, tile, overlap)
+            out, tile_stats = inpaint_tiled(img, mask, fn, tile, overlap, workers=tile_workers)
+            cv2.imwrite(self.output_path, out)
+        else:
+            cv2.imwrite(self.mask_path, mask)
+            cmd = [
+                "iopaint", "run",
+                "--model", "lama",
+                "--device", device,
+                "--image", self.image_path,
+                "--mask", self.mask_path,
+                "--output", self.output_path
+            ]
+            result = subprocess.run(cmd, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(f"LaMa inpainting failed: {result.stderr}")
 
         return {
             "output_path": self.output_path,
@@ -77,7 +238,10 @@ class InpaintImageService:
             "diagnostics": {
                 "ocr_langs": ocr_langs,
                 "device": device,
+                "inpaint_backend": backend,
                 "ocr_detected_boxes": len(results),
+                **tile_stats,
+                **reader.stats(),
             },
         }
 
@@ -1,11 +1,41 @@
-import os, uuid, shutil, subprocess, json
+import os, time, uuid, shutil, subprocess, json, hashlib, threading
+from contextlib import contextmanager
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import deque
 from dataclasses import dataclass
 from typing import List, Tuple
 import cv2
 import numpy as np
-import easyocr
 from werkzeug.utils import secure_filename
 
+from application.workspace import SCRATCH_MODES, WORKSPACE, frame_scratch_bytes, pick_scratch_root
+from application.utils.text_tracking import SparseTextTracker
+from application.utils.inpaint_ops import (
+    PatchReuse, engine_rois, engine_rois_dir, inpaint_flags, inpaint_rois, iopaint_rois, opencv_rois_dir, rois_area
+)
+from application.utils.lama_engine import get_lama_engine, resolve_backend
+from application.utils.parallel import ordered_map
+from application.utils.mask_store import MaskStore, MaskStoreWriter
+from application.utils.frame_io import check_frame_format, display_size, frame_store
+from application.utils.ocr_detect import check_detector, check_ocr_cache, make_text_reader
+from application.utils.mem_guard import (
+    MB, MEM_ADMISSION, MEM_MODES, MEM_WAIT_SEC, PhaseMemory, estimate_job_bytes
+)
+
+
+SEGMENT_WORKERS = int(os.getenv("INPAINT_SEGMENT_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+SEGMENT_MIN_SEC = float(os.getenv("INPAINT_SEGMENT_MIN_SEC", "20"))
+
+
+# checkpoint keys with a process() in flight: a resubmitted duplicate must not share its dirs
+_ACTIVE_KEYS = set()
+_ACTIVE_LOCK = threading.Lock()
+
+
+class DuplicateJobError(RuntimeError):
+    """An identical (same checkpoint key) inpaint job is already running; its dirs are not ours."""
+
 
 @dataclass
 class VideoInpaintResult:
@@ -13,6 +43,26 @@ class VideoInpaintResult:
     diagnostics: dict
 
 
+def _inpaint_segment(video_path: str, work_root: str, out_path: str, seg: dict, params: dict) -> dict:
+    """Worker-process entry: stream-inpaint one segment into a video-only file."""
+    cv2.setNumThreads(1)  # parallelism comes from the segments
+    svc = InpaintVideoService(video_path, work_root=work_root, output_root=os.path.dirname(out_path))
+    try:
+        stats = svc._process_stream(
+            fps=params["fps"], info=params["info"], ocr_langs=params["ocr_langs"],
+            bbox_pad=params["bbox_pad"], smooth=params["smooth"], static_thresh=params["static_thresh"],
+            ocr_every=params["ocr_every"], device=params["device"], detect_max_side=params["detect_max_side"],
+            ocr_detector=params["ocr_detector"], ocr_cache=params["ocr_cache"], reuse_thresh=params["reuse_thresh"],
+            reuse_feather=params["reuse_feather"], inpaint_method=params["inpaint_method"], inpaint_radius=params["inpaint_radius"],
+            inpaint_backend=params["inpaint_backend"], threads=1,
+            start=seg["decode_start"], duration=seg["decode_dur"],
+            keep=(seg["lead"], seg["frames"]), out_path=out_path, audio=False,
+        )
+    finally:
+        svc.cleanup()
+    return {"index": seg["index"], "start": seg["start"], "end": seg["end"], **stats}
+
+
 class InpaintVideoService:
     ALLOWED = {"mp4", "mov", "mkv", "webm"}
 
@@ -33,16 +83,36 @@ class InpaintVideoService:
         file_storage.save(path)
         return path
 
-    def __init__(self, video_path: str, work_root="uploads", output_root="inpaint_output"):
+    @staticmethod
+    def checkpoint_key(video_path: str, params: dict) -> str:
+        """Content hash of the video + the output-affecting params; names a resumable session."""
+        h = hashlib.sha256()
+        with open(video_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        h.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return h.hexdigest()[:16]
+
+    def __init__(self, video_path: str, work_root="uploads", output_root="inpaint_output", resume_key=None):
+        """
+        resume_key: checkpoint_key(...) of this content + params. The session dir and
+        output are then named by the key and phases recorded in manifest.json are
+        skipped, so a retried/resubmitted job continues where the last one died.
+        """
         if not os.path.isfile(video_path):
             raise FileNotFoundError(video_path)
         self.video_path = video_path
         self.work_root = work_root
         self.output_root = output_root
+        self.resume_key = resume_key
 
         base = os.path.splitext(os.path.basename(video_path))[0]
-        self.session_id = uuid.uuid4().hex[:8]
+        if resume_key:
+            base, self.session_id = "inpaint", resume_key
+        else:
+            self.session_id = uuid.uuid4().hex[:8]
         self.session_dir = os.path.join(work_root, f"{base}_{self.session_id}")
+        self.scratch_dir = self.session_dir  # may move to tmpfs in _setup_scratch()
         self.frames_dir = os.path.join(self.session_dir, "frames")
         self.masks_dir = os.path.join(self.session_dir, "masks")
         self.inpainted_dir = os.path.join(self.session_dir, "inpainted")
@@ -52,6 +122,48 @@ class InpaintVideoService:
         os.makedirs(output_root, exist_ok=True)
         self.output_path = os.path.join(output_root, f"{base}_inpaint_{self.session_id}.mp4")
         self.meta_path = os.path.join(self.session_dir, "meta.json")
+        self.manifest_path = os.path.join(self.session_dir, "manifest.json")
+        self.manifest = {"key": resume_key, "phases": {}}
+        self.mem_plan = {}
+        self._mem_token = None
+        self.claimed = False  # set once process() holds the checkpoint claim
+        if resume_key and os.path.isfile(self.manifest_path):
+            try:
+                with open(self.manifest_path) as f:
+                    self.manifest = json.load(f)
+            except (OSError, ValueError):
+                pass  # unreadable manifest: start over
+
+    # ---------- checkpoints ----------
+    def _phase(self, name: str):
+        """Recorded result of a completed phase (None if it has to run)."""
+        return self.manifest["phases"].get(name) if self.resume_key else None
+
+    def _mark(self, name: str, **data):
+        self.manifest["phases"][name] = data
+        tmp = self.manifest_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self.manifest_path)  # atomic: a crash never leaves half a manifest
+
+    @contextmanager
+    def _claim(self):
+        if not self.resume_key:
+            self.claimed = True
+            yield
+            return
+        with _ACTIVE_LOCK:
+            if self.resume_key in _ACTIVE_KEYS:
+                raise DuplicateJobError("An identical inpaint job is already running")
+            _ACTIVE_KEYS.add(self.resume_key)
+        self.claimed = True
+        # a retry/resubmit owns the checkpoint dir again: no TTL/LRU eviction while it runs
+        WORKSPACE.untrack(self.session_dir)
+        try:
+            yield
+        finally:
+            with _ACTIVE_LOCK:
+                _ACTIVE_KEYS.discard(self.resume_key)
 
     # ---------- helpers ----------
     def _run(self, cmd: List[str]):
@@ -69,8 +181,48 @@ class InpaintVideoService:
         num, den = out.split("/")
         return float(num) / float(den)
 
+    def _probe_stream(self) -> dict:
+        out = self._run([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_streams", "-show_format",  # full entry: rotation lives in tags / side data
+            "-of", "json", self.video_path
+        ])
+        info = json.loads(out or "{}")
+        st = (info.get("streams") or [{}])[0]
+        fmt = info.get("format") or {}
+        try:
+            frames = int(st.get("nb_frames") or 0)
+        except ValueError:
+            frames = 0
+        duration = float(st.get("duration") or fmt.get("duration") or 0.0)
+        W, H = display_size(st)  # decoded (autorotated) size, which every raw frame pipe uses
+        return {"width": W, "height": H, "frames": frames, "duration": duration}
+
+    def _setup_scratch(self, mode: str, info: dict, fps: float) -> dict:
+        """Put frames/ masks/ inpainted/ on tmpfs when the frame budget fits, else keep them on disk."""
+        frames = info["frames"] or int(round(info["duration"] * fps))
+        need = frame_scratch_bytes(info["width"], info["height"], frames)
+        choice = pick_scratch_root(need, self.work_root, mode=mode)
+        if choice["tier"] == "ram":
+            self.scratch_dir = os.path.join(choice["root"], os.path.basename(self.session_dir))
+            for d in (self.frames_dir, self.masks_dir, self.inpainted_dir):
+                try:
+                    os.rmdir(d)
+                except OSError:
+                    pass
+            self.frames_dir = os.path.join(self.scratch_dir, "frames")
+            self.masks_dir = os.path.join(self.scratch_dir, "masks")
+            self.inpainted_dir = os.path.join(self.scratch_dir, "inpainted")
+            for d in (self.frames_dir, self.masks_dir, self.inpainted_dir):
+                os.makedirs(d, exist_ok=True)
+        return {"tier": choice["tier"], "need_bytes": need, "frames_est": frames, "reason": choice["reason"]}
+
+    def _open_frames(self, frame_format: str, info: dict):
+        """frames/ + inpainted/ stores in the requested intermediate format (see frame_io)."""
+        self.frames = frame_store(self.frames_dir, frame_format, info["width"], info["height"])
+
     def _extract_frames(self):
-        self._run(["ffmpeg", "-y", "-i", self.video_path, f"{self.frames_dir}/frame_%06d.png"])
+        self._run(["ffmpeg", "-y", "-i", self.video_path, *self.frames.ffmpeg_output()])
 
     @staticmethod
     def _expand_box(bbox: List[Tuple[int, int]], W: int, H: int, pad: int = 8) -> Tuple[Tuple[int,int], Tuple[int,int]]:
@@ -81,69 +233,114 @@ class InpaintVideoService:
         x2, y2 = min(W - 1, max(xs) + pad), min(H - 1, max(ys) + pad)
         return (x1, y1), (x2, y2)
 
-    def _generate_masks(self, ocr_langs: str = "en", bbox_pad: int = 8, smooth: int = 1, static_thresh: float = 0.25):
+    def _detect_boxes(self, reader, img: np.ndarray, W: int, H: int, bbox_pad: int) -> List[Tuple[int, int, int, int]]:
+        boxes = []
+        for (bbox, _, _) in reader.readtext(img):  # faster if you pass numpy
+            (x1, y1), (x2, y2) = self._expand_box(bbox, W, H, pad=bbox_pad)
+            boxes.append((x1, y1, x2, y2))
+        return boxes
+
+    @staticmethod
+    def _thresh_mask(gray: np.ndarray) -> np.ndarray:
+        # optional: also include very bright/dark spots (cheap heuristic)
+        _, white_mask = cv2.threshold(gray, 245, 255, cv2.THRESH_BINARY)
+        _, black_mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY_INV)
+        return cv2.bitwise_or(white_mask, black_mask)
+
+    @classmethod
+    def _raster_mask(cls, boxes: List[Tuple[int, int, int, int]], gray: np.ndarray) -> np.ndarray:
+        mask = cls._thresh_mask(gray)
+        for (x1, y1, x2, y2) in boxes:
+            cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)
+        return mask
+
+    @staticmethod
+    def _static_mask(heat: np.ndarray, n_frames: int, static_thresh: float) -> np.ndarray:
+        heat = heat / max(1, n_frames)
+        static_mask = (heat >= static_thresh).astype(np.uint8) * 255
+        if static_mask.any():
+            k = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+            static_mask = cv2.dilate(static_mask, k, 1)
+        return static_mask
+
+    def _make_tracker(self, reader, W: int, H: int, bbox_pad: int, ocr_every: int) -> SparseTextTracker:
+        # ocr_every=1 detects on every frame (original behaviour)
+        return SparseTextTracker(lambda img: self._detect_boxes(reader, img, W, H, bbox_pad), every=ocr_every)
+
+    @staticmethod
+    def _smoothed(items, smooth: int, static_mask: np.ndarray):
         """
-        Build per-frame masks + a static watermark mask (heatmap).
+        Temporal neighbor union over a stream of (payload, raw_mask) in frame order.
+        Yields (payload, static | union(raw[i-smooth..i+smooth])) per frame while
+        holding at most 2*smooth+1 masks, so memory does not grow with video length.
+        """
+        window = deque()   # (index, payload, raw mask)
+
+        def emit(center: int):
+            payload = next(p for (j, p, _) in window if j == center)
+            m = static_mask.copy()
+            for (j, _, mk) in window:
+                if abs(j - center) <= smooth:
+                    m = cv2.bitwise_or(m, mk)
+            return payload, m
+
+        nxt = 0  # next frame index to emit
+        for i, (payload, mask) in enumerate(items):
+            window.append((i, payload, mask))
+            if i - nxt >= smooth:
+                yield emit(nxt)
+                nxt += 1
+                while window and window[0][0] < nxt - smooth:
+                    window.popleft()
+        last = window[-1][0] if window else -1
+        while nxt <= last:
+            yield emit(nxt)
+            nxt += 1
+            while window and window[0][0] < nxt - smooth:
+                window.popleft()
+
+    def _generate_masks(self, ocr_langs: str = "en", bbox_pad: int = 8, smooth: int = 1, static_thresh: float = 0.25,
+                        ocr_every: int = 1, device: str = "cpu", detect_max_side: int = None,
+                        ocr_detector: str = None, ocr_cache: str = None) -> dict:
+        """
+        Build per-frame masks + a static watermark mask (heatmap) into one compact
+        MaskStore (masks/masks.msk): per frame the OCR boxes + an RLE of the threshold
+        spots, then the static mask and smoothing radius. Nothing is rasterized to disk;
+        the inpaint stage rasterizes (and temporally unions) each mask when it needs it.
         smooth: number of neighboring frames to union (1 => t-1,t,t+1)
         static_thresh: fraction of frames a pixel must be 'on' to count as static logo
+        ocr_every: run OCR every N frames (+ scene cuts / lost tracks), track boxes in between
+        detect_max_side: run detection on frames downscaled to this longer side (boxes come back in source px)
+        ocr_detector: readtext|detect|east|db text detector (see ocr_detect)
+        ocr_cache: off|job|shared detection cache keyed by a perceptual hash of the frame
         """
-        files = sorted(os.listdir(self.frames_dir))
+        files = self.frames.names()
         if not files:
             raise RuntimeError("No frames extracted")
 
         # read first frame for shape
-        sample = cv2.imread(os.path.join(self.frames_dir, files[0]), cv2.IMREAD_COLOR)
+        sample = self.frames.read(files[0])
         H, W = sample.shape[:2]
-        reader = easyocr.Reader(ocr_langs.split(","))
+        reader = make_text_reader(ocr_detector, ocr_langs, device, detect_max_side, ocr_cache)
+        tracker = self._make_tracker(reader, W, H, bbox_pad, ocr_every)
+        store = MaskStoreWriter(self.mask_store_path, W, H)
 
-        # heatmap accumulation for static logos
+        # one pass: boxes + threshold RLE per frame, heatmap for static logos
         heat = np.zeros((H, W), dtype=np.float32)
-        frame_masks = []
-
         for fname in files:
-            img = cv2.imread(os.path.join(self.frames_dir, fname))
+            img = self.frames.read(fname)
             gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            mask = np.zeros((H, W), dtype=np.uint8)
-
-            results = reader.readtext(img)  # faster if you pass numpy
-            for (bbox, _, _) in results:
-                (x1, y1), (x2, y2) = self._expand_box(bbox, W, H, pad=bbox_pad)
-                cv2.rectangle(mask, (x1, y1), (x2, y2), 255, -1)
-
-            # optional: also include very bright/dark spots (cheap heuristic)
-            _, white_mask = cv2.threshold(gray, 245, 255, cv2.THRESH_BINARY)
-            _, black_mask = cv2.threshold(gray, 10, 255, cv2.THRESH_BINARY_INV)
-            mask = cv2.bitwise_or(mask, white_mask)
-            mask = cv2.bitwise_or(mask, black_mask)
-
-            frame_masks.append(mask)
-            heat += (mask > 0).astype(np.float32)
-
-        # static watermark from heatmap
-        heat /= len(files)
-        static_mask = (heat >= static_thresh).astype(np.uint8) * 255
-        if static_mask.any():
-            k = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-            static_mask = cv2.dilate(static_mask, k, 1)
+            boxes = tracker.boxes(img, gray)
+            thresh = self._thresh_mask(gray)
+            store.append(fname, boxes, thresh)
+            for (x1, y1, x2, y2) in boxes:
+                cv2.rectangle(thresh, (x1, y1), (x2, y2), 255, -1)
+            heat += (thresh > 0).astype(np.float32)
 
-        # temporal smoothing (neighbor union)
-        N = len(frame_masks)
-        smoothed = []
-        for i in range(N):
-            m = frame_masks[i].copy()
-            for d in range(1, smooth + 1):
-                if i - d >= 0:
-                    m = cv2.bitwise_or(m, frame_masks[i - d])
-                if i + d < N:
-                    m = cv2.bitwise_or(m, frame_masks[i + d])
-            # union with static watermark
-            m = cv2.bitwise_or(m, static_mask)
-            smoothed.append(m)
-
-        # write masks
-        for i, fname in enumerate(files, start=1):
-            out = os.path.join(self.masks_dir, f"frame_{i:06d}.png")
-            cv2.imwrite(out, smoothed[i - 1])
+        # static watermark from heatmap; temporal smoothing is applied at read time
+        static_mask = self._static_mask(heat, len(files), static_thresh)
+        del heat
+        store.close(static=static_mask, smooth=smooth)
 
         # save meta
         meta = {
@@ -153,24 +350,24 @@ class InpaintVideoService:
         }
         with open(self.meta_path, "w") as f:
             json.dump(meta, f)
+        return {"ocr": tracker.stats(), "detect": reader.stats(),
+                "mask_store_bytes": os.path.getsize(self.mask_store_path)}
 
-    def _run_lama_batch(self, device: str = "cpu"):
-        # iopaint can take folders for image/mask and write to a folder
-        self._run([
-            "iopaint", "run",
-            "--model", "lama",
-            "--device", device,
-            "--image", self.frames_dir,
-            "--mask", self.masks_dir,
-            "--output", self.inpainted_dir
-        ])
+    @property
+    def mask_store_path(self) -> str:
+        return os.path.join(self.masks_dir, "masks.msk")
+
+    def _run_lama_batch(self, masks, device: str = "cpu", roi_pad: int = 32, reuse_thresh: float = 0.0,
+                        reuse_feather: int = None, **resume) -> dict:
+        # LaMa only sees padded crops around the masked regions, pasted back per frame
+        return iopaint_rois(self.frames, masks, self.inpainted, self.scratch_dir, device=device, pad=roi_pad,
+                            reuse_thresh=reuse_thresh, reuse_feather=reuse_feather, **resume)
 
     def _reassemble(self, fps: float):
         # Guard: ensure output frames exist; iopaint keeps filenames
         self._run([
             "ffmpeg", "-y",
-            "-framerate", f"{fps:.6f}",
-            "-i", f"{self.inpainted_dir}/frame_%06d.png",
+            *self.inpainted.ffmpeg_input(f"{fps:.6f}"),
             "-i", self.video_path,
             "-map", "0:v:0", "-map", "1:a?:0",
             "-c:v", "libx264", "-pix_fmt", "yuv420p",
@@ -178,56 +375,683 @@ class InpaintVideoService:
             self.output_path
         ])
 
+    def _run_lama_engine(self, masks, device: str = "cpu", batch_size: int = None, roi_pad: int = 32,
+                         reuse_thresh: float = 0.0, reuse_feather: int = None, **resume) -> dict:
+        # in-process LaMa (ONNX), crops batched as NumPy arrays
+        return engine_rois_dir(self.frames, masks, self.inpainted, get_lama_engine(device), pad=roi_pad,
+                               batch_size=batch_size, reuse_thresh=reuse_thresh, reuse_feather=reuse_feather,
+                               **resume)
+
+    # ---------- streaming (no intermediate image files) ----------
+    def _iter_frames(self, W: int, H: int, start: float = None, duration: float = None):
+        """Decode to BGR NumPy frames over an ffmpeg rawvideo pipe (optionally a [start, start+duration) window)."""
+        frame_bytes = W * H * 3
+        window = []
+        if start:
+            window += ["-ss", f"{start:.6f}"]
+        if duration:
+            window += ["-t", f"{duration:.6f}"]
+        p = subprocess.Popen(
+            ["ffmpeg", "-v", "error", *window, "-i", self.video_path, "-f", "rawvideo", "-pix_fmt", "bgr24", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=frame_bytes
+        )
+        try:
+            while True:
+                buf = p.stdout.read(frame_bytes)
+                if len(buf) < frame_bytes:
+                    break
+                yield np.frombuffer(buf, dtype=np.uint8).reshape(H, W, 3)
+        finally:
+            p.stdout.close()
+            p.kill()
+            p.wait()
+
+    def _open_encoder(self, W: int, H: int, fps: float, out_path: str = None, audio: bool = True):
+        """x264 encoder fed with rawvideo on stdin; source audio is muxed in the same pass unless audio=False."""
+        log = open(os.path.join(self.session_dir, "encode.log"), "w")
+        cmd = [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{W}x{H}", "-r", f"{fps:.6f}", "-i", "-",
+        ]
+        if audio:
+            cmd += ["-i", self.video_path, "-map", "0:v:0", "-map", "1:a:0?", "-c:a", "copy", "-shortest"]
+        cmd += ["-c:v", "libx264", "-pix_fmt", "yuv420p", out_path or self.output_path]
+        p = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=log)
+        p.log_file = log
+        return p
+
+    def _close_encoder(self, p):
+        try:
+            p.stdin.close()
+        except BrokenPipeError:
+            pass
+        rc = p.wait()
+        p.log_file.close()
+        if rc != 0:
+            with open(p.log_file.name) as f:
+                raise RuntimeError(f"Encoder failed ({rc}):\n{f.read()}")
+
+    def _process_stream(self, *, fps, info, ocr_langs, bbox_pad, smooth, static_thresh, ocr_every=1,
+                        device="cpu", detect_max_side=None, ocr_detector=None, ocr_cache=None,
+                        inpaint_method="telea", inpaint_radius=3,
+                        inpaint_backend="opencv", reuse_thresh=0.0, reuse_feather=None, threads=None,
+                        progress_cb=None, start=None, duration=None, keep=None,
+                        out_path=None, audio=True) -> dict:
+        """
+        rawvideo decode -> masks -> cv2.inpaint -> rawvideo into x264, no PNGs.
+        Pass 1 runs OCR once per frame and keeps only the box lists + the static heatmap.
+        Pass 2 decodes again, rebuilds each mask from its boxes (thresholds are cheap),
+        unions a ring buffer of 2*smooth+1 masks and streams inpainted frames to the encoder.
+        start/duration restrict decoding to a window; keep=(lead, count) encodes only
+        frames lead..lead+count-1 of it (the rest is smoothing context for a segment).
+        Inpainting runs on `threads` threads (ordered, bounded look-ahead), with cv2.inpaint
+        or, for inpaint_backend="onnx", the shared in-process LaMa engine; reuse_thresh > 0
+        reuses patches of near-identical consecutive ROIs (PatchReuse).
+        """
+        W, H = info["width"], info["height"]
+        if W <= 0 or H <= 0:
+            raise RuntimeError("Could not probe video size")
+        total = max(1, info["frames"] or int(round(info["duration"] * fps)))
+        reader = make_text_reader(ocr_detector, ocr_langs, device, detect_max_side, ocr_cache)
+        tracker = self._make_tracker(reader, W, H, bbox_pad, ocr_every)
+
+        # pass 1: OCR + heatmap
+        heat = np.zeros((H, W), dtype=np.float32)
+        frame_boxes = []
+        for i, img in enumerate(self._iter_frames(W, H, start, duration)):
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            boxes = tracker.boxes(img, gray)
+            frame_boxes.append(boxes)
+            heat += (self._raster_mask(boxes, gray) > 0).astype(np.float32)
+            if progress_cb and i % 25 == 0:
+                progress_cb(10 + int(45 * min(1.0, i / total)), phase="stream_masks")
+        N = len(frame_boxes)
+        if not N:
+            raise RuntimeError("No frames decoded")
+        static_mask = self._static_mask(heat, N, static_thresh)
+        del heat
+
+        # pass 2: smooth + inpaint + encode
+        enc = self._open_encoder(W, H, fps, out_path=out_path, audio=audio)
+        lead, count = keep if keep else (0, N)
+
+        def raw_masks():
+            for i, img in enumerate(self._iter_frames(W, H, start, duration)):
+                if i >= N:
+                    break
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+                yield img, self._raster_mask(frame_boxes[i], gray)
+                if progress_cb and i % 25 == 0:
+                    progress_cb(60 + int(35 * min(1.0, i / total)), phase="stream_inpaint")
+
+        flags = inpaint_flags(inpaint_method)
+        engine = get_lama_engine(device) if inpaint_backend == "onnx" else None
+        reuse = PatchReuse(reuse_thresh, feather=reuse_feather) if reuse_thresh > 0 else None
+
+        def work(item):
+            frame, m = item
+            if not m.any():
+                return frame, 0, True
+            if engine is not None:
+                out, rois = engine_rois(frame, m, engine, reuse=reuse)
+            else:
+                out, rois = inpaint_rois(frame, m, inpaint_radius, flags, reuse=reuse)
+            return out, rois_area(rois), False
+
+        kept = (fm for i, fm in enumerate(self._smoothed(raw_masks(), smooth, static_mask))
+                if lead <= i < lead + count)
+        roi_px = skipped = written = 0
+        try:
+            for out, area, empty in ordered_map(work, kept, workers=threads):
+                written += 1
+                roi_px += area
+                skipped += empty
+                enc.stdin.write(out.tobytes())
+        except BrokenPipeError:
+            pass  # surfaced with the encoder log below
+        finally:
+            self._close_encoder(enc)
+
+        return {"frames": written, "width": W, "height": H, "staticpct": float(static_mask.mean() / 255.0),
+                "skipped_frames": skipped, "roi_area_pct": round(100.0 * roi_px / (N * W * H), 2),
+                "ocr": tracker.stats(), "detect": reader.stats(), "reuse": reuse.stats() if reuse else None}
+
+    # ---------- segment-parallel (GOP-aligned shards of the stream pipeline) ----------
+    def _probe_keyframes(self) -> List[float]:
+        """Keyframe times (s, relative to the file start) from packet flags; no decoding."""
+        out = self._run([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags:format=start_time",
+            "-of", "json", self.video_path
+        ])
+        info = json.loads(out or "{}")
+        t0 = float((info.get("format") or {}).get("start_time") or 0.0)
+        kf = []
+        for pkt in info.get("packets") or []:
+            if "K" in (pkt.get("flags") or "") and pkt.get("pts_time") not in (None, "N/A"):
+                kf.append(float(pkt["pts_time"]) - t0)
+        return sorted(kf)
+
+    def _plan_segments(self, duration: float, fps: float, smooth: int, workers: int) -> List[dict]:
+        """
+        Split [0, duration) into <= workers segments of >= SEGMENT_MIN_SEC, each cut
+        snapped to the nearest keyframe. Every segment also decodes `smooth` frames
+        of context on both sides so the mask window matches the serial result;
+        offsets are half a frame early so float timestamps never drop a frame.
+        """
+        n = max(1, min(int(workers), int(duration // max(1.0, SEGMENT_MIN_SEC))))
+        if n == 1:
+            return [{"index": 0, "start": 0.0, "end": duration}]
+        kf = self._probe_keyframes()
+        cuts = [0.0]
+        for k in range(1, n):
+            target = k * duration / n
+            t = min(kf, key=lambda x: abs(x - target)) if kf else target
+            if cuts[-1] < t < duration:
+                cuts.append(t)
+        cuts.append(duration)
+
+        plan = []
+        for k in range(len(cuts) - 1):
+            start, end = cuts[k], cuts[k + 1]
+            last = k == len(cuts) - 2
+            lead = min(smooth, int(round(start * fps)))
+            decode_start = max(0.0, start - (lead + 0.5) / fps) if start > 0 else 0.0
+            plan.append({
+                "index": k, "start": start, "end": end, "lead": lead,
+                "frames": 10 ** 9 if last else int(round((end - start) * fps)),
+                "decode_start": decode_start,
+                "decode_dur": None if last else (end - decode_start) + (smooth + 0.5) / fps,
+            })
+        return plan
+
+    def _concat_segments(self, parts: List[str]):
+        """Join same-parameter x264 pieces without re-encoding and mux the source audio."""
+        lst = os.path.join(self.session_dir, "segments.txt")
+        with open(lst, "w") as f:
+            for part in parts:
+                f.write(f"file '{os.path.abspath(part)}'\n")
+        self._run([
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "concat", "-safe", "0", "-i", lst,
+            "-i", self.video_path,
+            "-map", "0:v:0", "-map", "1:a:0?",
+            "-c", "copy", "-shortest",
+            self.output_path
+        ])
+
+    def _process_segments(self, *, fps, info, workers, progress_cb=None, **params) -> dict:
+        """
+        Run _process_stream on GOP-aligned segments in worker processes and concat the pieces.
+        The static-logo heatmap is computed per segment (>= SEGMENT_MIN_SEC of evidence each).
+        """
+        plan = self._plan_segments(info["duration"], fps, params["smooth"], workers)
+        if len(plan) == 1:
+            return {"segments": 1, "workers": 1,
+                    **self._process_stream(fps=fps, info=info, progress_cb=progress_cb, **params)}
+
+        seg_dir = os.path.join(self.session_dir, "segments")
+        os.makedirs(seg_dir, exist_ok=True)
+        parts = [os.path.join(seg_dir, f"seg_{seg['index']:04d}.mp4") for seg in plan]
+        params = {"fps": fps, "info": info, **params}
+        # finished segments of a resumed session are kept (the plan is deterministic)
+        results = [r for r in (self._phase("segments_done") or {}).get("results", [])
+                   if r["index"] < len(parts) and os.path.isfile(parts[r["index"]])]
+        done = {r["index"] for r in results}
+        todo = [(seg, part) for seg, part in zip(plan, parts) if seg["index"] not in done]
+        n_workers = max(1, min(int(workers), len(todo)))
+        # spawn: workers must not inherit the server's threads/locks or OpenCV's pool
+        with ProcessPoolExecutor(max_workers=n_workers, mp_context=mp.get_context("spawn")) as ex:
+            futs = [ex.submit(_inpaint_segment, self.video_path, seg_dir, part, seg, params)
+                    for seg, part in todo]
+            for fut in as_completed(futs):
+                results.append(fut.result())
+                self._mark("segments_done", results=results)
+                if progress_cb:
+                    progress_cb(10 + int(80 * len(results) / len(plan)), phase="segments",
+                                segments_done=len(results))
+        results.sort(key=lambda r: r["index"])
+
+        if progress_cb: progress_cb(92, phase="concat")
+        self._concat_segments(parts)
+        frames = sum(r["frames"] for r in results)
+        return {
+            "segments": len(plan),
+            "segments_resumed": len(done),
+            "workers": n_workers,
+            "frames": frames,
+            "width": info["width"],
+            "height": info["height"],
+            "skipped_frames": sum(r["skipped_frames"] for r in results),
+            "roi_area_pct": round(sum(r["roi_area_pct"] * r["frames"] for r in results) / max(1, frames), 2),
+            "ocr_calls": sum(r["ocr"]["ocr_calls"] for r in results),
+            "reused_rois": sum((r.get("reuse") or {}).get("reused_rois", 0) for r in results),
+            "detect": {**results[0]["detect"],
+                       "detect_calls": sum(r["detect"]["detect_calls"] for r in results),
+                       "detect_sec": round(sum(r["detect"]["detect_sec"] for r in results), 3),
+                       "cache_hits": sum(r["detect"]["cache_hits"] for r in results)},
+            "segment_stats": [
+                {"index": r["index"], "start": round(r["start"], 3), "end": round(r["end"], 3),
+                 "frames": r["frames"], "staticpct": r["staticpct"]}
+                for r in results
+            ],
+        }
+
+    # ---------- static watermark fast path (no per-frame inference) ----------
+    def _sample_frames(self, W: int, H: int, samples: int, total: int) -> Tuple[np.ndarray, bool]:
+        """
+        Up to `samples` gray frames spread over the clip in one ffmpeg call. With enough
+        keyframes only those are decoded (-skip_frame nokey) and every k-th is kept;
+        short-GOP-less clips fall back to every k-th decoded frame.
+        """
+        kf = self._probe_keyframes()
+        keyframes_only = len(kf) >= min(samples, 8)
+        pool = len(kf) if keyframes_only else max(1, total)
+        step = max(1, -(-pool // samples))
+        cmd = ["ffmpeg", "-v", "error"]
+        if keyframes_only:
+            cmd += ["-skip_frame", "nokey"]
+        cmd += ["-i", self.video_path, "-vf", f"select='not(mod(n\\,{step}))'", "-vsync", "vfr",
+                "-frames:v", str(samples), "-f", "rawvideo", "-pix_fmt", "gray", "-"]
+        p = subprocess.run(cmd, capture_output=True)
+        if p.returncode != 0:
+            raise RuntimeError(f"Command failed: {' '.join(cmd)}\n{p.stderr.decode(errors='ignore')}")
+        n = len(p.stdout) // (W * H)
+        if not n:
+            raise RuntimeError("No frames decoded")
+        return np.frombuffer(p.stdout, dtype=np.uint8, count=n * W * H).reshape(n, H, W), keyframes_only
+
+    @staticmethod
+    def _overlay_mask(stack: np.ndarray, std_thresh: float = 12.0, edge_thresh: float = 60.0,
+                      max_area: float = 0.15) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Persistent-overlay mask from sampled gray frames: pixels whose temporal std is
+        low AND that sit on strong edges of the temporal median (logo/caption strokes),
+        closed into solid marks. Components larger than max_area of the frame are a
+        static scene, not an overlay, and are dropped. Returns (mask, temporal median).
+        """
+        n, H, W = stack.shape
+        med = np.empty((H, W), np.uint8)
+        std = np.empty((H, W), np.float32)
+        for y in range(0, H, 128):  # row bands keep the float copy small
+            band = stack[:, y:y + 128].astype(np.float32)
+            med[y:y + 128] = np.median(band, axis=0).astype(np.uint8)
+            std[y:y + 128] = band.std(axis=0)
+        gx = cv2.Sobel(med, cv2.CV_32F, 1, 0, ksize=3)
+        gy = cv2.Sobel(med, cv2.CV_32F, 0, 1, ksize=3)
+        cand = ((std < std_thresh) & (cv2.magnitude(gx, gy) > edge_thresh)).astype(np.uint8) * 255
+        cand = cv2.morphologyEx(cand, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 9)))
+
+        mask = np.zeros_like(cand)
+        k, labels, st, _ = cv2.connectedComponentsWithStats(cand, connectivity=8)
+        for i in range(1, k):
+            area = st[i, cv2.CC_STAT_AREA]
+            if 0.0002 * W * H <= area <= max_area * W * H:
+                mask[labels == i] = 255
+        if mask.any():
+            mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5)), 1)
+        return mask, med
+
+    @staticmethod
+    def _delogo_chain(mask: np.ndarray) -> str:
+        """One delogo per overlay component; delogo needs its rect strictly inside the frame."""
+        H, W = mask.shape[:2]
+        n, _, st, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        parts = []
+        for i in range(1, n):
+            x, y = max(1, st[i, cv2.CC_STAT_LEFT]), max(1, st[i, cv2.CC_STAT_TOP])
+            x2 = min(W - 2, st[i, cv2.CC_STAT_LEFT] + st[i, cv2.CC_STAT_WIDTH])
+            y2 = min(H - 2, st[i, cv2.CC_STAT_TOP] + st[i, cv2.CC_STAT_HEIGHT])
+            if x2 > x and y2 > y:
+                parts.append(f"delogo=x={x}:y={y}:w={x2 - x}:h={y2 - y}")
+        return ",".join(parts)
+
+    def _process_static(self, *, fps, info, samples=32, static_filter="removelogo", progress_cb=None) -> dict:
+        """
+        Fixed-watermark fast path: sample ~`samples` frames (keyframes only), derive the
+        overlay mask from their temporal median/std, then remove it in a single ffmpeg
+        pass with removelogo (mask image) or delogo (component rects). No OCR, no
+        per-frame Python work; frames never touch disk.
+        """
+        W, H = info["width"], info["height"]
+        if W <= 0 or H <= 0:
+            raise RuntimeError("Could not probe video size")
+        total = max(1, info["frames"] or int(round(info["duration"] * fps)))
+        if progress_cb: progress_cb(10, phase="static_sample")
+        stack, keyframes_only = self._sample_frames(W, H, samples, total)
+        if progress_cb: progress_cb(30, phase="static_mask")
+        mask, _ = self._overlay_mask(stack)
+        n_samples = len(stack)
+        del stack
+
+        if progress_cb: progress_cb(40, phase="static_encode")
+        vf = None
+        if mask.any():
+            if static_filter == "delogo":
+                vf = self._delogo_chain(mask) or None
+            else:
+                mask_path = os.path.join(self.masks_dir, "overlay.png")
+                cv2.imwrite(mask_path, mask)
+                vf = "removelogo=f=" + mask_path.replace("\\", "/").replace(":", "\\:")
+        if vf:
+            video = ["-vf", vf, "-c:v", "libx264", "-pix_fmt", "yuv420p"]
+        else:
+            video = ["-c:v", "copy"]  # nothing persistent found: pass the video through
+        self._run([
+            "ffmpeg", "-y", "-v", "error", "-i", self.video_path,
+            "-map", "0:v:0", "-map", "0:a?", *video, "-c:a", "copy",
+            self.output_path
+        ])
+        n_comp = cv2.connectedComponents(mask, connectivity=8)[0] - 1
+        return {"frames": total, "width": W, "height": H, "static_filter": static_filter if vf else None,
+                "samples": n_samples, "keyframes_only": keyframes_only,
+                "overlay_components": n_comp, "staticpct": float(mask.mean() / 255.0)}
+
+    # ---------- memory pre-flight ----------
+    def _admit(self, mode: str, info: dict, fps: float, *, scratch: str, smooth: int, workers: int,
+               detect_max_side, static_samples: int, mem_wait, progress_cb=None) -> Tuple[str, str]:
+        """
+        Estimate the job's working set from the probe (estimate_job_bytes), resolve
+        mode=auto to frames when that fits the free budget and to the flat-memory stream
+        pipeline otherwise, then reserve it in MEM_ADMISSION: refused outright when it can
+        never fit, queued (phase waiting_memory) for up to mem_wait seconds when it only
+        has to wait for running jobs. Returns (mode, scratch).
+        """
+        W, H = info["width"], info["height"]
+        frames = info["frames"] or int(round(info["duration"] * fps))
+        scratch = (scratch or "auto").lower()
+        free = MEM_ADMISSION.free_bytes()
+
+        def estimate(m: str) -> dict:
+            kw = dict(smooth=smooth, detect_max_side=detect_max_side, samples=static_samples,
+                      workers=max(1, min(int(workers), int(info["duration"] // max(1.0, SEGMENT_MIN_SEC)))))
+            if m == "frames" and not self.resume_key and scratch != "disk":
+                need = frame_scratch_bytes(W, H, frames)
+                if pick_scratch_root(need, self.work_root, mode=scratch)["tier"] == "ram":
+                    return estimate_job_bytes(m, W, H, frames, ram_scratch=True, **kw)
+            return estimate_job_bytes(m, W, H, frames, **kw)
+
+        reason, auto = None, mode == "auto"
+        if auto:
+            est = estimate("frames")
+            if free is not None and est["bytes"] > free:
+                reason = f"frames needs ~{est['bytes'] // MB} MB, {free // MB} MB free"
+                est = estimate("stream")
+            mode = est["mode"]
+        else:
+            est = estimate(mode)
+        if "ram_scratch" in est["parts"] and free is not None and est["bytes"] > free and scratch == "auto":
+            # frames on tmpfs would not fit next to the running jobs; disk scratch still might
+            est, scratch = estimate_job_bytes(mode, W, H, frames, smooth=smooth,
+                                              detect_max_side=detect_max_side), "disk"
+
+        def waiting(free_now: int):
+            if progress_cb:
+                progress_cb(3, phase="waiting_memory", memory_needed_mb=est["bytes"] // MB,
+                            memory_free_mb=free_now // MB)
+
+        t0 = time.monotonic()
+        self._mem_token = MEM_ADMISSION.acquire(est["bytes"], MEM_WAIT_SEC if mem_wait is None else mem_wait,
+                                                on_wait=waiting)
+        self.mem_plan = {
+            "estimate_mb": round(est["bytes"] / MB, 1),
+            "estimate_parts_mb": {k: round(v / MB, 1) for k, v in est["parts"].items()},
+            "budget_mb": round(MEM_ADMISSION.budget_bytes / MB, 1) if MEM_ADMISSION.budget_bytes > 0 else None,
+            "admission_wait_sec": round(time.monotonic() - t0, 2),
+        }
+        if auto:
+            self.mem_plan["auto_mode"] = mode
+            self.mem_plan["auto_reason"] = reason or "frames fits the free memory budget"
+        return mode, scratch
+
     # ---------- public ----------
-    def process(self, *, ocr_langs="en", bbox_pad=8, device="cpu", smooth=1, static_thresh=0.25, progress_cb=None):
+    def process(self, **kwargs):
+        """
+        _process() under the checkpoint claim, holding its memory reservation until it
+        returns; diagnostics["memory"] gets the estimate and the peak RSS per phase.
+        """
+        cb = kwargs.get("progress_cb")
+        with self._claim(), PhaseMemory() as mem:
+            def progress(pct, **diag):
+                if "phase" in diag:
+                    mem.phase(diag["phase"])
+                if cb:
+                    cb(pct, **diag)
+
+            try:
+                res = self._process(**{**kwargs, "progress_cb": progress})
+            finally:
+                MEM_ADMISSION.release(self._mem_token)
+                self._mem_token = None
+            res.diagnostics["memory"] = {**self.mem_plan, **mem.stats()}
+            return res
+
+    def _process(self, *, ocr_langs="en", bbox_pad=8, device="cpu", smooth=1, static_thresh=0.25,
+                scratch="auto", mode="auto", ocr_every=1, workers=None, inpaint_method="telea",
+                inpaint_radius=3, inpaint_backend="auto", lama_batch=None, frame_format="png",
+                detect_max_side=None, ocr_detector=None, static_samples=32, static_filter="removelogo",
+                reuse_thresh=0.0, reuse_feather=None, ocr_cache=None, mem_wait=None, progress_cb=None):
+        """
+        mode: auto     -> (default) frames when its estimated working set fits the free memory
+                          budget, else stream (see _admit)
+              frames   -> frame dirs + iopaint LaMa (OpenCV fallback)
+              stream   -> pipe-only decode/inpaint/encode, no intermediate image files
+              segments -> stream pipeline on GOP-aligned shards in `workers` processes,
+                          joined with the concat demuxer (no re-encode)
+              static   -> fixed watermark only: mask from `static_samples` sampled keyframes,
+                          removed in one ffmpeg pass with `static_filter` (removelogo|delogo)
+        reuse_thresh: > 0 reuses an inpainted ROI patch while the ROI (hole + context) stays
+                      within this mean abs difference (0..255) of the frame it was made for
+        reuse_feather: px inside the hole over which a reused patch is blended into the current
+                       frame's context (0 = hard substitution; default INPAINT_REUSE_FEATHER)
+        inpaint_backend: auto|onnx|iopaint|opencv. auto = in-process LaMa (ONNX) when
+                         LAMA_ONNX_PATH is usable, else the iopaint CLI; stream/segments
+                         modes use ONNX or OpenCV. LaMa failures fall back to OpenCV.
+        inpaint_method/inpaint_radius: cv2.inpaint settings (telea|ns) for the OpenCV paths
+        frame_format: png|png0|bmp|npy intermediate frames for mode=frames (see frame_io);
+                      png0/bmp/npy skip zlib on every write and read at the cost of disk
+        detect_max_side: downscale frames to this longer side for OCR detection only
+                         (default OCR_DETECT_MAX_SIDE, 0 = full resolution)
+        ocr_detector: readtext (EasyOCR detect + recognize) | detect (EasyOCR detector only)
+                      | east | db (OpenCV DNN); masks need boxes only (default OCR_DETECTOR)
+        ocr_cache: off | job | shared - reuse detections for frames with an equal perceptual
+                   hash, per request or across requests (default OCR_CACHE)
+        mem_wait: seconds to queue for memory held by running jobs (default MEM_WAIT_SEC);
+                  jobs that exceed the whole budget are refused with MemoryBudgetError
+        """
+        backend = resolve_backend(inpaint_backend)
+        frame_format = check_frame_format(frame_format)
+        ocr_detector = check_detector(ocr_detector)
+        ocr_cache = check_ocr_cache(ocr_cache)
+        inpaint_flags(inpaint_method)  # validate early
+        if not 1 <= int(inpaint_radius) <= 50:
+            raise ValueError("inpaint_radius must be between 1 and 50")
+        if not 0 <= float(reuse_thresh) <= 64:
+            raise ValueError("reuse_thresh must be between 0 and 64")
+        if reuse_feather is not None and not 0 <= int(reuse_feather) <= 64:
+            raise ValueError("reuse_feather must be between 0 and 64")
+        if int(smooth) < 0:
+            raise ValueError("smooth must be >= 0")
+        if mode not in ("auto",) + MEM_MODES:
+            raise ValueError("mode must be 'auto', 'frames', 'stream', 'segments' or 'static'")
+        scratch = (scratch or "auto").lower()
+        if scratch not in SCRATCH_MODES:
+            raise ValueError("scratch must be 'auto', 'ram' or 'disk'")
         # phase 1: probe + extract
         if progress_cb: progress_cb(5, phase="probe")
-        fps = self._probe_fps()
-        if progress_cb: progress_cb(10, phase="extract")
-        self._extract_frames()
+        probe = self._phase("probe")
+        if probe:
+            fps, info = probe["fps"], probe["info"]
+        else:
+            fps, info = self._probe_fps(), self._probe_stream()
+            self._mark("probe", fps=fps, info=info)
+        mode, scratch = self._admit(mode, info, fps, scratch=scratch, smooth=smooth,
+                                    workers=workers or SEGMENT_WORKERS, detect_max_side=detect_max_side,
+                                    static_samples=static_samples, mem_wait=mem_wait, progress_cb=progress_cb)
+        if mode in ("stream", "segments"):
+            params = dict(ocr_langs=ocr_langs, bbox_pad=bbox_pad, smooth=smooth, static_thresh=static_thresh,
+                          ocr_every=ocr_every, device=device, detect_max_side=detect_max_side,
+                          ocr_detector=ocr_detector, ocr_cache=ocr_cache, reuse_thresh=float(reuse_thresh),
+                          reuse_feather=reuse_feather,
+                          inpaint_method=inpaint_method,
+                          inpaint_radius=inpaint_radius, inpaint_backend="onnx" if backend == "onnx" else "opencv")
+            if mode == "segments":
+                stats = self._process_segments(fps=fps, info=info,
+                                               workers=workers or SEGMENT_WORKERS, progress_cb=progress_cb, **params)
+            else:
+                stats = self._process_stream(fps=fps, info=info, progress_cb=progress_cb, **params)
+            if progress_cb: progress_cb(100, phase="done")
+            return VideoInpaintResult(
+                output_path=self.output_path,
+                diagnostics={
+                    "mode": mode,
+                    "device": device,
+                    "fps": fps,
+                    "bbox_pad": bbox_pad,
+                    "smooth": smooth,
+                    "static_thresh": static_thresh,
+                    "inpaint_backend": params["inpaint_backend"],
+                    "inpaint_method": inpaint_method,
+                    "inpaint_radius": inpaint_radius,
+                    **stats
+                }
+            )
+        elif mode == "static":
+            if static_filter not in ("removelogo", "delogo"):
+                raise ValueError("static_filter must be 'removelogo' or 'delogo'")
+            if not 4 <= int(static_samples) <= 120:
+                raise ValueError("static_samples must be between 4 and 120")
+            stats = self._process_static(fps=fps, info=info, samples=int(static_samples),
+                                         static_filter=static_filter, progress_cb=progress_cb)
+            if progress_cb: progress_cb(100, phase="done")
+            return VideoInpaintResult(
+                output_path=self.output_path,
+                diagnostics={"mode": mode, "fps": fps, **stats}
+            )
+
+        # resumable sessions keep frames on disk: tmpfs does not survive an instance recycle
+        resumed = []
+        if self.resume_key:
+            scratch = "disk"
+        scratch_info = self._setup_scratch(scratch, info, fps)
+        self._open_frames(frame_format, info)
+
+        if self._phase("extract"):
+            resumed.append("extract")
+        else:
+            if progress_cb: progress_cb(10, phase="extract")
+            self.frames.clear()  # drop a partial extraction
+            self._extract_frames()
+            self._mark("extract", frames=len(self.frames), fps=fps)
+        self.inpainted = self.frames.sibling(self.inpainted_dir)
 
         # phase 2: masks
-        if progress_cb: progress_cb(40, phase="masks_start")
-        self._generate_masks(ocr_langs=ocr_langs, bbox_pad=bbox_pad, smooth=smooth, static_thresh=static_thresh)
-        if progress_cb: progress_cb(60, phase="masks_done")
+        mask_stats = self._phase("masks")
+        if mask_stats is not None:
+            resumed.append("masks")
+        else:
+            if progress_cb: progress_cb(40, phase="masks_start")
+            mask_stats = self._generate_masks(ocr_langs=ocr_langs, bbox_pad=bbox_pad, smooth=smooth,
+                                              static_thresh=static_thresh, ocr_every=ocr_every, device=device,
+                                              detect_max_side=detect_max_side, ocr_detector=ocr_detector,
+                                              ocr_cache=ocr_cache)
+            self._mark("masks", **mask_stats)
+            if progress_cb: progress_cb(60, phase="masks_done")
 
-        # phase 3: inpaint
-        try:
-            if progress_cb: progress_cb(65, phase="lama_start")
-            self._run_lama_batch(device=device)
-            if progress_cb: progress_cb(90, phase="lama_done")
-        except Exception:
-            # fallback OpenCV
-            if progress_cb: progress_cb(80, phase="opencv_fallback")
-            import cv2, os
-            for fname in sorted(os.listdir(self.frames_dir)):
-                src = os.path.join(self.frames_dir, fname)
-                msk = os.path.join(self.masks_dir, fname)
-                out = os.path.join(self.inpainted_dir, fname)
-                im = cv2.imread(src)
-                mk = cv2.imread(msk, cv2.IMREAD_GRAYSCALE)
-                res = cv2.inpaint(im, mk, 3, cv2.INPAINT_TELEA)
-                cv2.imwrite(out, res)
-            if progress_cb: progress_cb(90, phase="opencv_done")
+        # phase 3: inpaint (frame-range checkpoints: leading frames already in inpainted/)
+        inpaint_stats = self._phase("inpaint")
+        if inpaint_stats is not None:
+            resumed.append("inpaint")
+        else:
+            start_at = int((self._phase("inpaint_progress") or {}).get("done", 0))
+            if start_at:
+                resumed.append(f"inpaint@{start_at}")
+            resume = {"start_at": start_at,
+                      "checkpoint": lambda n: self._mark("inpaint_progress", done=n)}
+            masks = MaskStore(self.mask_store_path)
+            if backend != "opencv":
+                try:
+                    if progress_cb: progress_cb(65, phase="lama_start")
+                    if backend == "onnx":
+                        inpaint_stats = {"inpaint_backend": "onnx",
+                                         **self._run_lama_engine(masks, device, batch_size=lama_batch,
+                                                                 reuse_thresh=reuse_thresh,
+                                                                 reuse_feather=reuse_feather, **resume)}
+                    else:
+                        inpaint_stats = {"inpaint_backend": "iopaint",
+                                         **self._run_lama_batch(masks, device=device,
+                                                                reuse_thresh=reuse_thresh,
+                                                                 reuse_feather=reuse_feather, **resume)}
+                    if progress_cb: progress_cb(90, phase="lama_done")
+                except Exception as e:
+                    fallback_reason = f"{backend}: {e}"
+                    # keep whatever LaMa finished before it failed
+                    resume["start_at"] = int(self.manifest["phases"].get("inpaint_progress", {}).get("done", start_at))
+            if inpaint_stats is None:
+                # fallback OpenCV (or requested directly)
+                if progress_cb: progress_cb(80, phase="opencv_fallback")
+                inpaint_stats = {"inpaint_backend": "opencv",
+                                 **opencv_rois_dir(self.frames, masks, self.inpainted,
+                                                   inpaint_method, inpaint_radius, reuse_thresh=reuse_thresh,
+                                                   reuse_feather=reuse_feather,
+                                                   **resume),
+                                 "inpaint_method": inpaint_method, "inpaint_radius": inpaint_radius}
+                if backend != "opencv":
+                    inpaint_stats["fallback_reason"] = fallback_reason
+                if progress_cb: progress_cb(90, phase="opencv_done")
+            self._mark("inpaint", **inpaint_stats)
 
         # phase 4: reassemble
-        if progress_cb: progress_cb(95, phase="reassemble")
-        self._reassemble(fps=fps)
+        if self._phase("reassemble") and os.path.isfile(self.output_path):
+            resumed.append("reassemble")
+        else:
+            if progress_cb: progress_cb(95, phase="reassemble")
+            self._reassemble(fps=fps)
+            self._mark("reassemble", output_path=self.output_path)
 
         if progress_cb: progress_cb(100, phase="done")
         return VideoInpaintResult(
             output_path=self.output_path,
             diagnostics={
+                "mode": mode,
                 "device": device,
                 "fps": fps,
                 "bbox_pad": bbox_pad,
                 "smooth": smooth,
-                "static_thresh": static_thresh
+                "static_thresh": static_thresh,
+                "scratch": scratch_info,
+                "frame_format": frame_format,
+                "frame_bytes": self.frames.size_bytes() + self.inpainted.size_bytes(),
+                "checkpoint_key": self.resume_key,
+                "resumed": resumed,
+                **inpaint_stats,
+                **mask_stats
             }
         )
 
+    def finish(self, ok: bool):
+        """
+        End of a request/job: remove everything after success or for a one-off session;
+        a failed resumable run keeps its checkpoints (tracked, so the workspace TTL reclaims
+        them unless retried) and drops only the tmpfs scratch. A run rejected as a
+        duplicate never owned the dirs and leaves them alone.
+        """
+        if self.resume_key and not self.claimed:
+            return
+        if ok or not self.resume_key:
+            self.cleanup()
+        else:
+            self.release_scratch()
+            WORKSPACE.track(self.session_dir, kind="inpaint_checkpoint")
+
+    def release_scratch(self):
+        """Drop a tmpfs scratch dir (frames/masks/inpainted in RAM); the session dir and its checkpoints stay."""
+        if self.scratch_dir != self.session_dir:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
     def cleanup(self):
-        try:
-            shutil.rmtree(self.session_dir, ignore_errors=True)
-        except Exception:
-            pass
+        for d in {self.session_dir, self.scratch_dir}:
+            try:
+                shutil.rmtree(d, ignore_errors=True)
+            except Exception:
+                pass
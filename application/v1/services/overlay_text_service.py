@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Optional
 from werkzeug.utils import secure_filename
 
-from application.utils.gcs_upload import upload_to_gcs
+from application.publisher import PUBLISH_MANAGER
 
 @dataclass
 class OverlayResult:
@@ -106,11 +106,12 @@ class OverlayTextService:
         ]
         self._run(cmd)
 
-        gcs_url = None
+        # Publish in the background; the URL is known up front, completion via publish_id
+        publish = None
         if bucket_name:
             dest_name = os.path.basename(self.output_path)
             gcs_path = f"overlay/{dest_name}"
-            gcs_url = upload_to_gcs(self.output_path, bucket_name, gcs_path)
+            publish = PUBLISH_MANAGER.submit(self.output_path, bucket_name, gcs_path)
 
         return OverlayResult(
             output_path=self.output_path,
@@ -120,6 +121,16 @@ class OverlayTextService:
                 "fontsize": fontsize, "fontcolor": fontcolor,
                 "box": box, "boxcolor": boxcolor, "boxborderw": boxborderw,
                 "fontfile": fontfile,
-                "gcs_url": gcs_url,
+                "gcs_url": publish["gcs_url"] if publish else None,
+                "publish_id": publish["id"] if publish else None,
+                "publish_status": publish["status"] if publish else None,
             },
         )
+
+    def cleanup(self):
+        # the upload is only needed while rendering; outputs are GC'd by the workspace quota
+        try:
+            if os.path.isfile(self.video_path):
+                os.remove(self.video_path)
+        except Exception:
+            pass
@@ -1,4 +1,5 @@
 import os
+import json
 import uuid
 import shutil
 import subprocess
@@ -9,8 +10,15 @@ from typing import Optional, Tuple, Dict, Any
 from flask import current_app, request
 from werkzeug.utils import secure_filename
 
-import cv2
-import easyocr
+from application.workspace import frame_scratch_bytes, pick_scratch_root
+from application.utils.inpaint_ops import engine_rois_dir, iopaint_rois, opencv_rois_dir
+from application.utils.mask_store import MaskStore, MaskStoreWriter
+from application.utils.frame_io import FRAME_FORMATS, display_size, frame_store
+from application.utils.ocr_detect import OCR_CACHE_MODES, OCR_DETECTORS, make_text_reader
+from application.utils.lama_engine import INPAINT_BACKENDS, get_lama_engine, resolve_backend
+from application.utils.mem_guard import (
+    MB, MEM_ADMISSION, MEM_WAIT_SEC, MemoryBudgetError, PhaseMemory, estimate_job_bytes
+)
 
 
 ALLOWED_VIDEO_EXTS = {".mp4", ".mov", ".mkv", ".avi", ".m4v", ".webm"}
@@ -42,6 +50,29 @@ def _run(cmd: list):
     return res
 
 
+def _probe_video(path: str) -> Dict[str, Any]:
+    """Decoded width/height/frame count (nb_frames, else duration-based) for scratch sizing."""
+    res = _run([
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_streams", "-show_format",  # full entry: rotation lives in tags / side data
+        "-of", "json", path
+    ])
+    info = json.loads(res.stdout.decode(errors="ignore") or "{}")
+    st = (info.get("streams") or [{}])[0]
+    fmt = info.get("format") or {}
+    try:
+        frames = int(st.get("nb_frames") or 0)
+    except ValueError:
+        frames = 0
+    W, H = display_size(st)  # decoded (autorotated) size
+    return {
+        "width": W,
+        "height": H,
+        "frames": frames,
+        "duration": float(st.get("duration") or fmt.get("duration") or 0.0),
+    }
+
+
 @dataclass
 class InpaintArgs:
     input_path: str
@@ -50,6 +81,13 @@ class InpaintArgs:
     fps: int = DEFAULT_FPS
     device: str = DEFAULT_DEVICE
     job_root: Optional[str] = None  # a unique folder per job
+    scratch: str = "auto"           # auto|ram|disk tier for frames/masks/inpainted
+    inpaint_backend: str = "auto"   # auto|onnx|iopaint|opencv
+    frame_format: str = "png"       # png|png0|bmp|npy intermediate frames (see frame_io)
+    detect_max_side: Optional[int] = None  # OCR on frames downscaled to this side (None = OCR_DETECT_MAX_SIDE)
+    ocr_detector: Optional[str] = None     # readtext|detect|east|db (None = OCR_DETECTOR)
+    reuse_thresh: float = 0.0              # > 0: reuse inpainted patches across near-identical frames
+    ocr_cache: Optional[str] = None        # off|job|shared perceptual-hash detection cache (None = OCR_CACHE)
 
 
 class _Pipeline:
@@ -57,59 +95,89 @@ class _Pipeline:
 
     def __init__(self, args: InpaintArgs):
         self.args = args
-        self.frames_dir = os.path.join(args.job_root, "frames")
-        self.masks_dir = os.path.join(args.job_root, "masks")
-        self.inpainted_dir = os.path.join(args.job_root, "inpainted")
+
+        # Frame dirs go to tmpfs when frame count x frame size fits the RAM headroom
+        info = _probe_video(args.input_path)
+        frames = info["frames"] or int(round(info["duration"] * args.fps))
+        need = frame_scratch_bytes(info["width"], info["height"], frames)
+        choice = pick_scratch_root(need, args.job_root, mode=args.scratch)
+        self.scratch_info = {"tier": choice["tier"], "need_bytes": need, "reason": choice["reason"]}
+        self.mem_estimate = estimate_job_bytes("frames", info["width"], info["height"], frames, smooth=0,
+                                               detect_max_side=args.detect_max_side,
+                                               ram_scratch=choice["tier"] == "ram")
+        self.memory: Dict[str, Any] = {}
+        if choice["tier"] == "ram":
+            self.scratch_root = os.path.join(choice["root"], os.path.basename(args.job_root))
+        else:
+            self.scratch_root = args.job_root
+        self.frames_dir = os.path.join(self.scratch_root, "frames")
+        self.masks_dir = os.path.join(self.scratch_root, "masks")
+        self.inpainted_dir = os.path.join(self.scratch_root, "inpainted")
+        self.mask_store_path = os.path.join(self.masks_dir, "masks.msk")
+        self.roi_stats: Dict[str, Any] = {}
+        self.detect_stats: Dict[str, Any] = {}
+        self.backend = resolve_backend(args.inpaint_backend)
 
         # Fresh job dirs
-        if os.path.exists(args.job_root):
-            shutil.rmtree(args.job_root)
+        for d in {args.job_root, self.scratch_root}:
+            if os.path.exists(d):
+                shutil.rmtree(d)
         os.makedirs(self.frames_dir, exist_ok=True)
         os.makedirs(self.masks_dir, exist_ok=True)
         os.makedirs(self.inpainted_dir, exist_ok=True)
+        self.frames = frame_store(self.frames_dir, args.frame_format, info["width"], info["height"],
+                                  pattern="frame_%05d")
+        self.inpainted = None  # sized after extraction (npy stacks are allocated up front)
 
     def extract_frames(self):
         _run([
             "ffmpeg", "-y", "-i", self.args.input_path,
-            f"{self.frames_dir}/frame_%05d.png",
+            *self.frames.ffmpeg_output(),
             "-hide_banner", "-loglevel", "error"
         ])
 
     def generate_masks(self):
-        reader = easyocr.Reader(
-            self.args.ocr_langs.split(","), gpu=(self.args.device.lower() == "cuda")
-        )
-        frame_files = sorted(f for f in os.listdir(self.frames_dir) if f.endswith(".png"))
-        for frame in frame_files:
-            frame_path = os.path.join(self.frames_dir, frame)
-            img = cv2.imread(frame_path)
+        # boxes only, one compact store instead of a PNG per frame; rasterized at inpaint time
+        reader = make_text_reader(self.args.ocr_detector, self.args.ocr_langs, self.args.device,
+                                  self.args.detect_max_side, self.args.ocr_cache)
+        store = None
+        for frame in self.frames.names():
+            img = self.frames.read(frame)
             if img is None:
                 continue
-            mask = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            mask[:] = 0
-            results = reader.readtext(frame_path)
+            if store is None:
+                store = MaskStoreWriter(self.mask_store_path, img.shape[1], img.shape[0])
+            results = reader.readtext(img)
             # results: list of (bbox, text, conf), bbox is 4 points
+            boxes = []
             for (bbox, _, _) in results:
-                pt1 = tuple(map(int, bbox[0]))
-                pt3 = tuple(map(int, bbox[2]))
-                cv2.rectangle(mask, pt1, pt3, 255, -1)
-            cv2.imwrite(os.path.join(self.masks_dir, frame), mask)
+                (x1, y1), (x2, y2) = tuple(map(int, bbox[0])), tuple(map(int, bbox[2]))
+                boxes.append((x1, y1, x2, y2))
+            store.append(frame, boxes)
+        if store is None:
+            raise RuntimeError("No frames extracted")
+        store.close()
+        self.detect_stats = reader.stats()
 
     def inpaint(self):
-        _run([
-            "iopaint", "run",
-            "--model", "lama",
-            "--device", self.args.device,
-            "--image", self.frames_dir,
-            "--mask", self.masks_dir,
-            "--output", self.inpainted_dir
-        ])
+        # LaMa / OpenCV on padded crops around the text only, pasted back into full frames
+        masks = MaskStore(self.mask_store_path)
+        self.inpainted = self.frames.sibling(self.inpainted_dir)
+        if self.backend == "onnx":
+            self.roi_stats = engine_rois_dir(self.frames, masks, self.inpainted,
+                                             get_lama_engine(self.args.device), reuse_thresh=self.args.reuse_thresh)
+        elif self.backend == "opencv":
+            self.roi_stats = opencv_rois_dir(self.frames, masks, self.inpainted, reuse_thresh=self.args.reuse_thresh)
+        else:
+            self.roi_stats = iopaint_rois(self.frames, masks, self.inpainted, self.scratch_root,
+                                          device=self.args.device, reuse_thresh=self.args.reuse_thresh)
+        self.roi_stats["mask_store_bytes"] = masks.size_bytes
+        self.roi_stats["frame_bytes"] = self.frames.size_bytes() + self.inpainted.size_bytes()
 
     def reassemble(self):
         _run([
             "ffmpeg", "-y",
-            "-framerate", str(self.args.fps),
-            "-i", f"{self.inpainted_dir}/frame_%05d.png",
+            *self.inpainted.ffmpeg_input(self.args.fps),
             "-i", self.args.input_path,
             "-map", "0:v", "-map", "1:a?",
             "-c:v", "libx264", "-pix_fmt", "yuv420p",
@@ -120,11 +188,22 @@ class _Pipeline:
 
     def run(self) -> str:
         _check_dep("ffmpeg")
-        _check_dep("iopaint")
-        self.extract_frames()
-        self.generate_masks()
-        self.inpaint()
-        self.reassemble()
+        if self.backend == "iopaint":
+            _check_dep("iopaint")
+        token = None
+        try:
+            # reserve the estimated working set first: refused (MemoryBudgetError) if it can never fit
+            token = MEM_ADMISSION.acquire(self.mem_estimate["bytes"], MEM_WAIT_SEC)
+            with PhaseMemory() as mem:
+                for phase in (self.extract_frames, self.generate_masks, self.inpaint, self.reassemble):
+                    mem.phase(phase.__name__)
+                    phase()
+            self.memory = {"estimate_mb": round(self.mem_estimate["bytes"] / MB, 1), **mem.stats()}
+        finally:
+            MEM_ADMISSION.release(token)
+            # tmpfs pages are RAM: never leave frames behind there
+            if self.scratch_root != self.args.job_root:
+                shutil.rmtree(self.scratch_root, ignore_errors=True)
         return self.args.output_path
 
 
@@ -178,6 +257,31 @@ class TextInpaintService:
             device = form.get("device", DEFAULT_DEVICE).lower()
             if device not in {"cpu", "cuda"}:
                 return {"error": "device must be 'cpu' or 'cuda'"}, 400
+            scratch = form.get("scratch", "auto").lower()
+            if scratch not in {"auto", "ram", "disk"}:
+                return {"error": "scratch must be 'auto', 'ram' or 'disk'"}, 400
+            inpaint_backend = form.get("inpaint_backend", "auto").lower()
+            if inpaint_backend not in INPAINT_BACKENDS:
+                return {"error": f"inpaint_backend must be one of {sorted(INPAINT_BACKENDS)}"}, 400
+            try:
+                detect_max_side = max(0, int(form["detect_max_side"])) if form.get("detect_max_side") else None
+            except ValueError:
+                return {"error": "detect_max_side must be an integer"}, 400
+            ocr_detector = form.get("ocr_detector") or None
+            ocr_cache = form.get("ocr_cache") or None
+            if ocr_cache and ocr_cache.lower() not in OCR_CACHE_MODES:
+                return {"error": f"ocr_cache must be one of {list(OCR_CACHE_MODES)}"}, 400
+            try:
+                reuse_thresh = float(form.get("reuse_thresh", 0.0))
+            except ValueError:
+                return {"error": "reuse_thresh must be a number"}, 400
+            if not 0 <= reuse_thresh <= 64:
+                return {"error": "reuse_thresh must be between 0 and 64"}, 400
+            if ocr_detector and ocr_detector.lower() not in OCR_DETECTORS:
+                return {"error": f"ocr_detector must be one of {list(OCR_DETECTORS)}"}, 400
+            frame_format = form.get("frame_format", "png").lower()
+            if frame_format not in FRAME_FORMATS:
+                return {"error": f"frame_format must be one of {list(FRAME_FORMATS)}"}, 400
 
             base_name = os.path.splitext(os.path.basename(input_path))[0]
             output_path = os.path.join(self.output_dir, f"{base_name}_no_text.mp4")
@@ -190,6 +294,13 @@ class TextInpaintService:
                 fps=fps,
                 device=device,
                 job_root=job_root,
+                scratch=scratch,
+                inpaint_backend=inpaint_backend,
+                frame_format=frame_format,
+                detect_max_side=detect_max_side,
+                ocr_detector=ocr_detector,
+                reuse_thresh=reuse_thresh,
+                ocr_cache=ocr_cache,
             )
             pipeline = _Pipeline(args)
             final_path = pipeline.run()
@@ -202,9 +313,18 @@ class TextInpaintService:
                 "job_id": job_id,
                 "output_file": f"outputs/{rel_output}",
                 "download_url": download_url,
-                "params": {"ocr_langs": ocr_langs, "fps": fps, "device": device},
+                "params": {"ocr_langs": ocr_langs, "fps": fps, "device": device, "scratch": scratch,
+                           "inpaint_backend": pipeline.backend, "frame_format": frame_format,
+                           "ocr_detector": pipeline.detect_stats.get("detector")},
+                "scratch": pipeline.scratch_info,
+                "roi": pipeline.roi_stats,
+                "detect": pipeline.detect_stats,
+                "memory": pipeline.memory,
             }, 200
 
+        except MemoryBudgetError as e:
+            return {"error": str(e)}, 503
+
         except Exception as e:
             traceback.print_exc()
             return {"error": str(e)}, 500
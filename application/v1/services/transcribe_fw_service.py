@@ -3,6 +3,8 @@ from dataclasses import dataclass
 from typing import List, Dict, Optional
 from werkzeug.utils import secure_filename
 
+from application.utils.model_registry import MODEL_REGISTRY
+
 
 @dataclass
 class TranscribeFWResult:
@@ -23,6 +25,9 @@ class TranscribeFWService:
     """
 
     ALLOWED_MEDIA = {"mp4","mov","mkv","avi","webm","m4v","mp3","wav","m4a","aac","flac","ogg"}
+    # rough int8 CPU footprint, used when the load's RSS delta can't be measured
+    MODEL_EST_BYTES = {"tiny": 100 * 1024 ** 2, "base": 200 * 1024 ** 2, "small": 500 * 1024 ** 2,
+                       "medium": 1500 * 1024 ** 2, "large-v3": 3 * 1024 ** 3}
 
     @staticmethod
     def allowed_file(filename: str) -> bool:
@@ -110,28 +115,34 @@ class TranscribeFWService:
         # 1) extract wav
         self.extract_audio_16k_mono()
 
-        # 2) transcribe with faster-whisper (CPU)
+        # 2) transcribe with faster-whisper (CPU); the model is loaded once per process
         from faster_whisper import WhisperModel
-        model = WhisperModel(
-            model_size,
-            device="cpu",
-            compute_type="int8"   # fastest on CPU
-        )
-
-        segments_iter, info = model.transcribe(
-            self.audio_wav,
-            language=language,
-            beam_size=1,
-            vad_filter=True
+        model = MODEL_REGISTRY.get(
+            "faster_whisper", (model_size, "int8"), "cpu",
+            lambda: WhisperModel(
+                model_size,
+                device="cpu",
+                compute_type="int8"   # fastest on CPU
+            ),
+            est_bytes=self.MODEL_EST_BYTES.get(model_size, 1024 ** 3),
         )
 
+        # shared model: one transcription at a time (segments decode lazily while iterating)
         segments: List[Dict] = []
-        for seg in segments_iter:
-            segments.append({
-                "start": float(seg.start),
-                "end": float(seg.end),
-                "text": seg.text.strip()
-            })
+        with MODEL_REGISTRY.use_lock("faster_whisper", (model_size, "int8"), "cpu"):
+            segments_iter, info = model.transcribe(
+                self.audio_wav,
+                language=language,
+                beam_size=1,
+                vad_filter=True
+            )
+
+            for seg in segments_iter:
+                segments.append({
+                    "start": float(seg.start),
+                    "end": float(seg.end),
+                    "text": seg.text.strip()
+                })
 
         # 3) write outputs
         with open(self.json_path, "w", encoding="utf-8") as f:
@@ -76,3 +76,11 @@ class VideoRotateService:
             output_path=self.output_path,
             diagnostics={"degrees": deg, "metadata_only": metadata_only, "crf": crf, "preset": preset, "copy_audio": copy_audio}
         )
+
+    def cleanup(self):
+        # the upload is only needed while rendering; outputs are GC'd by the workspace quota
+        try:
+            if os.path.isfile(self.video_path):
+                os.remove(self.video_path)
+        except Exception:
+            pass
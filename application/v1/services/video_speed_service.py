@@ -91,3 +91,11 @@ class VideoSpeedService:
             output_path=self.output_path,
             diagnostics={"factor": factor, "crf": crf, "preset": preset}
         )
+
+    def cleanup(self):
+        # the upload is only needed while rendering; outputs are GC'd by the workspace quota
+        try:
+            if os.path.isfile(self.video_path):
+                os.remove(self.video_path)
+        except Exception:
+            pass
@@ -1,10 +1,21 @@
 import os, uuid, math, shutil, subprocess
+from collections import deque
 from dataclasses import dataclass
 from typing import Dict, List, Tuple, Optional
 import numpy as np
 import cv2
 from werkzeug.utils import secure_filename
 
+from application.utils.parallel import ordered_map
+
+
+# Optical flow params
+LK_PARAMS = dict(
+    winSize=(21, 21),
+    maxLevel=3,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01)
+)
+
 
 @dataclass
 class CVStabilizeResult:
@@ -85,6 +96,78 @@ class VideoStabilizeCVService:
         return np.array([[a, -b, tx],
                          [b,  a, ty]], dtype=np.float32)
 
+    @staticmethod
+    def _estimate_motion(prev_gray: np.ndarray, curr_gray: np.ndarray, *, max_corners: int, quality_level: float,
+                         min_distance: int, ransac_reproj_thresh: float) -> Tuple[float, float, float]:
+        """dx, dy, da from prev to curr (goodFeaturesToTrack + LK optical flow + partial affine); 0s if untrackable."""
+        prev_pts = cv2.goodFeaturesToTrack(
+            prev_gray,
+            maxCorners=max_corners,
+            qualityLevel=quality_level,
+            minDistance=min_distance,
+            blockSize=3
+        )
+        if prev_pts is None or len(prev_pts) < 8:
+            # Not enough features; assume no motion
+            return 0.0, 0.0, 0.0
+
+        curr_pts, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, curr_gray, prev_pts, None, **LK_PARAMS)
+        # Filter valid points
+        idx = status.ravel() == 1
+        prev_pts_valid = prev_pts[idx]
+        curr_pts_valid = curr_pts[idx] if curr_pts is not None else None
+
+        if curr_pts_valid is None or len(curr_pts_valid) < 8:
+            return 0.0, 0.0, 0.0
+
+        # Estimate partial affine (translation + rotation + scale)
+        M, inliers = cv2.estimateAffinePartial2D(prev_pts_valid, curr_pts_valid, method=cv2.RANSAC,
+                                                 ransacReprojThreshold=ransac_reproj_thresh)
+        if M is None:
+            return 0.0, 0.0, 0.0
+        return float(M[0, 2]), float(M[1, 2]), math.atan2(M[1, 0], M[0, 0])
+
+    @staticmethod
+    def _stream_corrections(cap, prev_gray: np.ndarray, limit: Optional[int], radius: int, estimate):
+        """
+        Single decode: yields (frame, (dx, dy, da)) for frames 1.. in order. The correction
+        of frame i+1 needs the trajectory up to transform i+radius, so at most radius+1
+        decoded frames wait in `pending`. `window` holds trajectory[i-radius .. i+radius]
+        with the edge padding of _moving_average, so the corrections equal the two-pass
+        ones (up to float rounding).
+        """
+        r = max(0, int(radius))
+        pending = deque()   # (frame, transform, trajectory) waiting for their window to fill
+        window = deque()
+        traj = np.zeros(3)
+        count = 0
+
+        def emit():
+            while len(window) < 2 * r + 1:
+                window.append(window[-1])  # end padding, only once decoding has finished
+            frame, t, at = pending.popleft()
+            smooth = np.mean(window, axis=0)
+            window.popleft()
+            return frame, t + (smooth - at)
+
+        while limit is None or count < limit:
+            ok, curr = cap.read()
+            if not ok:
+                break
+            curr_gray = cv2.cvtColor(curr, cv2.COLOR_BGR2GRAY)
+            t = np.array(estimate(prev_gray, curr_gray))
+            prev_gray = curr_gray
+            traj = traj + t
+            count += 1
+            if count == 1:
+                window.extend([traj] * r)  # start padding
+            window.append(traj)
+            pending.append((curr, t, traj))
+            if len(window) == 2 * r + 1:
+                yield emit()
+        while pending:
+            yield emit()
+
     # ---------- main ----------
     def process(
         self,
@@ -98,7 +181,8 @@ class VideoStabilizeCVService:
         zoom_percent: float = 5.0,          # auto crop/zoom to hide borders
         keep_audio: bool = True,            # mux original audio back with ffmpeg
         crf: int = 18,
-        preset: str = "veryfast"
+        preset: str = "veryfast",
+        single_pass: bool = True            # one decode with a smoothing_radius look-ahead instead of two
     ) -> CVStabilizeResult:
 
         cap = cv2.VideoCapture(self.video_path)
@@ -111,85 +195,15 @@ class VideoStabilizeCVService:
         h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
 
         # Read first frame
-        ok, prev = cap.read()
+        ok, first = cap.read()
         if not ok:
             cap.release()
             raise RuntimeError("Failed to read first frame")
-        prev_gray = cv2.cvtColor(prev, cv2.COLOR_BGR2GRAY)
-
-        # ORB/KLT: we’ll use goodFeaturesToTrack + LK optical flow
-        transforms: List[Tuple[float, float, float]] = []  # dx, dy, da
-
-        # Optical flow params
-        lk_params = dict(
-            winSize=(21, 21),
-            maxLevel=3,
-            criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 30, 0.01)
-        )
-
-        for _ in range(n_frames - 1):
-            ok, curr = cap.read()
-            if not ok:
-                break
-            curr_gray = cv2.cvtColor(curr, cv2.COLOR_BGR2GRAY)
-
-            prev_pts = cv2.goodFeaturesToTrack(
-                prev_gray,
-                maxCorners=max_corners,
-                qualityLevel=quality_level,
-                minDistance=min_distance,
-                blockSize=3
-            )
-            if prev_pts is None or len(prev_pts) < 8:
-                # Not enough features; assume no motion
-                transforms.append((0.0, 0.0, 0.0))
-                prev_gray = curr_gray
-                continue
-
-            curr_pts, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, curr_gray, prev_pts, None, **lk_params)
-            # Filter valid points
-            idx = status.ravel() == 1
-            prev_pts_valid = prev_pts[idx]
-            curr_pts_valid = curr_pts[idx] if curr_pts is not None else None
+        prev_gray = cv2.cvtColor(first, cv2.COLOR_BGR2GRAY)
 
-            if curr_pts_valid is None or len(curr_pts_valid) < 8:
-                transforms.append((0.0, 0.0, 0.0))
-                prev_gray = curr_gray
-                continue
-
-            # Estimate partial affine (translation + rotation + scale)
-            M, inliers = cv2.estimateAffinePartial2D(prev_pts_valid, curr_pts_valid, method=cv2.RANSAC,
-                                                     ransacReprojThreshold=ransac_reproj_thresh)
-            if M is None:
-                transforms.append((0.0, 0.0, 0.0))
-            else:
-                dx = float(M[0, 2])
-                dy = float(M[1, 2])
-                da = math.atan2(M[1, 0], M[0, 0])  # rotation angle
-                transforms.append((dx, dy, da))
-
-            prev_gray = curr_gray
-
-        cap.release()
-
-        if not transforms:
-            raise RuntimeError("Could not estimate motion (no transforms)")
-
-        # Build cumulative trajectory
-        trajectory = np.cumsum(np.array(transforms), axis=0)  # shape (N, 3)
-
-        # Smooth it
-        smooth_traj = self._moving_average(trajectory, smoothing_radius)
-
-        # Delta to apply: transforms + (smooth - traj)
-        diff = smooth_traj - trajectory
-        new_transforms = np.array(transforms) + diff
-
-        # Prepare writer: we write to a temporary silent mp4, then mux audio
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")  # widely compatible
-        writer = cv2.VideoWriter(self.silent_out, fourcc, fps, (w, h))
-        if not writer.isOpened():
-            raise RuntimeError("VideoWriter failed to open")
+        def estimate(a, b):
+            return self._estimate_motion(a, b, max_corners=max_corners, quality_level=quality_level,
+                                         min_distance=min_distance, ransac_reproj_thresh=ransac_reproj_thresh)
 
         # Border handling
         border_map = {
@@ -199,31 +213,80 @@ class VideoStabilizeCVService:
         }
         border_flag = border_map.get(border_mode.lower(), cv2.BORDER_CONSTANT)
         zoom = max(1.0, 1.0 + float(zoom_percent) / 100.0)
+        cx, cy = w / 2.0, h / 2.0
 
-        # Second pass: apply transforms
-        cap = cv2.VideoCapture(self.video_path)
-        ok, frame = cap.read()
-        writer.write(frame)  # write the first frame as-is
-        prev = frame
-        i = 0
+        def warp(item):
+            frame, (dx, dy, da) = item
+            M = self._build_transform(dx, dy, da, zoom, cx, cy)
+            return cv2.warpAffine(frame, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=border_flag)
+
+        if single_pass:
+            # Prepare writer: we write to a temporary silent mp4, then mux audio
+            writer = cv2.VideoWriter(self.silent_out, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+            if not writer.isOpened():
+                cap.release()
+                raise RuntimeError("VideoWriter failed to open")
+            writer.write(first)  # write the first frame as-is
+            # estimation runs here while earlier frames are warped on the thread pool
+            corrections = self._stream_corrections(cap, prev_gray, n_frames - 1 if n_frames > 0 else None,
+                                                   smoothing_radius, estimate)
+            frames_used = 1
+            for stabilized in ordered_map(warp, corrections):
+                writer.write(stabilized)
+                frames_used += 1
+            cap.release()
+            writer.release()
+            if frames_used == 1:
+                raise RuntimeError("Could not estimate motion (no transforms)")
+        else:
+            transforms: List[Tuple[float, float, float]] = []  # dx, dy, da
+            for _ in range(n_frames - 1):
+                ok, curr = cap.read()
+                if not ok:
+                    break
+                curr_gray = cv2.cvtColor(curr, cv2.COLOR_BGR2GRAY)
+                transforms.append(estimate(prev_gray, curr_gray))
+                prev_gray = curr_gray
 
-        cx, cy = w / 2.0, h / 2.0
+            cap.release()
 
-        while True:
-            ok, frame = cap.read()
-            if not ok or i >= len(new_transforms):
-                break
+            if not transforms:
+                raise RuntimeError("Could not estimate motion (no transforms)")
 
-            dx, dy, da = new_transforms[i]
-            M = self._build_transform(dx, dy, da, zoom, cx, cy)
+            # Build cumulative trajectory
+            trajectory = np.cumsum(np.array(transforms), axis=0)  # shape (N, 3)
 
-            stabilized = cv2.warpAffine(frame, M, (w, h), flags=cv2.INTER_LINEAR, borderMode=border_flag)
+            # Smooth it
+            smooth_traj = self._moving_average(trajectory, smoothing_radius)
 
-            writer.write(stabilized)
-            i += 1
+            # Delta to apply: transforms + (smooth - traj)
+            diff = smooth_traj - trajectory
+            new_transforms = np.array(transforms) + diff
 
-        cap.release()
-        writer.release()
+            # Prepare writer: we write to a temporary silent mp4, then mux audio
+            fourcc = cv2.VideoWriter_fourcc(*"mp4v")  # widely compatible
+            writer = cv2.VideoWriter(self.silent_out, fourcc, fps, (w, h))
+            if not writer.isOpened():
+                raise RuntimeError("VideoWriter failed to open")
+
+            # Second pass: apply transforms (warps run on a thread pool, written in order)
+            cap = cv2.VideoCapture(self.video_path)
+            ok, frame = cap.read()
+            writer.write(frame)  # write the first frame as-is
+
+            def read_frames():
+                for i in range(len(new_transforms)):
+                    ok, frame = cap.read()
+                    if not ok:
+                        return
+                    yield frame, new_transforms[i]
+
+            for stabilized in ordered_map(warp, read_frames()):
+                writer.write(stabilized)
+
+            cap.release()
+            writer.release()
+            frames_used = len(transforms) + 1
 
         # Final: mux original audio back (if requested). If the input had no audio, copy will just warn and continue.
         if keep_audio:
@@ -250,7 +313,9 @@ class VideoStabilizeCVService:
         return CVStabilizeResult(
             output_path=self.output_path,
             diagnostics={
-                "frames_used": len(transforms) + 1,
+                "frames_used": frames_used,
+                "single_pass": single_pass,
+                "decode_passes": 1 if single_pass else 2,
                 "fps": fps,
                 "size": [w, h],
                 "smoothing_radius": smoothing_radius,
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional
 from werkzeug.utils import secure_filename
 
-from application.utils.gcs_upload import upload_to_gcs
+from application.publisher import PUBLISH_MANAGER
 
 
 @dataclass
@@ -130,11 +130,12 @@ class VideoTrimService:
 
         self._run(cmd)
 
-        gcs_url = None
+        # Publish in the background; the URL is known up front, completion via publish_id
+        publish = None
         if bucket_name:
             dest_name = os.path.basename(self.output_path)
             gcs_path = f"trim/{dest_name}"
-            gcs_url = upload_to_gcs(self.output_path, bucket_name, gcs_path)
+            publish = PUBLISH_MANAGER.submit(self.output_path, bucket_name, gcs_path)
 
         return TrimResult(
             output_path=self.output_path,
@@ -147,6 +148,16 @@ class VideoTrimService:
                 "preset": preset,
                 "copy_audio": copy_audio,
                 "video_duration_probe": vid_dur,
-                "gcs_url": gcs_url
+                "gcs_url": publish["gcs_url"] if publish else None,
+                "publish_id": publish["id"] if publish else None,
+                "publish_status": publish["status"] if publish else None,
             }
         )
+
+    def cleanup(self):
+        # the upload is only needed while rendering; outputs are GC'd by the workspace quota
+        try:
+            if os.path.isfile(self.video_path):
+                os.remove(self.video_path)
+        except Exception:
+            pass
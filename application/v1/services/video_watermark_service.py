@@ -165,3 +165,12 @@ class VideoWatermarkService:
                 "copy_audio": copy_audio
             }
         )
+
+    def cleanup(self):
+        # uploads are only needed while rendering; outputs are GC'd by the workspace quota
+        for p in (self.video_path, self.image_path):
+            try:
+                if os.path.isfile(p):
+                    os.remove(p)
+            except Exception:
+                pass
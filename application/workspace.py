@@ -0,0 +1,243 @@
+import os, uuid, time, shutil, threading
+
+from application.publisher import PUBLISH_MANAGER
+
+
+def _path_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for f in files:
+            try:
+                total += os.path.getsize(os.path.join(root, f))
+            except OSError:
+                pass
+    return total
+
+
+def _remove(path: str):
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+    except Exception:
+        pass
+
+
+class WorkspaceManager:
+    """
+    Disk quota for uploads and outputs (on Cloud Run /tmp is RAM).
+    - session_dir(kind): per-request dir, pinned until release()
+    - track(path): register an output file/dir so it counts against the quota
+    - gc(): drop entries idle longer than ttl_sec, then least-recently-used ones
+      until usage <= quota_bytes. Pinned entries and outputs still being
+      published are never evicted.
+    """
+
+    def __init__(self, root="/tmp/workspace", quota_bytes=2 * 1024 ** 3, ttl_sec=3600):
+        self.root = root
+        self.quota_bytes = int(quota_bytes)
+        self.ttl_sec = int(ttl_sec)
+        self._entries = {}     # path -> dict
+        self._lock = threading.Lock()
+        self._evicted = 0
+        self._evicted_bytes = 0
+
+    # ---------- sessions / tracking ----------
+    def session_dir(self, kind: str, reserve_bytes: int = 0) -> str:
+        self.gc(reserve_bytes=reserve_bytes)
+        path = os.path.join(self.root, f"{kind}_{uuid.uuid4().hex[:8]}")
+        os.makedirs(path, exist_ok=True)
+        now = time.time()
+        with self._lock:
+            self._entries[path] = {
+                "path": path, "kind": kind, "size": 0,
+                "created_at": now, "last_access": now, "pins": 1,
+            }
+        return path
+
+    def track(self, path: str, kind: str = "output"):
+        if not path or not os.path.exists(path):
+            return
+        now = time.time()
+        size = _path_size(path)
+        with self._lock:
+            e = self._entries.get(path)
+            if e:
+                e.update(size=size, last_access=now)
+            else:
+                self._entries[path] = {
+                    "path": path, "kind": kind, "size": size,
+                    "created_at": now, "last_access": now, "pins": 0,
+                }
+        self.gc()
+
+    def untrack(self, path: str):
+        """Stop counting a path (it is back in active use by its owner); nothing is deleted."""
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def touch(self, path: str):
+        with self._lock:
+            if path in self._entries:
+                self._entries[path]["last_access"] = time.time()
+
+    def release(self, path: str, remove: bool = True):
+        """Unpin a session dir; by default its contents are deleted right away."""
+        with self._lock:
+            e = self._entries.get(path)
+            if e:
+                e["pins"] = max(0, e["pins"] - 1)
+                e["last_access"] = time.time()
+                if e["pins"]:
+                    return
+                if remove:
+                    self._entries.pop(path, None)
+        if remove:
+            _remove(path)
+        elif e:
+            size = _path_size(path)
+            with self._lock:
+                e["size"] = size
+
+    # ---------- eviction ----------
+    def _evictable(self, e: dict) -> bool:
+        return e["pins"] == 0 and not PUBLISH_MANAGER.is_pending(e["path"])
+
+    def gc(self, reserve_bytes: int = 0) -> dict:
+        # disk walks happen outside the lock so track()/untrack() from request threads never wait on them
+        with self._lock:
+            snapshot = list(self._entries.items())
+        gone = {path for path, _ in snapshot if not os.path.exists(path)}
+        # live session dirs grow while requests run: refresh their sizes
+        sizes = {path: _path_size(path) for path, e in snapshot
+                 if path not in gone and e["pins"] and os.path.isdir(path)}
+
+        now = time.time()
+        victims = []
+        with self._lock:
+            for path, e in snapshot:
+                if self._entries.get(path) is not e:
+                    continue  # released / re-tracked meanwhile
+                if path in gone:
+                    self._entries.pop(path)
+                    continue
+                if path in sizes:
+                    e["size"] = sizes[path]
+                if self.ttl_sec > 0 and now - e["last_access"] > self.ttl_sec and self._evictable(e):
+                    victims.append(self._entries.pop(path))
+
+            used = sum(e["size"] for e in self._entries.values())
+            limit = self.quota_bytes - max(0, int(reserve_bytes))
+            if used > limit:
+                for e in sorted(self._entries.values(), key=lambda x: x["last_access"]):
+                    if used <= limit:
+                        break
+                    if not self._evictable(e):
+                        continue
+                    victims.append(self._entries.pop(e["path"]))
+                    used -= e["size"]
+            self._evicted += len(victims)
+            self._evicted_bytes += sum(v["size"] for v in victims)
+
+        for v in victims:
+            _remove(v["path"])
+        return {"evicted": len(victims), "evicted_bytes": sum(v["size"] for v in victims)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = list(self._entries.values())
+            evicted, evicted_bytes = self._evicted, self._evicted_bytes
+        by_kind = {}
+        for e in entries:
+            k = by_kind.setdefault(e["kind"], {"count": 0, "bytes": 0})
+            k["count"] += 1
+            k["bytes"] += e["size"]
+        used = sum(e["size"] for e in entries)
+        return {
+            "root": self.root,
+            "quota_bytes": self.quota_bytes,
+            "used_bytes": used,
+            "used_pct": round(100.0 * used / self.quota_bytes, 2) if self.quota_bytes else None,
+            "ttl_sec": self.ttl_sec,
+            "entries": len(entries),
+            "pinned": sum(1 for e in entries if e["pins"]),
+            "by_kind": by_kind,
+            "evicted_total": evicted,
+            "evicted_bytes_total": evicted_bytes,
+        }
+
+WORKSPACE = WorkspaceManager(
+    root=os.getenv("WORKSPACE_ROOT", "/tmp/workspace"),
+    quota_bytes=int(os.getenv("WORKSPACE_QUOTA_MB", "2048")) * 1024 * 1024,
+    ttl_sec=int(os.getenv("WORKSPACE_TTL_SEC", "3600")),
+)
+
+
+# ---------- scratch tier for frame-heavy pipelines ----------
+SCRATCH_RAM_ROOT = os.getenv("SCRATCH_RAM_ROOT", "/dev/shm/media-ai")
+SCRATCH_RAM_FRACTION = float(os.getenv("SCRATCH_RAM_FRACTION", "0.5"))  # of MemAvailable
+SCRATCH_MODES = ("auto", "ram", "disk")
+
+
+def _mem_available() -> int:
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except Exception:
+        pass
+    return 0
+
+
+def _fs_free(path: str) -> int:
+    try:
+        st = os.statvfs(path)
+        return st.f_bavail * st.f_frsize
+    except OSError:
+        return 0
+
+
+def frame_scratch_bytes(width: int, height: int, frames: int, channels=(3, 3)) -> int:
+    """
+    Upper bound for a frames/ + inpainted/ layout: uncompressed bytes per frame
+    (BGR + BGR) x frame count. PNGs come in smaller; masks live in a compact store.
+    """
+    return int(width) * int(height) * sum(channels) * max(0, int(frames))
+
+
+def pick_scratch_root(need_bytes: int, disk_root: str, mode: str = "auto") -> dict:
+    """
+    Choose where intermediate frames live.
+    mode: auto -> tmpfs only if need_bytes fits the tmpfs free space AND
+                  SCRATCH_RAM_FRACTION of MemAvailable (tmpfs pages are RAM)
+          ram  -> tmpfs whenever it has the free space
+          disk -> always disk_root
+    Returns {"root", "tier": ram|disk, "need_bytes", "reason"}.
+    """
+    m = (mode or "auto").lower()
+    if m not in SCRATCH_MODES:
+        raise ValueError("scratch must be 'auto', 'ram' or 'disk'")
+    info = {"root": disk_root, "tier": "disk", "need_bytes": int(need_bytes), "reason": "disk requested"}
+    if m == "disk":
+        return info
+    shm_parent = os.path.dirname(SCRATCH_RAM_ROOT.rstrip("/")) or "/"
+    if not os.path.isdir(shm_parent):
+        info["reason"] = f"{shm_parent} not available"
+        return info
+
+    shm_free = _fs_free(shm_parent)
+    mem_budget = int(_mem_available() * SCRATCH_RAM_FRACTION)
+    if need_bytes > shm_free:
+        info["reason"] = f"need {need_bytes} B > tmpfs free {shm_free} B"
+        return info
+    if m == "auto" and need_bytes > mem_budget:
+        info["reason"] = f"need {need_bytes} B > RAM headroom {mem_budget} B"
+        return info
+
+    os.makedirs(SCRATCH_RAM_ROOT, exist_ok=True)
+    info.update(root=SCRATCH_RAM_ROOT, tier="ram", reason="fits in tmpfs")
+    return info
@@ -0,0 +1,83 @@
+"""
+OCR detection at reduced resolution vs full resolution.
+
+    python -m benchmarks.bench_detect_scale clip.mp4 --sides 0,1280,960,720 --max-frames 60
+
+Every --step-th frame is detected once per detect_max_side (0 = full resolution)
+through ScaledTextReader; boxes come back in source pixels and are padded like
+the inpaint services do. Reports ms per frame, speedup over full resolution and
+mask recall / IoU of the box masks against the full-resolution boxes.
+"""
+import argparse
+
+import cv2
+import numpy as np
+import easyocr
+
+from application.utils.ocr_detect import ScaledTextReader
+from application.v1.services.inpaint_video_service import InpaintVideoService
+
+
+def read_frames(path, max_frames, step):
+    cap = cv2.VideoCapture(path)
+    frames, i = [], 0
+    while len(frames) < max_frames:
+        ok, img = cap.read()
+        if not ok:
+            break
+        if i % step == 0:
+            frames.append(img)
+        i += 1
+    cap.release()
+    return frames
+
+
+def box_mask(boxes, H, W):
+    m = np.zeros((H, W), dtype=np.uint8)
+    for (x1, y1, x2, y2) in boxes:
+        cv2.rectangle(m, (x1, y1), (x2, y2), 1, -1)
+    return m
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("video")
+    ap.add_argument("--sides", default="0,1280,960,720")
+    ap.add_argument("--max-frames", type=int, default=60)
+    ap.add_argument("--step", type=int, default=10)
+    ap.add_argument("--langs", default="en")
+    ap.add_argument("--pad", type=int, default=8)
+    a = ap.parse_args()
+
+    frames = read_frames(a.video, a.max_frames, a.step)
+    if not frames:
+        raise SystemExit("no frames decoded")
+    H, W = frames[0].shape[:2]
+    base = easyocr.Reader(a.langs.split(","))
+    base.readtext(frames[0])  # warm-up: model load / first-call allocations
+
+    def run(side):
+        reader = ScaledTextReader(base, side)
+        boxes = [[tuple(x for pt in InpaintVideoService._expand_box(bbox, W, H, pad=a.pad) for x in pt)
+                  for (bbox, _, _) in reader.readtext(img)] for img in frames]
+        return boxes, reader.stats()
+
+    ref, ref_stats = run(0)
+    full_ms = ref_stats["detect_ms_per_call"]
+    print(f"frames {len(frames)} ({W}x{H}), full resolution {full_ms:.1f} ms/frame")
+    print(f"{'max_side':>9}{'scale':>8}{'ms/frame':>10}{'speedup':>9}{'recall':>8}{'iou':>7}")
+    for side in (int(s) for s in a.sides.split(",")):
+        boxes, st = (ref, ref_stats) if side == 0 else run(side)
+        inter = union = total = 0
+        for fb, sb in zip(ref, boxes):
+            fm, sm = box_mask(fb, H, W), box_mask(sb, H, W)
+            inter += int((fm & sm).sum())
+            union += int((fm | sm).sum())
+            total += int(fm.sum())
+        ms = st["detect_ms_per_call"]
+        print(f"{side:>9}{st['detect_scale']:>8.3f}{ms:>10.1f}{full_ms / max(ms, 1e-9):>8.1f}x"
+              f"{inter / total if total else 1.0:>8.3f}{inter / union if union else 1.0:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Intermediate frame formats for the folder-based inpaint path.
+
+    python -m benchmarks.bench_frame_format clip.mp4 --max-frames 300
+
+For every frame_format (png, png0, bmp, npy) this measures, on the same clip:
+  extract  ffmpeg decode -> frames/ in that format (as _extract_frames does)
+  write    OpenCV encode of every frame (what the inpaint stage does per frame)
+  read     OpenCV decode / memmap read of every frame
+  disk     bytes on disk for one frame set
+"""
+import argparse, os, shutil, subprocess, tempfile, time
+
+import cv2
+
+from application.utils.frame_io import FRAME_FORMATS, frame_store
+
+
+def probe_size(path):
+    cap = cv2.VideoCapture(path)
+    W, H = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+    return W, H
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("video")
+    ap.add_argument("--max-frames", type=int, default=300)
+    ap.add_argument("--formats", default=",".join(FRAME_FORMATS))
+    a = ap.parse_args()
+
+    W, H = probe_size(a.video)
+    root = tempfile.mkdtemp(prefix="bench_frames_")
+    try:
+        print(f"clip {W}x{H}, up to {a.max_frames} frames")
+        print(f"{'format':8}{'extract s':>11}{'write ms/f':>12}{'read ms/f':>11}{'disk MB':>10}")
+        for fmt in a.formats.split(","):
+            src_dir, dst_dir = os.path.join(root, fmt, "frames"), os.path.join(root, fmt, "out")
+            os.makedirs(src_dir)
+            os.makedirs(dst_dir)
+            frames = frame_store(src_dir, fmt, W, H)
+
+            t0 = time.perf_counter()
+            subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", a.video, "-frames:v", str(a.max_frames),
+                            *frames.ffmpeg_output()], check=True)
+            extract = time.perf_counter() - t0
+
+            names = frames.names()
+            t0 = time.perf_counter()
+            imgs = [frames.read(n) for n in names]
+            read = time.perf_counter() - t0
+
+            out = frames.sibling(dst_dir)
+            t0 = time.perf_counter()
+            for n, img in zip(names, imgs):
+                out.write(n, img)
+            out.flush()
+            write = time.perf_counter() - t0
+
+            n = max(1, len(names))
+            print(f"{fmt:8}{extract:>11.2f}{1000 * write / n:>12.2f}{1000 * read / n:>11.2f}"
+                  f"{frames.size_bytes() / 1e6:>10.1f}")
+            del imgs
+            shutil.rmtree(os.path.join(root, fmt), ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
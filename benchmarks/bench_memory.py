@@ -0,0 +1,64 @@
+"""
+Memory versus clip length for the video inpaint pipelines.
+
+    python -m benchmarks.bench_memory clip.mp4 --lengths 5,10,20,40 --modes frames,stream
+
+The clip is cut to each length (stream copy) and every mode runs in a fresh spawned
+process, so one run's allocations never inflate the next one's peak. Per run:
+  est MB    estimate_job_bytes() for the probed size/frame count (what admission reserves)
+  peak MB   highest sampled RSS during the job (PhaseMemory), and the phase it occurred in
+  growth    peak minus RSS before the job started (interpreter + models excluded)
+  maxrss    lifetime peak RSS of the worker process (getrusage)
+frames should grow with length (mask store, tmpfs scratch); stream should stay flat.
+"""
+import argparse, os, resource, shutil, subprocess, tempfile
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _run(path, work, mode, detector, max_side, scratch):
+    from application.v1.services.inpaint_video_service import InpaintVideoService
+    svc = InpaintVideoService(path, work_root=os.path.join(work, "work"), output_root=os.path.join(work, "out"))
+    try:
+        res = svc.process(mode=mode, inpaint_backend="opencv", ocr_detector=detector,
+                          detect_max_side=max_side, scratch=scratch)
+    finally:
+        svc.cleanup()
+    mem = res.diagnostics["memory"]
+    mem["maxrss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return mem
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("video")
+    ap.add_argument("--lengths", default="5,10,20,40", help="clip lengths in seconds")
+    ap.add_argument("--modes", default="frames,stream")
+    ap.add_argument("--detector", default="detect", help="ocr_detector (readtext|detect|east|db)")
+    ap.add_argument("--detect-max-side", type=int, default=0)
+    ap.add_argument("--scratch", default="disk", help="auto|ram|disk for mode=frames")
+    a = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_memory_")
+    ctx = mp.get_context("spawn")
+    try:
+        print(f"{'sec':>5}{'mode':>9}{'est MB':>9}{'peak MB':>9}{'growth':>8}{'maxrss':>8}  peak phase")
+        for sec in (float(x) for x in a.lengths.split(",")):
+            clip = os.path.join(root, f"clip_{sec:g}s.mp4")
+            subprocess.run(["ffmpeg", "-v", "error", "-y", "-i", a.video, "-t", f"{sec:g}", "-c", "copy", clip],
+                           check=True)
+            for mode in a.modes.split(","):
+                work = os.path.join(root, f"{mode}_{sec:g}")
+                with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+                    m = ex.submit(_run, clip, work, mode, a.detector, a.detect_max_side, a.scratch).result()
+                phases = m["phases"]
+                top = max(phases, key=lambda k: phases[k]["peak_mb"]) if phases else "-"
+                print(f"{sec:>5g}{mode:>9}{m['estimate_mb']:>9.0f}{m['rss_peak_mb']:>9.0f}"
+                      f"{m['rss_growth_mb']:>8.0f}{m['maxrss_mb']:>8.0f}  {top}")
+                shutil.rmtree(work, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
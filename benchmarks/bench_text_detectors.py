@@ -0,0 +1,91 @@
+"""
+Detector-only text backends vs EasyOCR readtext on the same frames.
+
+    python -m benchmarks.bench_text_detectors clip.mp4 --detectors readtext,detect,east,db
+
+Every --step-th frame (up to --max-frames) goes through each detector from
+get_text_detector(); boxes are padded like the inpaint services do. readtext is
+the reference: the table shows ms per frame, speedup over readtext and recall /
+IoU of each detector's box mask against the readtext box mask. east/db need
+OCR_EAST_MODEL / OCR_DB_MODEL; detectors that cannot load are reported and skipped.
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from application.utils.ocr_detect import ScaledTextReader, get_text_detector
+from application.v1.services.inpaint_video_service import InpaintVideoService
+
+
+def read_frames(path, max_frames, step):
+    cap = cv2.VideoCapture(path)
+    frames, i = [], 0
+    while len(frames) < max_frames:
+        ok, img = cap.read()
+        if not ok:
+            break
+        if i % step == 0:
+            frames.append(img)
+        i += 1
+    cap.release()
+    return frames
+
+
+def box_mask(boxes, H, W):
+    m = np.zeros((H, W), dtype=np.uint8)
+    for (x1, y1, x2, y2) in boxes:
+        cv2.rectangle(m, (x1, y1), (x2, y2), 1, -1)
+    return m
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("video")
+    ap.add_argument("--detectors", default="readtext,detect,east,db")
+    ap.add_argument("--max-frames", type=int, default=60)
+    ap.add_argument("--step", type=int, default=10)
+    ap.add_argument("--langs", default="en")
+    ap.add_argument("--device", default="cpu")
+    ap.add_argument("--max-side", type=int, default=0, help="detect_max_side for every detector (0 = full)")
+    ap.add_argument("--pad", type=int, default=8)
+    a = ap.parse_args()
+
+    frames = read_frames(a.video, a.max_frames, a.step)
+    if not frames:
+        raise SystemExit("no frames decoded")
+    H, W = frames[0].shape[:2]
+
+    def run(name):
+        det = get_text_detector(name, a.langs, a.device)
+        det.readtext(frames[0])  # warm-up
+        reader = ScaledTextReader(det, a.max_side)
+        boxes = [[tuple(x for pt in InpaintVideoService._expand_box(bbox, W, H, pad=a.pad) for x in pt)
+                  for (bbox, _, _) in reader.readtext(img)] for img in frames]
+        return boxes, reader.stats()["detect_ms_per_call"]
+
+    ref, ref_ms = run("readtext")
+    print(f"frames {len(frames)} ({W}x{H}), readtext {ref_ms:.1f} ms/frame")
+    print(f"{'detector':>9}{'ms/frame':>10}{'speedup':>9}{'recall':>8}{'iou':>7}{'boxes':>7}")
+    for name in a.detectors.split(","):
+        if name == "readtext":
+            boxes, ms = ref, ref_ms
+        else:
+            try:
+                boxes, ms = run(name)
+            except Exception as e:
+                print(f"{name:>9}  skipped: {e}")
+                continue
+        inter = union = total = 0
+        for fb, sb in zip(ref, boxes):
+            fm, sm = box_mask(fb, H, W), box_mask(sb, H, W)
+            inter += int((fm & sm).sum())
+            union += int((fm | sm).sum())
+            total += int(fm.sum())
+        print(f"{name:>9}{ms:>10.1f}{ref_ms / max(ms, 1e-9):>8.1f}x"
+              f"{inter / total if total else 1.0:>8.3f}{inter / union if union else 1.0:>7.3f}"
+              f"{sum(len(b) for b in boxes):>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Whole-image versus tiled text removal on one large image.
+
+    python -m benchmarks.bench_tiled_inpaint scan.png --tiles 0,4096,2048,1024 --backend opencv
+
+Each setting runs in a fresh spawned process (peak RSS is per process) through
+InpaintImageService.process_lama; tile 0 is the original whole-image path.
+Reported: wall time, OCR boxes found, tiles inpainted and peak RSS.
+"""
+import argparse, os, resource, shutil, tempfile, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _run(path, work, tile, overlap, workers, backend, detector):
+    from application.v1.services.inpaint_image_service import InpaintImageService
+    svc = InpaintImageService(path, work_root=os.path.join(work, "work"), output_root=os.path.join(work, "out"))
+    t0 = time.perf_counter()
+    try:
+        res = svc.process_lama(inpaint_backend=backend, ocr_detector=detector, tile=tile,
+                               tile_overlap=overlap, tile_workers=workers)
+    finally:
+        svc.cleanup()
+    d = res["diagnostics"]
+    return {"sec": time.perf_counter() - t0, "boxes": d["ocr_detected_boxes"],
+            "tiles": d.get("tiles_inpainted", 0), "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("image")
+    ap.add_argument("--tiles", default="0,4096,2048,1024", help="tile sides to compare (0 = whole image)")
+    ap.add_argument("--overlap", type=int, default=128)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--backend", default="opencv", help="onnx|iopaint|opencv")
+    ap.add_argument("--detector", default="detect", help="ocr_detector (readtext|detect|east|db)")
+    a = ap.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_tiles_")
+    ctx = mp.get_context("spawn")
+    try:
+        print(f"{'tile':>6}{'sec':>8}{'boxes':>7}{'tiles':>7}{'maxrss MB':>11}")
+        for tile in (int(x) for x in a.tiles.split(",")):
+            work = os.path.join(root, str(tile))
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as ex:
+                r = ex.submit(_run, a.image, work, tile, a.overlap, a.workers, a.backend, a.detector).result()
+            print(f"{tile:>6}{r['sec']:>8.2f}{r['boxes']:>7}{r['tiles']:>7}{r['maxrss_mb']:>11.0f}")
+            shutil.rmtree(work, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()